@@ -0,0 +1,86 @@
+"""
+Measures the peak memory allocated while encoding the `conduct load` request body for bundles of growing size, with
+`requests` building the multipart body upfront and with `multipart.MultipartEncoder` streaming it.
+
+Bundles are sparse files, so the benchmark doesn't need the disk space. `requests` is only measured up to
+`LEGACY_MAX_SIZE_MB` since it holds the whole bundle in memory.
+
+Usage, from the project root: python -m benchmarks.multipart_benchmark [largest bundle size in MB]
+"""
+from conductr_cli import multipart
+import os
+import requests
+import sys
+import tempfile
+import tracemalloc
+
+
+DEFAULT_MAX_SIZE_MB = 1024
+LEGACY_MAX_SIZE_MB = 256
+
+# Block size `urllib3` reads a file-like body with
+READ_SIZE = 16384
+
+MB = 1024 * 1024
+
+
+def create_bundle(directory, size):
+    path = os.path.join(directory, 'bundle-{}.zip'.format(size))
+    with open(path, 'wb') as bundle:
+        bundle.truncate(size)
+    return path
+
+
+def fields(bundle):
+    return [
+        ('nrOfCpus', '1.0'),
+        ('memory', '200'),
+        ('diskSpace', '100'),
+        ('roles', 'web-server'),
+        ('bundleName', 'bundle'),
+        ('system', 'bundle'),
+        ('bundle', ('bundle.zip', bundle))
+    ]
+
+
+def legacy_encode(bundle):
+    request = requests.Request('POST', 'http://127.0.0.1:9005/bundles', files=fields(bundle)).prepare()
+    return len(request.body)
+
+
+def streamed_encode(bundle):
+    body = multipart.MultipartEncoder(fields(bundle))
+    sent = 0
+    chunk = body.read(READ_SIZE)
+    while chunk:
+        sent += len(chunk)
+        chunk = body.read(READ_SIZE)
+    assert sent == len(body)
+    return sent
+
+
+def peak_memory(encode, path):
+    with open(path, 'rb') as bundle:
+        tracemalloc.start()
+        try:
+            encode(bundle)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def run(max_size_mb):
+    sizes_mb = [size for size in [16, 64, 256, 1024, 4096] if size < max_size_mb] + [max_size_mb]
+    print('{: >10} {: >14} {: >14}'.format('bundle', 'legacy peak', 'streamed peak'))
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in sizes_mb:
+            path = create_bundle(directory, size_mb * MB)
+            legacy = '{:11.1f} MB'.format(peak_memory(legacy_encode, path) / MB) \
+                if size_mb <= LEGACY_MAX_SIZE_MB else '-'
+            streamed = '{:11.1f} KB'.format(peak_memory(streamed_encode, path) / 1024)
+            print('{: >7} MB {: >14} {: >14}'.format(size_mb, legacy, streamed))
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_SIZE_MB)
@@ -0,0 +1,102 @@
+"""
+Measures the time taken to download a bundle from a local HTTP server with a single stream, and in concurrent segments.
+
+The server emulates a high latency link: every request is answered after `LATENCY` seconds, and each connection sends
+at most `WINDOW_SIZE` bytes per `LATENCY` seconds, which is how a TCP connection is bound by its window and round trip
+time. A single stream is then limited to `WINDOW_SIZE / LATENCY` bytes per second, regardless of the bandwidth.
+
+Usage, from the project root: python -m benchmarks.segmented_download_benchmark [bundle size in MB]
+"""
+from conductr_cli import constants, downloader, logging_setup
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+DEFAULT_SIZE_MB = 32
+
+LATENCY = 0.05  # seconds
+WINDOW_SIZE = 256 * 1024
+
+SEGMENTS = [1, 2, 4, 8]
+
+MB = 1024 * 1024
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def create_handler(content):
+    class RangeRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa
+            time.sleep(LATENCY)
+            range_header = self.headers.get('Range')
+            if range_header is None:
+                start, end = 0, len(content) - 1
+                self.send_response(200)
+            else:
+                start, end = [int(value) if value else len(content) - 1
+                              for value in range_header[len('bytes='):].split('-')]
+                self.send_response(206)
+                self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end, len(content)))
+            self.send_header('Content-Length', str(end + 1 - start))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', '"bundle"')
+            self.end_headers()
+
+            position = start
+            try:
+                while position <= end:
+                    self.wfile.write(content[position:min(position + WINDOW_SIZE, end + 1)])
+                    position += WINDOW_SIZE
+                    time.sleep(LATENCY)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return RangeRequestHandler
+
+
+def download(url, directory, segments):
+    constants.DEFAULT_DOWNLOAD_SEGMENTS = segments
+    download_path = os.path.join(directory, 'bundle-{}.part'.format(segments))
+    started_at = time.monotonic()
+    downloader.download(url, download_path)
+    elapsed = time.monotonic() - started_at
+    size = os.path.getsize(download_path)
+    os.remove(download_path)
+    return size, elapsed
+
+
+def run(size_mb):
+    logging_setup.configure_logging(argparse.Namespace(quiet=True))
+    downloader.SEGMENTED_DOWNLOAD_MIN_SIZE = 0
+
+    content = os.urandom(size_mb * MB)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), create_handler(content))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/bundle.zip'.format(server.server_address[1])
+
+    print('{} MB bundle, {:.0f} ms latency, {:.1f} MB/s per connection'.format(
+        size_mb, LATENCY * 1000, WINDOW_SIZE / LATENCY / MB))
+    print('{: >8} {: >10} {: >12}'.format('segments', 'time', 'throughput'))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for segments in SEGMENTS:
+                size, elapsed = download(url, directory, segments)
+                assert size == len(content)
+                print('{: >8} {: >9.2f}s {: >7.1f} MB/s'.format(segments, elapsed, size / elapsed / MB))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE_MB)
@@ -0,0 +1,161 @@
+"""
+Measures the time taken and the system calls made by shazar to package bundle directories of growing size, made of
+library jars and of as much text. Bundles are packaged:
+- as shazar used to, storing every file and reading the archive again to compute its digest;
+- deflating every file;
+- deflating only the files worth deflating, as shazar does, with one process and with one process per CPU;
+- reusing the files of the previous archive once a document has changed, with one process.
+
+System calls are counted from `/proc/self/io`, so they're only reported on Linux, and only for the benchmark process:
+the files read by the processes compressing them in parallel aren't counted. Those of the previous archive include
+packaging the previous archive, whose time isn't counted.
+
+Usage, from the project root: python -m benchmarks.shazar_benchmark [bundle size in MB]...
+"""
+from conductr_cli import logging_setup, shazar_main
+from functools import partial
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+DEFAULT_SIZES_MB = [100, 1024]
+
+FILE_COUNT = 50
+
+MB = 1024 * 1024
+
+
+def create_bundle_dir(directory, size):
+    bundle_dir = os.path.join(directory, 'bundle')
+    os.makedirs(os.path.join(bundle_dir, 'lib'))
+    os.makedirs(os.path.join(bundle_dir, 'doc'))
+    # Libraries are as incompressible as jars, and documents are as compressible as text
+    library_block = os.urandom(MB)
+    document_block = ''.join(['line {} of a document\n'.format(index) for index in range(50000)]).encode('utf-8')[:MB]
+    file_size = size // FILE_COUNT
+    for index in range(FILE_COUNT):
+        if index % 2 == 0:
+            path, block = os.path.join(bundle_dir, 'lib', 'library-{}.jar'.format(index)), library_block
+        else:
+            path, block = os.path.join(bundle_dir, 'doc', 'document-{}.txt'.format(index)), document_block
+        with open(path, 'wb') as bundle_file:
+            for offset in range(0, file_size, MB):
+                bundle_file.write(block[:min(MB, file_size - offset)])
+    return bundle_dir
+
+
+def legacy_shazar(args):
+    """
+    shazar as it was before archives were hashed while written, and before files were deflated.
+    """
+    source_base_name = os.path.basename(args.source.rstrip('\\/'))
+    temp_file = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
+    temp_file.close()
+    temp_file_name = temp_file.name
+
+    with zipfile.ZipFile(temp_file_name, 'w') as zip_file:
+        for (dir_path, dir_names, file_names) in os.walk(args.source):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                name = os.path.join(source_base_name, os.path.relpath(path, start=args.source))
+                zip_file.write(path, name)
+
+    with open(temp_file_name, mode='rb') as f:
+        d = hashlib.sha256()
+        for buf in iter(partial(f.read, 128), b''):
+            d.update(buf)
+
+    shutil.move(temp_file_name, os.path.join(args.output_dir, '{}-{}.zip'.format(source_base_name, d.hexdigest())))
+
+
+def deflating_shazar(args):
+    """
+    shazar deflating every file.
+    """
+    with patch('conductr_cli.shazar_main.compression_type', MagicMock(return_value=zipfile.ZIP_DEFLATED)):
+        shazar_main.shazar(args)
+
+
+def incremental_shazar(args):
+    """
+    shazar reusing the files of the archive of the bundle before one of its documents changed.
+    """
+    previous_dir = tempfile.mkdtemp()
+    try:
+        shazar_main.shazar(argparse.Namespace(source=args.source, output_dir=previous_dir, jobs=args.jobs,
+                                              compression_level=args.compression_level, reproducible=False,
+                                              previous_archive=None))
+        [previous_archive] = os.listdir(previous_dir)
+        with open(os.path.join(args.source, 'doc', 'document-1.txt'), 'r+b') as document:
+            document.write(b'changed')
+
+        started_at = time.monotonic()
+        shazar_main.shazar(argparse.Namespace(source=args.source, output_dir=args.output_dir, jobs=args.jobs,
+                                              compression_level=args.compression_level, reproducible=False,
+                                              previous_archive=os.path.join(previous_dir, previous_archive)))
+        return time.monotonic() - started_at
+    finally:
+        shutil.rmtree(previous_dir)
+
+
+def io_counters():
+    try:
+        with open('/proc/self/io', 'r') as io_file:
+            counters = dict([line.split(': ') for line in io_file.read().splitlines()])
+        return int(counters['syscr']), int(counters['syscw'])
+    except (OSError, KeyError):
+        return None
+
+
+def measure(package, bundle_dir, output_dir, jobs):
+    counters_before = io_counters()
+    started_at = time.monotonic()
+    # Packaging functions may return the time taken by the packaging being measured, excluding their preparation
+    package_elapsed = package(argparse.Namespace(source=bundle_dir, output_dir=output_dir, jobs=jobs,
+                                                 compression_level=shazar_main.DEFAULT_COMPRESSION_LEVEL,
+                                                 reproducible=False, previous_archive=None))
+    elapsed = time.monotonic() - started_at if package_elapsed is None else package_elapsed
+    counters_after = io_counters()
+
+    [archive_name] = os.listdir(output_dir)
+    archive_size = os.path.getsize(os.path.join(output_dir, archive_name))
+    os.remove(os.path.join(output_dir, archive_name))
+
+    if counters_before is None or counters_after is None:
+        return elapsed, archive_size, '-', '-'
+    else:
+        return elapsed, archive_size, counters_after[0] - counters_before[0], counters_after[1] - counters_before[1]
+
+
+def run(sizes_mb):
+    logging_setup.configure_logging(argparse.Namespace(quiet=True))
+    cpu_count = os.cpu_count()
+    print('{: >8} {: >20} {: >9} {: >9} {: >10} {: >10}'.format('size', 'shazar', 'time', 'archive', 'reads', 'writes'))
+    for size_mb in sizes_mb:
+        with tempfile.TemporaryDirectory() as directory:
+            bundle_dir = create_bundle_dir(directory, size_mb * MB)
+            output_dir = os.path.join(directory, 'output')
+            os.makedirs(output_dir)
+            for name, package, jobs in [('stored, re-read', legacy_shazar, 1),
+                                        ('deflate every file', deflating_shazar, 1),
+                                        ('jobs=1', shazar_main.shazar, 1),
+                                        ('jobs={}'.format(cpu_count), shazar_main.shazar, cpu_count),
+                                        ('previous archive', incremental_shazar, 1)]:
+                elapsed, archive_size, reads, writes = measure(package, bundle_dir, output_dir, jobs)
+                print('{: >5} MB {: >20} {: >8.2f}s {: >6} MB {: >10} {: >10}'.format(
+                    size_mb, name, elapsed, archive_size // MB, reads, writes))
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES_MB)
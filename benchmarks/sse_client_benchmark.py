@@ -0,0 +1,90 @@
+"""
+Replays a recorded stream of bundle events through the character-at-a-time SSE parser that `sse_client.Client` used
+to have, and through the current chunk based parser.
+
+Usage, from the project root: python -m benchmarks.sse_client_benchmark [number of events]
+"""
+from conductr_cli import sse_client
+import re
+import sys
+import timeit
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+DEFAULT_NR_OF_EVENTS = 5000
+REPEAT = 3
+
+
+def recorded_stream(nr_of_events):
+    events = []
+    for i in range(nr_of_events):
+        event_name = 'bundleExecutionAdded' if i % 2 == 0 else 'bundleExecutionRemoved'
+        data = '{{"bundleId":"45e0c477d3e5ea92aa8d85c0d8f3e25c","host":"172.17.0.{}","isStarted":true}}'.format(i % 255)
+        events.append('id:{}\nevent:{}\ndata:{}\n\n'.format(i, event_name, data))
+    return ''.join(events)
+
+
+class ReplayedStream:
+    """
+    Mimics `requests.Response.iter_content` for a streamed response: every call continues from where the previous
+    iteration stopped reading.
+    """
+    def __init__(self, stream, status_code=200):
+        self.stream = stream
+        self.status_code = status_code
+        self.encoding = None
+        self.pos = 0
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        while self.pos < len(self.stream):
+            chunk = self.stream[self.pos:self.pos + chunk_size]
+            self.pos += len(chunk)
+            yield chunk
+
+
+def legacy_parse(stream):
+    """The parser previously found in `sse_client.Client.__next__`, one fresh generator per character."""
+    end_of_field = re.compile(r'\r\n\r\n|\r\r|\n\n')
+    response = ReplayedStream(stream)
+    events = []
+    last_event_id = None
+    try:
+        while True:
+            buf = ''
+            while re.search(end_of_field, buf) is None:
+                buf += next(response.iter_content(decode_unicode=True))
+            event = sse_client.parse_event(re.split(end_of_field, buf)[0])
+            last_event_id = event.id if event.id is not None else last_event_id
+            event.id = last_event_id
+            events.append(event)
+    except StopIteration:
+        return events
+
+
+def chunked_parse(stream):
+    # The server ends the replay by asking the client not to reconnect
+    responses = [ReplayedStream(stream), ReplayedStream('', status_code=204)]
+    with patch('conductr_cli.http.get', MagicMock(side_effect=responses)), \
+            patch('time.sleep'):
+        return list(sse_client.get_events('http://127.0.0.1:9005/bundles/events'))
+
+
+def run(nr_of_events):
+    stream = recorded_stream(nr_of_events)
+    assert legacy_parse(stream) == chunked_parse(stream)
+
+    print('Replaying {} events ({} bytes), best of {}'.format(nr_of_events, len(stream), REPEAT))
+    for name, parser in [('legacy', legacy_parse), ('chunked', chunked_parse)]:
+        elapsed = min(timeit.repeat(lambda: parser(stream), number=1, repeat=REPEAT))
+        print('{: <8} {:8.3f}s {:10.0f} events/s'.format(name, elapsed, nr_of_events / elapsed))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NR_OF_EVENTS)
@@ -1,10 +1,29 @@
 from zipfile import ZipFile
+import os
+import re
+
+
+# Bundles and configurations created by shazar are named after the SHA-256 digest of their content
+DIGEST_PATTERN = re.compile(r'-([a-f0-9]{64})\.zip$')
 
 
 def short_id(bundle_id):
     return '-'.join([part[:7] for part in bundle_id.split('-')])
 
 
+def digest(bundle_path):
+    match = DIGEST_PATTERN.search(os.path.basename(bundle_path))
+    return match.group(1) if match else None
+
+
+def bundle_id(bundle_digest, configuration_digest=None):
+    # ConductR identifies a bundle by the first 32 characters of its digest and of its configuration digest, if any
+    if configuration_digest is None:
+        return bundle_digest[:32]
+    else:
+        return '{}-{}'.format(bundle_digest[:32], configuration_digest[:32])
+
+
 def conf(bundle_path):
     bundle_zip = ZipFile(bundle_path)
     bundle_configuration = [bundle_zip.read(name) for name in bundle_zip.namelist() if name.endswith('bundle.conf')]
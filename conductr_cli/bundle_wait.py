@@ -0,0 +1,131 @@
+from conductr_cli import conduct_url, constants, sse_client
+from conductr_cli.exceptions import WaitTimeoutError
+import logging
+import queue
+import threading
+import time
+
+
+# The socket read timeout is derived from the remaining wait time, but is never set lower than this many seconds.
+MIN_READ_TIMEOUT = 1
+
+
+class Deadline:
+    """
+    Point in time, measured with a monotonic clock, by which a wait has to be completed.
+    """
+    def __init__(self, timeout):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def has_expired(self):
+        return self.remaining() <= 0
+
+    def read_timeout(self):
+        return max(MIN_READ_TIMEOUT, self.remaining())
+
+
+class EventReader:
+    """
+    Iterates bundle events on a background thread, so events can be awaited up to a deadline even when the cluster
+    doesn't send anything.
+    """
+    END_OF_EVENTS = object()
+
+    def __init__(self, events):
+        self.events = events
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.read_events, daemon=True)
+        self.thread.start()
+
+    def read_events(self):
+        try:
+            for event in self.events:
+                self.queue.put(event)
+            self.queue.put(self.END_OF_EVENTS)
+        except Exception as err:
+            self.queue.put(err)
+
+    def next_event(self, timeout):
+        """
+        Returns the next event, or `END_OF_EVENTS` when the stream has ended.
+        Raises `queue.Empty` if no event arrives within `timeout` seconds.
+        """
+        event = self.queue.get(timeout=timeout)
+        if isinstance(event, Exception):
+            raise event
+        return event
+
+    def close(self):
+        close = getattr(self.events, 'close', None)
+        if close is not None:
+            close()
+
+
+def wait_for_events(args, cluster_state, event_prefix, is_condition_met, timeout_message):
+    """
+    Waits on the bundle events stream until `is_condition_met` returns True.
+    Events whose name starts with `event_prefix` are applied to `cluster_state` in batches: once such an event
+    arrives, all events already received and those arriving within `constants.wait_event_window()` seconds are applied
+    together, so a burst of events results in at most one refresh of the state. The condition is checked after each
+    batch.
+    Raises `WaitTimeoutError` with `timeout_message` as soon as `args.wait_timeout` seconds have elapsed or the
+    stream has ended, whichever comes first.
+    """
+    deadline = Deadline(args.wait_timeout)
+    if deadline.has_expired():
+        raise WaitTimeoutError(timeout_message)
+
+    bundle_events_url = conduct_url.url('bundles/events', args)
+    reader = EventReader(sse_client.get_events(bundle_events_url, deadline.read_timeout))
+    try:
+        while True:
+            try:
+                event = reader.next_event(deadline.remaining())
+            except queue.Empty:
+                raise WaitTimeoutError(timeout_message)
+
+            if event is EventReader.END_OF_EVENTS or deadline.has_expired():
+                raise WaitTimeoutError(timeout_message)
+
+            if is_relevant(event, event_prefix):
+                events, has_ended = next_events(reader, deadline, event_prefix)
+                cluster_state.update([event] + events)
+                if is_condition_met():
+                    return
+                elif has_ended:
+                    raise WaitTimeoutError(timeout_message)
+    finally:
+        reader.close()
+        log_event_counts(cluster_state)
+
+
+def next_events(reader, deadline, event_prefix):
+    """
+    Returns the relevant events received within the event window, and whether the stream has ended meanwhile.
+    """
+    window = Deadline(min(constants.wait_event_window(), deadline.remaining()))
+    events = []
+    while True:
+        try:
+            event = reader.next_event(window.remaining())
+        except queue.Empty:
+            return events, False
+
+        if event is EventReader.END_OF_EVENTS:
+            return events, True
+        elif is_relevant(event, event_prefix):
+            events.append(event)
+
+
+def is_relevant(event, event_prefix):
+    return event.event and event.event.startswith(event_prefix)
+
+
+def log_event_counts(cluster_state):
+    log = logging.getLogger(__name__)
+    if log.is_verbose_enabled():
+        log.verbose('Applied {} bundle events, {} requests for bundles saved'.format(
+            cluster_state.event_count, cluster_state.saved_refresh_count))
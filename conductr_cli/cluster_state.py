@@ -0,0 +1,98 @@
+from conductr_cli import conduct_url, http
+import json
+import logging
+
+
+BUNDLE_COLLECTIONS = ['bundleInstallations', 'bundleExecutions']
+
+
+class ClusterState:
+    """
+    In-memory view of the bundles within the cluster, indexed by bundle id.
+
+    The state is seeded from a single `/bundles` request, and then kept current from the payload of bundle events.
+    Only when an event can't be applied to the state are the bundles requested again.
+
+    The state keeps count of the events received, and of the `/bundles` requests saved compared to requesting the
+    bundles for every event.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.bundles = {}
+        self.refresh_count = 0
+        self.event_count = 0
+        self.saved_refresh_count = 0
+
+    def refresh(self):
+        bundles_url = conduct_url.url('bundles', self.args)
+        response = http.get(bundles_url)
+        response.raise_for_status()
+        self.bundles = dict([(bundle['bundleId'], bundle) for bundle in json.loads(response.text)])
+        self.refresh_count += 1
+
+    def update(self, events):
+        """
+        Applies a batch of events to the state.
+        The bundles are requested at most once, if any of the events can't be applied.
+        """
+        unapplied_events = [event for event in events if not self.apply(event)]
+        self.event_count += len(events)
+        self.saved_refresh_count += len(events) - len(unapplied_events)
+        if unapplied_events:
+            log = logging.getLogger(__name__)
+            log.debug('Unable to apply {} events to the cluster state, refreshing bundles'.format(len(unapplied_events)))
+            self.refresh()
+            self.saved_refresh_count += len(unapplied_events) - 1
+
+    def apply(self, event):
+        """
+        Applies the bundle, or list of bundles, carried as JSON in the event data.
+        Returns False if the event doesn't carry enough information to update the state.
+        """
+        try:
+            payload = json.loads(event.data) if event.data else None
+        except ValueError:
+            return False
+
+        bundles = payload if isinstance(payload, list) else [payload]
+        if not bundles or not all([self.is_applicable(bundle) for bundle in bundles]):
+            return False
+
+        for bundle in bundles:
+            if bundle['bundleId'] in self.bundles:
+                self.bundles[bundle['bundleId']].update(bundle)
+            else:
+                self.bundles[bundle['bundleId']] = bundle
+
+        return True
+
+    def is_applicable(self, bundle):
+        if not isinstance(bundle, dict) or 'bundleId' not in bundle:
+            return False
+        elif bundle['bundleId'] in self.bundles:
+            return any([collection in bundle for collection in BUNDLE_COLLECTIONS])
+        else:
+            return all([collection in bundle for collection in BUNDLE_COLLECTIONS])
+
+    def bundle(self, bundle_id):
+        return self.bundles.get(bundle_id)
+
+    def count_installations(self, bundle_id):
+        bundle = self.bundle(bundle_id)
+        if bundle is not None and 'bundleInstallations' in bundle:
+            return len(bundle['bundleInstallations'])
+        else:
+            return 0
+
+    def get_scale(self, bundle_id):
+        bundle = self.bundle(bundle_id)
+        if bundle is not None and 'bundleExecutions' in bundle:
+            return len([execution for execution in bundle['bundleExecutions'] if execution['isStarted']])
+        else:
+            return 0
+
+
+def fetch(args):
+    cluster_state = ClusterState(args)
+    cluster_state.refresh()
+    return cluster_state
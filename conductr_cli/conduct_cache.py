@@ -0,0 +1,59 @@
+from conductr_cli import constants, resolve_cache, screen_utils
+from conductr_cli.resolve_cache import DAY, MEGABYTE
+import arrow
+import logging
+
+
+def ls(args):
+    """`conduct cache ls` command"""
+
+    log = logging.getLogger(__name__)
+    data = [
+        {
+            'digest': cached_file.digest[:7],
+            'name': cached_file.name,
+            'size': screen_utils.size(cached_file.size),
+            'accessed': arrow.get(cached_file.accessed).to('local').strftime('%Y-%m-%d %H:%M')
+        } for cached_file in reversed(resolve_cache.cached_files(args.resolve_cache_dir))
+    ]
+    data.insert(0, {'digest': 'DIGEST', 'name': 'NAME', 'size': 'SIZE', 'accessed': 'ACCESSED'})
+
+    padding = 2
+    column_widths = dict(screen_utils.calc_column_widths(data), **{'padding': ' ' * padding})
+    for row in data:
+        log.screen('''\
+{digest: <{digest_width}}{padding}\
+{name: <{name_width}}{padding}\
+{size: >{size_width}}{padding}\
+{accessed: <{accessed_width}}'''.format(**dict(row, **column_widths)).rstrip())
+
+    return True
+
+
+def prune(args):
+    """`conduct cache prune` command"""
+
+    log = logging.getLogger(__name__)
+    max_size = constants.resolve_cache_max_size() if args.max_size is None else args.max_size
+    max_age = constants.resolve_cache_max_age() if args.max_age is None else args.max_age
+    removed = resolve_cache.prune(args.resolve_cache_dir, max_size * MEGABYTE, max_age * DAY)
+    log.info('Removed {} files, {} freed'.format(len(removed),
+                                                 screen_utils.size(sum([cached_file.size for cached_file in removed]))))
+    return True
+
+
+def stats(args):
+    """`conduct cache stats` command"""
+
+    log = logging.getLogger(__name__)
+    files = resolve_cache.cached_files(args.resolve_cache_dir)
+    counters = resolve_cache.stats(args.resolve_cache_dir)
+    hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+    hit_ratio = '{:.0f}%'.format(hits * 100 / (hits + misses)) if hits + misses > 0 else '-'
+
+    log.screen('Files:     {}'.format(len(files)))
+    log.screen('Size:      {}'.format(screen_utils.size(sum([cached_file.size for cached_file in files]))))
+    log.screen('Hits:      {}'.format(hits))
+    log.screen('Misses:    {}'.format(misses))
+    log.screen('Hit ratio: {}'.format(hit_ratio))
+    return True
@@ -1,7 +1,6 @@
-from conductr_cli import validation, conduct_url, screen_utils
+from conductr_cli import validation, conduct_url, screen_utils, http
 import json
 import logging
-import requests
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 from urllib.parse import quote_plus
 
@@ -13,7 +12,7 @@ def events(args):
 
     log = logging.getLogger(__name__)
     request_url = conduct_url.url('bundles/{}/events?count={}'.format(quote_plus(args.bundle), args.lines), args)
-    response = requests.get(request_url, timeout=DEFAULT_HTTP_TIMEOUT)
+    response = http.get(request_url, timeout=DEFAULT_HTTP_TIMEOUT)
     validation.raise_for_status_inc_3xx(response)
 
     data = [
@@ -1,17 +1,21 @@
 from pyhocon import ConfigFactory, ConfigTree
 from pyhocon.exceptions import ConfigMissingException
-from conductr_cli import bundle_utils, conduct_url, validation
+from conductr_cli import bundle_utils, conduct_url, logging_setup, validation, http, multipart, screen_utils
 from conductr_cli.exceptions import MalformedBundleError
-from conductr_cli import resolver, bundle_installation
+from conductr_cli import resolver, bundle_installation, cluster_state
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 import json
 import logging
-import requests
+import time
 
 
 LOAD_HTTP_TIMEOUT = 30
 
+# Minimum number of seconds between updates of the upload progress
+UPLOAD_PROGRESS_INTERVAL = 0.2
+
 
 @validation.handle_connection_error
 @validation.handle_http_error
@@ -32,15 +36,12 @@ def load(args):
 def load_v1(args):
     log = logging.getLogger(__name__)
 
-    log.info('Retrieving bundle...')
-    custom_settings = args.custom_settings
-    resolve_cache_dir = args.resolve_cache_dir
-    bundle_name, bundle_file = resolver.resolve_bundle(custom_settings, resolve_cache_dir, args.bundle)
+    (bundle_name, bundle_file), (configuration_name, configuration_file) = resolve_bundle_and_configuration(args)
 
-    configuration_name, configuration_file = (None, None)
-    if args.configuration is not None:
-        log.info('Retrieving configuration...')
-        configuration_name, configuration_file = resolver.resolve_bundle(custom_settings, resolve_cache_dir, args.configuration)
+    loaded_bundle_id = find_loaded_bundle(args, bundle_file, configuration_file)
+    if loaded_bundle_id is not None:
+        log.info('Bundle already loaded, skipping upload. Use --force to upload it anyway.')
+        return complete_load(args, loaded_bundle_id)
 
     bundle_conf = ConfigFactory.parse_string(bundle_utils.conf(bundle_file))
     overlay_bundle_conf = None if configuration_file is None else \
@@ -54,29 +55,80 @@ def load_v1(args):
         files.append(('configuration', (configuration_name, open(configuration_file, 'rb'))))
 
     log.info('Loading bundle to ConductR...')
-    response = requests.post(url, files=files, timeout=LOAD_HTTP_TIMEOUT)
+    response = post_files(url, files)
     validation.raise_for_status_inc_3xx(response)
 
     if log.is_verbose_enabled():
         log.verbose(validation.pretty_json(response.text))
 
     response_json = json.loads(response.text)
-    bundle_id = response_json['bundleId'] if args.long_ids else bundle_utils.short_id(response_json['bundleId'])
+    return complete_load(args, response_json['bundleId'])
+
+
+def resolve_bundle_and_configuration(args):
+    """
+    Resolves the bundle and the optional configuration, returning the name and file of each. The configuration is
+    resolved on another thread at the same time as the bundle, so it doesn't add to the time taken by the bundle.
+    """
+    log = logging.getLogger(__name__)
+    custom_settings = args.custom_settings
+    resolve_cache_dir = args.resolve_cache_dir
+    offline = args.offline
+
+    log.info('Retrieving bundle...')
+    if args.configuration is None:
+        return resolver.resolve_bundle(custom_settings, resolve_cache_dir, args.bundle, offline), (None, None)
+
+    log.info('Retrieving configuration...')
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        configuration = executor.submit(resolver.resolve_bundle, custom_settings, resolve_cache_dir, args.configuration,
+                                        offline)
+        bundle = resolver.resolve_bundle(custom_settings, resolve_cache_dir, args.bundle, offline)
+        return bundle, configuration.result()
+
+
+def complete_load(args, bundle_id):
+    log = logging.getLogger(__name__)
 
     if not args.no_wait:
-        bundle_installation.wait_for_installation(response_json['bundleId'], args)
+        bundle_installation.wait_for_installation(bundle_id, args)
 
+    display_bundle_id = bundle_id if args.long_ids else bundle_utils.short_id(bundle_id)
     log.info('Bundle loaded.')
-    log.info('Start bundle with: conduct run{} {}'.format(args.cli_parameters, bundle_id))
-    log.info('Unload bundle with: conduct unload{} {}'.format(args.cli_parameters, bundle_id))
+    log.info('Start bundle with: conduct run{} {}'.format(args.cli_parameters, display_bundle_id))
+    log.info('Unload bundle with: conduct unload{} {}'.format(args.cli_parameters, display_bundle_id))
     log.info('Print ConductR info with: conduct info{}'.format(args.cli_parameters))
 
     if not log.is_info_enabled() and log.is_quiet_enabled():
-        log.quiet(response_json['bundleId'])
+        log.quiet(bundle_id)
 
     return True
 
 
+def find_loaded_bundle(args, bundle_file, configuration_file):
+    """
+    Returns the id of the bundle loaded from the same bundle and configuration files, or None if there's no such bundle
+    or if the upload is forced.
+    Files are identified by the digest within their file name, so only bundles and configurations created by shazar
+    are looked up. As a bundle id is made of the digest prefixes of the bundle and configuration, the bundle is found
+    without reading the files.
+    """
+    if args.force:
+        return None
+
+    bundle_digest = bundle_utils.digest(bundle_file)
+    configuration_digest = None if configuration_file is None else bundle_utils.digest(configuration_file)
+    if bundle_digest is None or (configuration_file is not None and configuration_digest is None):
+        return None
+
+    bundle_id = bundle_utils.bundle_id(bundle_digest, configuration_digest)
+    bundle = cluster_state.fetch(args).bundle(bundle_id)
+    if bundle is not None and bundle.get('bundleDigest') == bundle_digest:
+        return bundle_id
+    else:
+        return None
+
+
 def apply_to_configurations(base_conf, overlay_conf, method, key):
     if overlay_conf is None:
         return method(base_conf, key)
@@ -87,6 +139,44 @@ def apply_to_configurations(base_conf, overlay_conf, method, key):
             return method(base_conf, key)
 
 
+def post_files(url, files):
+    log = logging.getLogger(__name__)
+    # The multipart body is streamed from the files as it is sent, rather than built in memory upfront
+    body = multipart.MultipartEncoder(files, on_read=show_upload_progress(log))
+    with logging_setup.progress_line():
+        return http.post(url, data=body, headers={'Content-Type': body.content_type}, timeout=LOAD_HTTP_TIMEOUT)
+
+
+def show_upload_progress(log):
+    started_at = time.monotonic()
+    shown_at = None
+
+    def continue_logging(sent_size, total_size):
+        nonlocal shown_at
+        now = time.monotonic()
+        elapsed = now - started_at
+        throughput = sent_size / elapsed if elapsed > 0 else 0
+        is_upload_complete = sent_size >= total_size
+
+        if log.is_progress_enabled() and \
+                (is_upload_complete or shown_at is None or now - shown_at >= UPLOAD_PROGRESS_INTERVAL):
+            shown_at = now
+            eta = screen_utils.duration((total_size - sent_size) / throughput) if throughput > 0 else '-:--'
+            log.progress('{} {}/{} {}/s ETA {}'.format(screen_utils.progress_bar(sent_size, total_size),
+                                                       screen_utils.size(sent_size),
+                                                       screen_utils.size(total_size),
+                                                       screen_utils.size(throughput),
+                                                       eta),
+                         flush=is_upload_complete)
+
+        if is_upload_complete:
+            log.info('Uploaded {} in {} ({}/s)'.format(screen_utils.size(total_size),
+                                                       screen_utils.duration(elapsed),
+                                                       screen_utils.size(throughput)))
+
+    return continue_logging
+
+
 def get_payload(bundle_name, bundle_file, bundle_configuration):
     return [
         ('nrOfCpus', bundle_configuration(ConfigTree.get_string, 'nrOfCpus')),
@@ -102,22 +192,21 @@ def get_payload(bundle_name, bundle_file, bundle_configuration):
 def load_v2(args):
     log = logging.getLogger(__name__)
 
-    log.info('Retrieving bundle...')
-    custom_settings = args.custom_settings
-    resolve_cache_dir = args.resolve_cache_dir
-    bundle_name, bundle_file = resolver.resolve_bundle(custom_settings, resolve_cache_dir, args.bundle)
+    (bundle_name, bundle_file), (configuration_name, configuration_file) = resolve_bundle_and_configuration(args)
     bundle_conf = bundle_utils.zip_entry('bundle.conf', bundle_file)
 
     if bundle_conf is None:
         raise MalformedBundleError('Unable to find bundle.conf within the bundle file')
     else:
-        configuration_name, configuration_file, bundle_conf_overlay = (None, None, None)
-        if args.configuration is not None:
-            log.info('Retrieving configuration...')
-            configuration_name, configuration_file = resolver.resolve_bundle(custom_settings, resolve_cache_dir,
-                                                                             args.configuration)
+        bundle_conf_overlay = None
+        if configuration_file is not None:
             bundle_conf_overlay = bundle_utils.zip_entry('bundle.conf', configuration_file)
 
+        loaded_bundle_id = find_loaded_bundle(args, bundle_file, configuration_file)
+        if loaded_bundle_id is not None:
+            log.info('Bundle already loaded, skipping upload. Use --force to upload it anyway.')
+            return complete_load(args, loaded_bundle_id)
+
         files = [('bundleConf', ('bundle.conf', bundle_conf))]
         if bundle_conf_overlay is not None:
             files.append(('bundleConfOverlay', ('bundle.conf', bundle_conf_overlay)))
@@ -128,24 +217,11 @@ def load_v2(args):
         url = conduct_url.url('bundles', args)
 
         log.info('Loading bundle to ConductR...')
-        response = requests.post(url, files=files, timeout=LOAD_HTTP_TIMEOUT)
+        response = post_files(url, files)
         validation.raise_for_status_inc_3xx(response)
 
         if log.is_verbose_enabled():
             log.verbose(validation.pretty_json(response.text))
 
         response_json = json.loads(response.text)
-        bundle_id = response_json['bundleId'] if args.long_ids else bundle_utils.short_id(response_json['bundleId'])
-
-        if not args.no_wait:
-            bundle_installation.wait_for_installation(response_json['bundleId'], args)
-
-        log.info('Bundle loaded.')
-        log.info('Start bundle with: conduct run{} {}'.format(args.cli_parameters, bundle_id))
-        log.info('Unload bundle with: conduct unload{} {}'.format(args.cli_parameters, bundle_id))
-        log.info('Print ConductR info with: conduct info{}'.format(args.cli_parameters))
-
-        if not log.is_info_enabled() and log.is_quiet_enabled():
-            log.quiet(response_json['bundleId'])
-
-    return True
+        return complete_load(args, response_json['bundleId'])
@@ -3,11 +3,12 @@ import argparse
 from conductr_cli import \
     conduct_info, conduct_load, conduct_run, conduct_services,\
     conduct_stop, conduct_unload, conduct_version, conduct_logs,\
-    conduct_events, host, logging_setup
+    conduct_events, conduct_cache, host, logging_setup
 from conductr_cli.constants import \
     DEFAULT_PORT, DEFAULT_API_VERSION, DEFAULT_CLI_SETTINGS_DIR,\
     DEFAULT_CUSTOM_SETTINGS_FILE, DEFAULT_CUSTOM_PLUGINS_DIR,\
-    DEFAULT_BUNDLE_RESOLVE_CACHE_DIR, DEFAULT_WAIT_TIMEOUT
+    DEFAULT_BUNDLE_RESOLVE_CACHE_DIR, DEFAULT_WAIT_TIMEOUT,\
+    DEFAULT_RESOLVE_CACHE_MAX_SIZE, DEFAULT_RESOLVE_CACHE_MAX_AGE
 from pyhocon import ConfigFactory
 import os
 import sys
@@ -99,6 +100,7 @@ def add_quiet_flag(sub_parser):
 
 def add_wait_timeout(sub_parser):
     sub_parser.add_argument('--wait-timeout',
+                            type=int,
                             help='Timeout in seconds waiting for bundle scale to be achieved in conduct run, '
                                  'or bundle to be stopped in conduct stop, defaults to {}'.format(DEFAULT_WAIT_TIMEOUT),
                             default=DEFAULT_WAIT_TIMEOUT,
@@ -126,6 +128,12 @@ def add_default_arguments(sub_parser):
     add_custom_plugins_dir(sub_parser)
 
 
+def add_cache_arguments(sub_parser):
+    add_verbose(sub_parser)
+    add_quiet_flag(sub_parser)
+    add_bundle_resolve_cache_dir(sub_parser)
+
+
 def build_parser():
     # Main argument parser
     parser = argparse.ArgumentParser('conduct')
@@ -162,6 +170,18 @@ def build_parser():
     add_bundle_resolve_cache_dir(load_parser)
     add_wait_timeout(load_parser)
     add_no_wait(load_parser)
+    load_parser.add_argument('--force',
+                             help='Uploads the bundle even if the same bundle and configuration are already loaded',
+                             default=False,
+                             dest='force',
+                             action='store_true')
+    load_parser.add_argument('--offline',
+                             help='Resolves the bundle and configuration from local files and the cache only, without '
+                                  'contacting remote repositories such as Bintray. May also be enabled by setting '
+                                  '`offline = true` in the custom settings file',
+                             default=False,
+                             dest='offline',
+                             action='store_true')
     load_parser.set_defaults(func=conduct_load.load)
 
     # Sub-parser for `run` sub-command
@@ -237,6 +257,39 @@ def build_parser():
                              help='The ID or name of the bundle')
     logs_parser.set_defaults(func=conduct_logs.logs)
 
+    # Sub-parser for `cache` sub-command
+    cache_parser = subparsers.add_parser('cache',
+                                         help='manage the cache of resolved bundles')
+    cache_subparsers = cache_parser.add_subparsers(title='cache commands',
+                                                   help='Use one of the following cache sub commands')
+
+    cache_ls_parser = cache_subparsers.add_parser('ls',
+                                                  help='list the cached bundles, most recently used first')
+    add_cache_arguments(cache_ls_parser)
+    cache_ls_parser.set_defaults(func=conduct_cache.ls, local_only=True)
+
+    cache_prune_parser = cache_subparsers.add_parser('prune',
+                                                     help='remove the least recently used bundles')
+    add_cache_arguments(cache_prune_parser)
+    cache_prune_parser.add_argument('--max-size',
+                                    type=int,
+                                    help='The size in MB the cache is reduced to, defaults to '
+                                         '$CONDUCTR_RESOLVE_CACHE_MAX_SIZE or {}'.format(
+                                             DEFAULT_RESOLVE_CACHE_MAX_SIZE),
+                                    dest='max_size')
+    cache_prune_parser.add_argument('--max-age',
+                                    type=int,
+                                    help='The number of days after which unused bundles are removed, '
+                                         'defaults to $CONDUCTR_RESOLVE_CACHE_MAX_AGE or {}'.format(
+                                             DEFAULT_RESOLVE_CACHE_MAX_AGE),
+                                    dest='max_age')
+    cache_prune_parser.set_defaults(func=conduct_cache.prune, local_only=True)
+
+    cache_stats_parser = cache_subparsers.add_parser('stats',
+                                                     help='print the size of the cache and its hit and miss counts')
+    add_cache_arguments(cache_stats_parser)
+    cache_stats_parser.set_defaults(func=conduct_cache.stats, local_only=True)
+
     return parser
 
 
@@ -273,8 +326,10 @@ def run():
         if custom_plugins_dir:
             sys.path.append(custom_plugins_dir)
 
-        # Resolve default ip if the --ip argument hasn't been specified
-        if not vars(args).get('ip'):
+        # Resolve default ip if the --ip argument hasn't been specified, unless the command doesn't connect to ConductR
+        if vars(args).get('local_only'):
+            pass
+        elif not vars(args).get('ip'):
             # Returns None if an error has occurred
             args.ip = host.resolve_default_ip()
             if not args.ip:
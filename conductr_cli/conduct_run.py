@@ -1,8 +1,7 @@
-from conductr_cli import bundle_utils, conduct_url, validation
+from conductr_cli import bundle_utils, conduct_url, validation, http
 from conductr_cli import bundle_scale
 import json
 import logging
-import requests
 
 
 @validation.handle_connection_error
@@ -22,7 +21,7 @@ def run(args):
         path = 'bundles/{}?scale={}'.format(args.bundle, args.scale)
 
     url = conduct_url.url(path, args)
-    response = requests.put(url)
+    response = http.put(url)
     validation.raise_for_status_inc_3xx(response)
 
     if log.is_verbose_enabled():
@@ -1,7 +1,6 @@
-from conductr_cli import bundle_utils, conduct_url, validation, screen_utils
+from conductr_cli import bundle_utils, conduct_url, validation, screen_utils, http
 import json
 import logging
-import requests
 from urllib.parse import urlparse
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 
@@ -13,7 +12,7 @@ def services(args):
 
     log = logging.getLogger(__name__)
     url = conduct_url.url('bundles', args)
-    response = requests.get(url, timeout=DEFAULT_HTTP_TIMEOUT)
+    response = http.get(url, timeout=DEFAULT_HTTP_TIMEOUT)
     validation.raise_for_status_inc_3xx(response)
 
     if log.is_verbose_enabled():
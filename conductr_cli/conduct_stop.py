@@ -1,6 +1,5 @@
-from conductr_cli import bundle_utils, conduct_url, validation, bundle_scale
+from conductr_cli import bundle_utils, conduct_url, validation, bundle_scale, http
 import json
-import requests
 import logging
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 
@@ -14,7 +13,7 @@ def stop(args):
     log = logging.getLogger(__name__)
     path = 'bundles/{}?scale=0'.format(args.bundle)
     url = conduct_url.url(path, args)
-    response = requests.put(url, timeout=DEFAULT_HTTP_TIMEOUT)
+    response = http.put(url, timeout=DEFAULT_HTTP_TIMEOUT)
     validation.raise_for_status_inc_3xx(response)
 
     if log.is_verbose_enabled():
@@ -1,7 +1,6 @@
-from conductr_cli import conduct_url, validation, bundle_installation
+from conductr_cli import conduct_url, validation, bundle_installation, http
 import json
 import logging
-import requests
 from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
 
 
@@ -13,7 +12,7 @@ def unload(args):
     log = logging.getLogger(__name__)
     path = 'bundles/{}'.format(args.bundle)
     url = conduct_url.url(path, args)
-    response = requests.delete(url, timeout=DEFAULT_HTTP_TIMEOUT)
+    response = http.delete(url, timeout=DEFAULT_HTTP_TIMEOUT)
     validation.raise_for_status_inc_3xx(response)
 
     if log.is_verbose_enabled():
@@ -1,3 +1,4 @@
+import logging
 import os
 
 
@@ -10,6 +11,55 @@ DEFAULT_CUSTOM_SETTINGS_FILE = os.getenv('CONDUCTR_CUSTOM_SETTINGS_FILE',
                                          '{}/settings.conf'.format(DEFAULT_CLI_SETTINGS_DIR))
 DEFAULT_CUSTOM_PLUGINS_DIR = os.getenv('CONDUCTR_CUSTOM_PLUGINS_DIR',
                                        '{}/plugins'.format(DEFAULT_CLI_SETTINGS_DIR))
+DEFAULT_BINTRAY_METADATA_CACHE_DIR = os.getenv('CONDUCTR_BINTRAY_METADATA_CACHE_DIR',
+                                               '{}/bintray'.format(DEFAULT_CLI_SETTINGS_DIR))
 DEFAULT_ERROR_LOG_FILE = os.path.abspath(os.getenv('CONDUCTR_CLI_ERROR_LOG',
                                                    '{}/errors.log'.format(DEFAULT_CLI_SETTINGS_DIR)))
 DEFAULT_WAIT_TIMEOUT = 60  # seconds
+DEFAULT_WAIT_EVENT_WINDOW = 0.2  # seconds
+DEFAULT_RESOLVE_CACHE_MAX_SIZE = 2048  # megabytes
+DEFAULT_RESOLVE_CACHE_MAX_AGE = 30  # days
+DEFAULT_BINTRAY_METADATA_TTL = 300  # seconds
+DEFAULT_DOWNLOAD_SEGMENTS = 4
+DEFAULT_BUNDLE_REPOSITORY_DIR = os.getenv('CONDUCTR_BUNDLE_REPOSITORY_DIR',
+                                          '{}/repository'.format(DEFAULT_CLI_SETTINGS_DIR))
+
+
+# Numeric settings may be overridden by environment variables, which are parsed where they're used rather than on
+# import, so that a malformed value doesn't stop every command from starting.
+
+def wait_event_window():
+    return numeric_setting('CONDUCTR_WAIT_EVENT_WINDOW', DEFAULT_WAIT_EVENT_WINDOW, float)
+
+
+def resolve_cache_max_size():
+    return numeric_setting('CONDUCTR_RESOLVE_CACHE_MAX_SIZE', DEFAULT_RESOLVE_CACHE_MAX_SIZE, int)
+
+
+def resolve_cache_max_age():
+    return numeric_setting('CONDUCTR_RESOLVE_CACHE_MAX_AGE', DEFAULT_RESOLVE_CACHE_MAX_AGE, int)
+
+
+def bintray_metadata_ttl():
+    return numeric_setting('CONDUCTR_BINTRAY_METADATA_TTL', DEFAULT_BINTRAY_METADATA_TTL, int)
+
+
+def download_segments():
+    return numeric_setting('CONDUCTR_DOWNLOAD_SEGMENTS', DEFAULT_DOWNLOAD_SEGMENTS, int)
+
+
+def numeric_setting(name, default, parse):
+    """
+    Returns the number given by the environment variable `name`, or the default if it isn't set. Falls back to the
+    default with a warning if the variable isn't a number.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+
+    try:
+        return parse(value)
+    except ValueError:
+        log = logging.getLogger(__name__)
+        log.warning('{} is set to {}, which isn\'t a number, using {} instead'.format(name, value, default))
+        return default
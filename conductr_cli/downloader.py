@@ -0,0 +1,346 @@
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from conductr_cli import constants, http
+from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
+from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
+from urllib.error import ContentTooShortError
+from urllib.parse import urlparse
+from urllib.request import urlopen
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+
+# Number of attempts to download a file over HTTP before giving up. Every attempt resumes from the data retrieved by
+# the previous ones.
+DOWNLOAD_MAX_ATTEMPTS = 5
+
+# Seconds to wait before retrying a failed download, doubled for every subsequent retry
+DOWNLOAD_RETRY_BACKOFF = 1
+
+# Seconds to wait for data from the server before the download is considered failed
+DOWNLOAD_READ_TIMEOUT = 30
+
+# Number of bytes read from the response at a time
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# Size of the buffer downloaded files are written through, so that the file is written in large blocks
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+HASH_READ_SIZE = 1024 * 1024
+
+# Files of at least this size are downloaded in segments, which are requested concurrently, from servers accepting
+# range requests. The number of segments is given by `constants.download_segments()`.
+SEGMENTED_DOWNLOAD_MIN_SIZE = 16 * 1024 * 1024
+
+# Seconds between progress updates of a download in segments
+SEGMENTED_PROGRESS_INTERVAL = 0.2
+
+# The state of a partially downloaded file, i.e. what's needed to resume its download, is kept alongside the file with
+# this suffix
+STATE_SUFFIX = '.state'
+
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-\d+/(\d+|\*)$')
+
+
+def download(url, download_path, auth=None, on_progress=None):
+    """
+    Downloads the url to `download_path`, returning the SHA-256 digest of the downloaded file.
+
+    `auth` is an optional `(username, password)` tuple, sent as basic auth with the requests of the download.
+    `on_progress` is an optional function called with the number of bytes downloaded so far and the size of the file,
+    whenever the size of the file is known. It's always called from the calling thread.
+
+    HTTP downloads are retried and resumed as described by `download_http`. Other urls, such as local files, are copied.
+    Downloads share no state besides the HTTP session, so that any number of downloads may run concurrently provided
+    they're made to different files.
+    """
+    if urlparse(url, scheme='file').scheme in ['http', 'https']:
+        return download_http(url, download_path, auth, on_progress)
+    else:
+        return copy_url(url, download_path)
+
+
+def copy_url(url, download_path):
+    digest = hashlib.sha256()
+    with urlopen(url) as source, open(download_path, 'wb', buffering=WRITE_BUFFER_SIZE) as download_file:
+        for chunk in iter(lambda: source.read(DOWNLOAD_CHUNK_SIZE), b''):
+            download_file.write(chunk)
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_http(url, download_path, auth=None, on_progress=None):
+    """
+    Downloads the url to `download_path`, retrying with an exponential backoff when the connection fails or the
+    transfer is cut short. Each attempt resumes from the data already within `download_path`, including data left
+    behind by an earlier invocation, provided the server supports range requests and the file is unchanged.
+    """
+    log = logging.getLogger(__name__)
+    attempt = 1
+    while True:
+        try:
+            return download_range(url, download_path, auth, on_progress)
+        except (ConnectionError, ChunkedEncodingError, Timeout, ContentTooShortError) as e:
+            if attempt >= DOWNLOAD_MAX_ATTEMPTS:
+                raise
+            delay = DOWNLOAD_RETRY_BACKOFF * 2 ** (attempt - 1)
+            log.warning('Retrieving {} failed, resuming in {}s: {}'.format(url, delay, e))
+            time.sleep(delay)
+            attempt += 1
+
+
+def download_range(url, download_path, auth, on_progress, segmented=True):
+    """
+    Downloads the remainder of the url to `download_path`, or the whole url if the partially downloaded file can't be
+    resumed, and returns the digest of the file. Large files are downloaded in concurrent segments if `segmented` and
+    if the server supports it.
+
+    The file is hashed as it's written, so that it doesn't have to be read again once downloaded. Only the data of a
+    resumed download which is already on disk, or a file downloaded in segments, is read to be hashed.
+
+    Raises `ContentTooShortError` if the server closes the response before all of its content is received.
+    """
+    log = logging.getLogger(__name__)
+
+    state = read_download_state(download_path)
+    if segmented and state is not None and state.get('ranges'):
+        if download_segments(url, download_path, auth, on_progress, state['validator'], state['size'], state['ranges']):
+            return hash_file(download_path).hexdigest()
+        else:
+            return restart_download(url, download_path, auth, on_progress)
+
+    validator = state['validator'] if state is not None else None
+    offset = os.path.getsize(download_path) if validator and os.path.exists(download_path) else 0
+
+    # The range is only honoured by the server if the file still has the same validator, otherwise the whole file is
+    # sent back
+    headers = {'Range': 'bytes={}-'.format(offset), 'If-Range': validator} if offset > 0 else {}
+    response = get_stream(url, auth, headers)
+    try:
+        if offset > 0 and not is_resumed(response, offset) and response.status_code in [206, 416]:
+            # The partial file doesn't fit the file on the server, so it's downloaded again from the start
+            response.close()
+            return restart_download(url, download_path, auth, on_progress)
+
+        response.raise_for_status()
+
+        content_length = response.headers.get('Content-Length')
+        if response.status_code == 206:
+            log.debug('Resuming {} from {} bytes'.format(url, offset))
+            mode = 'ab'
+            digest = hash_file(download_path)
+        else:
+            offset = 0
+            mode = 'wb'
+            digest = hashlib.sha256()
+            validator = response_validator(response)
+            total_size = int(content_length) if content_length is not None else None
+            if segmented and is_segmentable(response, validator, total_size):
+                ranges = segment_ranges(total_size, constants.download_segments())
+                # The file is preallocated, so that every segment is written in place
+                with open(download_path, 'wb') as download_file:
+                    download_file.truncate(total_size)
+                if download_segments(url, download_path, auth, on_progress, validator, total_size, ranges, response):
+                    return hash_file(download_path).hexdigest()
+                else:
+                    return restart_download(url, download_path, auth, on_progress)
+            write_download_state(download_path, validator)
+
+        total_size = offset + int(content_length) if content_length is not None else None
+        report_progress = on_progress if total_size else None
+
+        downloaded_size = offset
+        with open(download_path, mode, buffering=WRITE_BUFFER_SIZE) as download_file:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                download_file.write(chunk)
+                digest.update(chunk)
+                downloaded_size += len(chunk)
+                if report_progress:
+                    report_progress(downloaded_size, total_size)
+    finally:
+        response.close()
+
+    if total_size is not None and downloaded_size < total_size:
+        raise ContentTooShortError('Retrieved {} of {} bytes from {}'.format(downloaded_size, total_size, url), None)
+
+    remove_download_state(download_path)
+    return digest.hexdigest()
+
+
+def restart_download(url, download_path, auth, on_progress):
+    log = logging.getLogger(__name__)
+    log.debug('Unable to resume {}, retrieving it again'.format(url))
+    remove_download_state(download_path)
+    if os.path.exists(download_path):
+        os.remove(download_path)
+    return download_range(url, download_path, auth, on_progress, segmented=False)
+
+
+class Segment:
+    """
+    Byte range of a file downloaded in segments, from `start` to `end` inclusive. `position` is the offset of the next
+    byte to be downloaded.
+    """
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.position = start
+
+    def remaining(self):
+        return self.end + 1 - self.position
+
+
+def is_segmentable(response, validator, total_size):
+    # Segments are requested with `If-Range`, so that they're all guaranteed to be from the same file
+    return constants.download_segments() > 1 and \
+        response.headers.get('Accept-Ranges') == 'bytes' and \
+        validator is not None and \
+        total_size is not None and total_size >= SEGMENTED_DOWNLOAD_MIN_SIZE
+
+
+def segment_ranges(total_size, segments):
+    segment_size = -(-total_size // segments)
+    return [[start, min(start + segment_size, total_size) - 1] for start in range(0, total_size, segment_size)]
+
+
+def download_segments(url, download_path, auth, on_progress, validator, total_size, ranges, response=None):
+    """
+    Downloads the byte ranges of the url concurrently, each written in place within the preallocated `download_path`.
+    `response` is the response of a request for the whole file, which is used for the first range if given.
+
+    The ranges remaining to be downloaded are saved if a segment fails, so that the next attempt only requests those.
+    Returns False if the server hasn't honoured the range requests, e.g. as the file has changed, in which case the
+    download has to be started over.
+    """
+    log = logging.getLogger(__name__)
+
+    segments = [Segment(start, end) for start, end in ranges]
+    write_download_state(download_path, validator, total_size, ranges)
+    log.debug('Retrieving {} in {} segments'.format(url, len(segments)))
+
+    cancelled = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+        futures = [executor.submit(download_segment, url, download_path, auth, validator, segment, cancelled,
+                                   response if index == 0 else None)
+                   for index, segment in enumerate(segments)]
+        not_done = futures
+        while not_done:
+            done, not_done = wait(not_done, timeout=SEGMENTED_PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+            if any([future.exception() is not None or not future.result() for future in done]):
+                # The remaining segments are stopped, and are resumed by the next attempt
+                cancelled.set()
+            if on_progress:
+                on_progress(total_size - sum([segment.remaining() for segment in segments]), total_size)
+
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        write_download_state(download_path, validator, total_size,
+                             [[segment.position, segment.end] for segment in segments if segment.remaining() > 0])
+        raise errors[0]
+    elif not all([future.result() for future in futures]):
+        return False
+
+    remove_download_state(download_path)
+    return True
+
+
+def download_segment(url, download_path, auth, validator, segment, cancelled, response=None):
+    """
+    Downloads the segment into its place within `download_path`. Returns False if the server doesn't send the
+    requested range.
+    """
+    if response is None:
+        headers = {'Range': 'bytes={}-{}'.format(segment.position, segment.end), 'If-Range': validator}
+        response = get_stream(url, auth, headers)
+        if not is_resumed(response, segment.position):
+            response.close()
+            if response.status_code not in [200, 416]:
+                response.raise_for_status()
+            return False
+
+    try:
+        with open(download_path, 'r+b', buffering=WRITE_BUFFER_SIZE) as download_file:
+            download_file.seek(segment.position)
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if cancelled.is_set():
+                    return True
+                chunk = chunk[:segment.remaining()]
+                download_file.write(chunk)
+                segment.position += len(chunk)
+                if segment.remaining() == 0:
+                    break
+    finally:
+        response.close()
+
+    if segment.remaining() > 0:
+        raise ContentTooShortError('Retrieved {} of {} bytes from {}'.format(
+            segment.position - segment.start, segment.end + 1 - segment.start, url), None)
+    return True
+
+
+def get_stream(url, auth, headers):
+    return http.get(url, stream=True, headers=headers, auth=auth, timeout=(DEFAULT_HTTP_TIMEOUT, DOWNLOAD_READ_TIMEOUT))
+
+
+def is_resumed(response, offset):
+    match = CONTENT_RANGE_PATTERN.match(response.headers.get('Content-Range', ''))
+    return response.status_code == 206 and match is not None and int(match.group(1)) == offset
+
+
+def response_validator(response):
+    """
+    Returns the validator used to resume the download of the response, or None if the response has no validator which
+    may be used by `If-Range`. Weak ETags may not be used, as they don't guarantee the content is byte for byte the same.
+    """
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    else:
+        return response.headers.get('Last-Modified')
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_READ_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+
+def state_path(download_path):
+    return '{}{}'.format(download_path, STATE_SUFFIX)
+
+
+def read_download_state(download_path):
+    """
+    Returns the state of the partially downloaded file, i.e. its validator and, if downloaded in segments, its size and
+    the byte ranges which remain to be downloaded. Returns None if the file can't be resumed.
+    """
+    try:
+        with open(state_path(download_path), 'r', encoding='utf-8') as state_file:
+            state = json.load(state_file)
+        return state if state.get('validator') else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_download_state(download_path, validator, size=None, ranges=None):
+    if validator:
+        state = {'validator': validator}
+        if ranges is not None:
+            state.update({'size': size, 'ranges': ranges})
+        with open(state_path(download_path), 'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+    else:
+        # The download can't be resumed without a validator
+        remove_download_state(download_path)
+
+
+def remove_download_state(download_path):
+    path = state_path(download_path)
+    if os.path.exists(path):
+        os.remove(path)
@@ -1 +1,74 @@
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+import requests
+import threading
+
+
 DEFAULT_HTTP_TIMEOUT = 5
+
+# Number of hosts for which a pool of keep-alive connections is maintained
+DEFAULT_HTTP_POOL_HOSTS = 10
+
+# Number of keep-alive connections maintained per host
+DEFAULT_HTTP_POOL_SIZE = 10
+
+# Number of times a request failing to connect is retried. Requests which have reached the server are never
+# retried, as a retried `conduct load` or `conduct run` may be processed twice.
+DEFAULT_HTTP_RETRIES = 3
+DEFAULT_HTTP_RETRY_BACKOFF = 0.2  # seconds
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session():
+    retry = Retry(total=DEFAULT_HTTP_RETRIES,
+                  connect=DEFAULT_HTTP_RETRIES,
+                  read=False,
+                  redirect=False,
+                  backoff_factor=DEFAULT_HTTP_RETRY_BACKOFF)
+    adapter = HTTPAdapter(pool_connections=DEFAULT_HTTP_POOL_HOSTS,
+                          pool_maxsize=DEFAULT_HTTP_POOL_SIZE,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def session():
+    """
+    Returns the HTTP session shared by all commands, creating it on first use.
+    Connections are kept alive and reused by subsequent requests to the same host.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def request(method, url, **kwargs):
+    """
+    Sends a request using the shared session, timing out after `DEFAULT_HTTP_TIMEOUT` seconds unless a `timeout` is
+    given.
+    """
+    kwargs.setdefault('timeout', DEFAULT_HTTP_TIMEOUT)
+    return session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request('PUT', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
@@ -1,6 +1,8 @@
 from conductr_cli.ansi_colors import RED, YELLOW, UNDERLINE, ENDC
+from contextlib import contextmanager
 import logging
 import sys
+import threading
 
 # Default python log levels
 LOG_LEVEL_DEBUG = logging.DEBUG
@@ -15,6 +17,10 @@ LOG_LEVEL_PROGRESS = int(LOG_LEVEL_INFO) + 1
 LOG_LEVEL_QUIET = int((LOG_LEVEL_INFO + LOG_LEVEL_WARN) / 2)
 LOG_LEVEL_SCREEN = int(LOG_LEVEL_CRITICAL + 10)
 
+# Thread which has started the progress line shown in the terminal, until the line is flushed
+_progress_owner = None
+_progress_lock = threading.Lock()
+
 
 class ThresholdFilter(logging.Filter):
     def __init__(self, threshold):
@@ -76,9 +82,23 @@ def progress(self, message, *args, **kwargs):
     # continue as normal
     log.info('Hey')
     ```
+
+    When progress is logged from several threads at once, e.g. while resolving a bundle and its configuration, the
+    thread which started the progress line keeps it until it's flushed, or until it leaves `progress_line`. Progress
+    logged by other threads meanwhile is dropped, rather than rendered over each other on the same line, apart from
+    their flushed lines which are always shown.
     """
+    global _progress_owner
     flush_required = kwargs.pop('flush')
 
+    thread_id = threading.get_ident()
+    with _progress_lock:
+        if _progress_owner is not None and _progress_owner != thread_id:
+            if not flush_required:
+                return
+        else:
+            _progress_owner = None if flush_required else thread_id
+
     line_end = '\r'
     if flush_required:
         line_end = '\n'
@@ -86,6 +106,22 @@ def progress(self, message, *args, **kwargs):
     self.log(LOG_LEVEL_PROGRESS, '{}{}'.format(message, line_end), *args, **kwargs)
 
 
+@contextmanager
+def progress_line():
+    """
+    Releases the progress line started by the current thread on exit, should the thread stop logging progress before
+    flushing it, e.g. as it has raised an error. Progress of other threads is shown again once the line is released.
+    """
+    global _progress_owner
+    try:
+        yield
+    finally:
+        thread_id = threading.get_ident()
+        with _progress_lock:
+            if _progress_owner == thread_id:
+                _progress_owner = None
+
+
 def is_verbose_enabled(self):
     return self.isEnabledFor(LOG_LEVEL_VERBOSE)
 
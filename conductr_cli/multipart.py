@@ -0,0 +1,100 @@
+import io
+import os
+import uuid
+
+
+class MultipartEncoder:
+    """
+    File-like `multipart/form-data` body, read by `requests` as the request is sent.
+
+    `fields` is a list of `(name, value)` tuples, the same as the `files` argument of `requests.post`: `value` is
+    either a string or a `(filename, content)` tuple whose content is a string, bytes or a file opened in binary mode.
+    Files are read as the socket drains, at most `size` bytes at a time, so the body is never held in memory. Files
+    which can't be sized upfront, such as zip entries, are read into memory and are expected to be small.
+
+    The parts are encoded the same as `requests` encodes them, i.e. values without a filename are sent with their
+    field name as filename.
+
+    `on_read` is an optional function called with the number of bytes read so far and the size of the body, every time
+    part of the body has been read.
+    """
+    def __init__(self, fields, boundary=None, on_read=None):
+        self.fields = fields
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+        self.on_read = on_read
+        self.parts = None
+        self.unread_parts = None
+        self.size = None
+        self.bytes_read = 0
+
+    def __len__(self):
+        if self.size is None:
+            self.size = sum([size for _, size in self.get_parts()])
+        return self.size
+
+    def get_parts(self):
+        """
+        Returns the `(readable, size)` pairs making up the body. Files are only sized when first needed, so fields
+        may be given before anything is read from them.
+        """
+        if self.parts is None:
+            boundary = self.boundary.encode('utf-8')
+            parts = []
+            for name, value in self.fields:
+                filename, content = value if isinstance(value, tuple) else (name, value)
+                parts.append(bytes_part(b'--' + boundary + b'\r\n' + part_headers(name, filename)))
+                parts.append(content_part(content))
+                parts.append(bytes_part(b'\r\n'))
+            parts.append(bytes_part(b'--' + boundary + b'--\r\n'))
+            self.parts = parts
+        return self.parts
+
+    def read(self, size=-1):
+        if self.unread_parts is None:
+            self.unread_parts = [readable for readable, _ in self.get_parts()]
+
+        size = -1 if size is None else size
+        chunks = []
+        while self.unread_parts and size != 0:
+            chunk = self.unread_parts[0].read(size)
+            if chunk:
+                chunks.append(chunk)
+                size = size - len(chunk) if size > 0 else size
+            else:
+                self.unread_parts.pop(0)
+
+        data = b''.join(chunks)
+        if data:
+            self.bytes_read += len(data)
+            if self.on_read is not None:
+                self.on_read(self.bytes_read, len(self))
+        return data
+
+
+def part_headers(name, filename):
+    return 'Content-Disposition: form-data; {}; {}\r\n\r\n'.format(
+        header_param('name', name), header_param('filename', filename)).encode('utf-8')
+
+
+def header_param(name, value):
+    # Quoted the same as the HTML5 form submission algorithm, which is also what `requests` does
+    quoted = value.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+    return '{}="{}"'.format(name, quoted)
+
+
+def bytes_part(content):
+    return io.BytesIO(content), len(content)
+
+
+def content_part(content):
+    if isinstance(content, str):
+        return bytes_part(content.encode('utf-8'))
+    elif isinstance(content, (bytes, bytearray)):
+        return bytes_part(bytes(content))
+    else:
+        try:
+            size = os.fstat(content.fileno()).st_size - content.tell()
+            return content, size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return bytes_part(content.read())
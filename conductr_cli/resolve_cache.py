@@ -0,0 +1,403 @@
+from conductr_cli import bundle_utils, constants, downloader
+from conductr_cli.exceptions import MalformedBundleError
+from contextlib import contextmanager
+from urllib.parse import urlparse, urlunparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where the cache isn't locked
+    fcntl = None
+
+
+# Cache entries, one per resolved uri, are kept in this sub directory of the cache dir. An entry is named after the
+# SHA-256 of its uri and refers to the cached file by digest.
+URIS_DIR = 'uris'
+
+# Cached files are kept in this sub directory of the cache dir under `<digest>/<file name>`, so that the same file is
+# stored once regardless of the uris it has been resolved from.
+BLOBS_DIR = 'blobs'
+
+# Files cached by earlier versions were kept in the cache dir itself, named after the last path segment of their uri.
+# They're moved into the cache as they're looked up, and listed and pruned along with the cached files until then.
+LEGACY_FILE_SUFFIX = '.zip'
+
+# Number of files served from the cache, and of files downloaded into the cache
+STATS_FILE = 'stats.json'
+
+# Lock files, which are held while a uri is resolved or the stats are updated, are kept in this sub directory of the
+# cache dir
+LOCKS_DIR = 'locks'
+
+# Files being downloaded over HTTP are kept under the name of their uri key with this suffix, so that a download which
+# has failed is resumed by the next attempt
+PARTIAL_SUFFIX = '.part'
+
+# Temporary and partial files of downloads are removed by `prune` once they haven't been written to for this many
+# seconds, as they've been left behind by an interrupted download which hasn't been retried
+STALE_TEMP_FILE_AGE = 24 * 60 * 60
+
+MEGABYTE = 1024 * 1024
+DAY = 24 * 60 * 60
+
+_stats_lock = threading.Lock()
+
+
+class CachedFile:
+    """
+    A file within the cache, last accessed at `accessed` seconds since the epoch.
+    """
+    def __init__(self, digest, name, path, size, accessed):
+        self.digest = digest
+        self.name = name
+        self.path = path
+        self.size = size
+        self.accessed = accessed
+
+
+@contextmanager
+def lock(cache_dir, name, wait_message=None):
+    """
+    Holds an exclusive advisory lock on `name`, shared with other threads and processes using the same cache dir.
+    Blocks until the lock is released by its current holder, logging `wait_message` if the lock has to be waited for.
+    """
+    locks_dir = os.path.join(cache_dir, LOCKS_DIR)
+    lock_path = os.path.join(locks_dir, '{}.lock'.format(name))
+    while True:
+        os.makedirs(locks_dir, exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    if wait_message:
+                        log = logging.getLogger(__name__)
+                        log.info(wait_message)
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                if not is_same_file(lock_file, lock_path):
+                    # Removed by `remove_lock` while waiting for it, so that it's locked again by its new lock file
+                    continue
+            # The lock is released when the lock file is closed
+            yield
+            return
+
+
+def remove_lock(cache_dir, name):
+    """
+    Removes the lock file of `name`, unless the lock is held, so that lock files don't pile up for uris which are no
+    longer cached. Threads and processes waiting for the removed lock file lock the new one instead.
+    """
+    lock_path = os.path.join(cache_dir, LOCKS_DIR, '{}.lock'.format(name))
+    try:
+        with open(lock_path, 'r') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.remove(lock_path)
+    except (FileNotFoundError, BlockingIOError):
+        pass
+
+
+def is_same_file(lock_file, lock_path):
+    try:
+        return os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path))
+    except FileNotFoundError:
+        return False
+
+
+def lock_uri(cache_dir, uri):
+    """
+    Locks the cache entry of the uri, so that it's resolved by one process at a time.
+    """
+    return lock(cache_dir, uri_key(uri), 'Waiting for {} to be retrieved by another process'.format(uri))
+
+
+def lookup(cache_dir, uri):
+    """
+    Returns the cached file resolved from the uri, or None if the uri hasn't been resolved before.
+    """
+    try:
+        with open(entry_path(cache_dir, uri), 'r', encoding='utf-8') as entry_file:
+            entry = json.load(entry_file)
+    except (OSError, ValueError):
+        return migrate_legacy_file(cache_dir, uri, legacy_name(uri))
+
+    cached_file = blob_path(cache_dir, entry['digest'], entry['name'])
+    try:
+        record_access(cache_dir, cached_file)
+    except FileNotFoundError:
+        # Removed from the cache since the entry was written
+        return None
+    return cached_file
+
+
+def lookup_digest(cache_dir, uri, name):
+    """
+    Returns the cached file for a file named after its digest, as created by shazar, which may have been resolved from
+    another uri. Returns None if the digest isn't part of the name or if there's no such file.
+    """
+    digest = bundle_utils.digest(name)
+    if digest is None:
+        return None
+
+    cached_file = blob_path(cache_dir, digest, name)
+    try:
+        record_access(cache_dir, cached_file)
+    except FileNotFoundError:
+        return migrate_legacy_file(cache_dir, uri, name)
+
+    save_entry(cache_dir, uri, digest, name)
+    return cached_file
+
+
+def migrate_legacy_file(cache_dir, uri, name):
+    """
+    Moves the file cached as `name` by earlier versions into the cache, as resolved from the uri, returning the cached
+    file. Returns None if there's no such file, or if its name carries a digest which doesn't match its content.
+    """
+    legacy_file = os.path.join(cache_dir, name)
+    if not name.endswith(LEGACY_FILE_SUFFIX) or not os.path.isfile(legacy_file):
+        return None
+
+    try:
+        digest = file_digest(legacy_file)
+        expected_digest = bundle_utils.digest(name)
+        if expected_digest is not None and expected_digest != digest:
+            return None
+
+        cached_file = blob_path(cache_dir, digest, name)
+        os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+        os.replace(legacy_file, cached_file)
+    except FileNotFoundError:
+        # Moved meanwhile by another process looking it up
+        return None
+
+    log = logging.getLogger(__name__)
+    log.debug('Moved {} into the resolve cache'.format(legacy_file))
+    save_entry(cache_dir, uri, digest, name)
+    record_access(cache_dir, cached_file)
+    return cached_file
+
+
+def store(cache_dir, uri, name, downloaded_file, digest=None):
+    """
+    Moves a file downloaded from the uri into the cache, returning the cached file. The file is hashed unless its
+    `digest` is given, e.g. as it has been computed while downloading the file.
+    Raises `MalformedBundleError` if the name of the file carries a digest which doesn't match its content.
+    """
+    digest = digest or file_digest(downloaded_file)
+    expected_digest = bundle_utils.digest(name)
+    if expected_digest is not None and expected_digest != digest:
+        os.remove(downloaded_file)
+        raise MalformedBundleError('Digest of {} is {}, expected {} as given by its name'.format(uri, digest,
+                                                                                                 expected_digest))
+
+    cached_file = blob_path(cache_dir, digest, name)
+    os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+    os.replace(downloaded_file, cached_file)
+
+    save_entry(cache_dir, uri, digest, name)
+    update_stats(cache_dir, 'misses')
+
+    prune(cache_dir,
+          constants.resolve_cache_max_size() * MEGABYTE,
+          constants.resolve_cache_max_age() * DAY,
+          keep=cached_file)
+    return cached_file
+
+
+def cached_files(cache_dir):
+    """
+    Returns the files within the cache, including those cached by earlier versions, least recently accessed first.
+    """
+    result = legacy_files(cache_dir)
+    blobs_dir = os.path.join(cache_dir, BLOBS_DIR)
+    if not os.path.isdir(blobs_dir):
+        return result
+
+    for digest in os.listdir(blobs_dir):
+        digest_dir = os.path.join(blobs_dir, digest)
+        for name in os.listdir(digest_dir):
+            path = os.path.join(digest_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            result.append(CachedFile(digest, name, path, stat.st_size, stat.st_mtime))
+    return sorted(result, key=lambda cached_file: cached_file.accessed)
+
+
+def legacy_files(cache_dir):
+    """
+    Returns the files cached by earlier versions which haven't been moved into the cache yet. Their digest is the one
+    carried by their name, if any, as they aren't read.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    result = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not name.endswith(LEGACY_FILE_SUFFIX) or not os.path.isfile(path):
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        result.append(CachedFile(bundle_utils.digest(name) or '', name, path, stat.st_size, stat.st_mtime))
+    return result
+
+
+def prune(cache_dir, max_size, max_age, keep=None, now=None):
+    """
+    Removes the files which haven't been accessed for `max_age` seconds, then removes the least recently accessed files
+    until the cache holds at most `max_size` bytes. The `keep` file is never removed.
+    Returns the removed files.
+    """
+    now = time.time() if now is None else now
+    files = cached_files(cache_dir)
+    size = sum([cached_file.size for cached_file in files])
+
+    removed = []
+    for cached_file in files:
+        if cached_file.path == keep:
+            continue
+        elif now - cached_file.accessed > max_age or size > max_size:
+            remove(cache_dir, cached_file)
+            size -= cached_file.size
+            removed.append(cached_file)
+
+    if removed:
+        log = logging.getLogger(__name__)
+        log.debug('Removed {} files from the resolve cache {}'.format(len(removed), cache_dir))
+
+    remove_stale_temp_files(cache_dir, now)
+    return removed
+
+
+def remove(cache_dir, cached_file):
+    if os.path.normpath(os.path.dirname(cached_file.path)) == os.path.normpath(cache_dir):
+        # Cached by an earlier version, without any entry
+        try:
+            os.remove(cached_file.path)
+        except FileNotFoundError:
+            pass
+        return
+
+    # The file may be removed at the same time by another process pruning the cache
+    try:
+        os.remove(cached_file.path)
+        os.rmdir(os.path.dirname(cached_file.path))
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # The digest dir holds the same file under another name
+        pass
+
+    uris_dir = os.path.join(cache_dir, URIS_DIR)
+    for entry_name in os.listdir(uris_dir) if os.path.isdir(uris_dir) else []:
+        path = os.path.join(uris_dir, entry_name)
+        try:
+            with open(path, 'r', encoding='utf-8') as entry_file:
+                entry = json.load(entry_file)
+            if entry['digest'] == cached_file.digest and entry['name'] == cached_file.name:
+                os.remove(path)
+                remove_lock(cache_dir, entry_name[:-len('.json')])
+        except (OSError, ValueError):
+            continue
+
+
+def remove_stale_temp_files(cache_dir, now):
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            is_temp_file = name.endswith(('.tmp', PARTIAL_SUFFIX, downloader.STATE_SUFFIX))
+            if is_temp_file and now - os.stat(path).st_mtime > STALE_TEMP_FILE_AGE:
+                os.remove(path)
+        except FileNotFoundError:
+            continue
+
+
+def record_access(cache_dir, cached_file):
+    # The modification time of a cached file is its last access, as the content of a cached file never changes
+    os.utime(cached_file, None)
+    update_stats(cache_dir, 'hits')
+
+
+def stats(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, STATS_FILE), 'r', encoding='utf-8') as stats_file:
+            return json.load(stats_file)
+    except (OSError, ValueError):
+        return {'hits': 0, 'misses': 0}
+
+
+def update_stats(cache_dir, counter):
+    with _stats_lock, lock(cache_dir, 'stats'):
+        current_stats = stats(cache_dir)
+        current_stats[counter] = current_stats.get(counter, 0) + 1
+        path = os.path.join(cache_dir, STATS_FILE)
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'w', encoding='utf-8') as stats_file:
+            json.dump(current_stats, stats_file)
+        os.replace(tmp_path, path)
+
+
+def temp_path(cache_dir, uri):
+    """
+    Creates an empty temporary file to download the uri to. The name of the file is unique, so that downloads never
+    write to each other's file.
+    """
+    fd, path = tempfile.mkstemp(suffix='.tmp', prefix='{}-'.format(uri_key(uri)), dir=cache_dir)
+    os.close(fd)
+    return path
+
+
+def partial_path(cache_dir, uri):
+    """
+    Returns the path the uri is downloaded to, which is the same for every attempt so that a download may be resumed.
+    Must only be written to while the uri is locked.
+    """
+    return os.path.join(cache_dir, '{}{}'.format(uri_key(uri), PARTIAL_SUFFIX))
+
+
+def save_entry(cache_dir, uri, digest, name):
+    path = entry_path(cache_dir, uri)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w', encoding='utf-8') as entry_file:
+        json.dump({'uri': uri, 'name': name, 'digest': digest}, entry_file)
+    os.replace(tmp_path, path)
+
+
+def entry_path(cache_dir, uri):
+    return os.path.join(cache_dir, URIS_DIR, '{}.json'.format(uri_key(uri)))
+
+
+def blob_path(cache_dir, digest, name):
+    return os.path.join(cache_dir, BLOBS_DIR, digest, name)
+
+
+def legacy_name(uri):
+    # As named by earlier versions
+    return os.path.basename(urlparse(uri, scheme='file').path)
+
+
+def uri_key(uri):
+    return hashlib.sha256(canonical_uri(uri).encode('utf-8')).hexdigest()
+
+
+def canonical_uri(uri):
+    # Scheme and host are case insensitive, and the fragment is never sent to the server
+    parsed = urlparse(uri)
+    return urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), fragment=''))
+
+
+def file_digest(path):
+    return downloader.hash_file(path).hexdigest()
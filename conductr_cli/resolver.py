@@ -2,15 +2,24 @@ from conductr_cli.exceptions import BundleResolutionError
 from conductr_cli.resolvers import bintray_resolver, uri_resolver
 import importlib
 import logging
+import queue
+import threading
+import time
 
 
 # Try to resolve from local file system before we attempting resolution using bintray
 DEFAULT_RESOLVERS = [uri_resolver, bintray_resolver]
 
 
-def resolve_bundle(custom_settings, cache_dir, uri):
+def resolve_bundle(custom_settings, cache_dir, uri, offline=False):
     all_resolvers = resolver_chain(custom_settings)
 
+    if offline or is_offline_mode(custom_settings):
+        return resolve_bundle_offline(all_resolvers, cache_dir, uri)
+
+    if is_parallel_mode(custom_settings):
+        return resolve_bundle_in_parallel(all_resolvers, cache_dir, uri)
+
     for resolver in all_resolvers:
         is_cached, bundle_name, cached_bundle = resolver.load_from_cache(cache_dir, uri)
         if is_cached:
@@ -34,3 +43,96 @@ def resolver_chain(custom_settings):
             return custom_resolver_chain
 
     return DEFAULT_RESOLVERS
+
+
+def resolve_bundle_offline(all_resolvers, cache_dir, uri):
+    """
+    Resolves the bundle from local files, caches and indexes only, so that no request is made to remote repositories.
+    Resolvers support offline mode by providing a `resolve_bundle_offline` function, other resolvers are skipped.
+    """
+    log = logging.getLogger(__name__)
+
+    for resolver in all_resolvers:
+        if hasattr(resolver, 'resolve_bundle_offline'):
+            is_resolved, bundle_name, bundle_file = resolver.resolve_bundle_offline(cache_dir, uri)
+            if is_resolved:
+                return bundle_name, bundle_file
+        else:
+            log.debug('Skipping resolver {} which doesn\'t support offline mode'.format(resolver.__name__))
+
+    raise BundleResolutionError('Unable to resolve bundle using {} in offline mode'.format(uri))
+
+
+def is_offline_mode(custom_settings):
+    return custom_settings is not None and 'offline' in custom_settings and custom_settings.get_bool('offline')
+
+
+def is_parallel_mode(custom_settings):
+    return custom_settings is not None and 'resolve_in_parallel' in custom_settings and \
+        custom_settings.get_bool('resolve_in_parallel')
+
+
+def resolve_bundle_in_parallel(all_resolvers, cache_dir, uri):
+    """
+    Resolves the bundle the same as the resolvers are tried in order, but looks the bundle up in the caches of all the
+    resolvers at once, so that resolvers which don't have the bundle don't hold up the others. The bundle is then
+    resolved by one resolver after the other: resolving downloads the bundle and holds locks on the cache, which
+    mustn't be left to carry on in the background once the bundle has been resolved.
+    """
+    resolution = first_resolved(all_resolvers, 'load_from_cache', cache_dir, uri)
+    if resolution is not None:
+        return resolution
+
+    for resolver in all_resolvers:
+        is_resolved, bundle_name, bundle_file = resolver.resolve_bundle(cache_dir, uri)
+        if is_resolved:
+            return bundle_name, bundle_file
+
+    raise BundleResolutionError('Unable to resolve bundle using {}'.format(uri))
+
+
+def first_resolved(all_resolvers, function_name, cache_dir, uri):
+    """
+    Calls the function of every resolver concurrently, returning the `(bundle_name, bundle_file)` of the first
+    resolver of the chain to resolve the bundle, or None if none did. A resolution is chosen as soon as every resolver
+    ahead of it in the chain has failed, and the results of the resolvers behind it are ignored. These are still waited
+    for before returning, as they may hold locks and write temporary files which mustn't be left behind when the
+    process exits. An error raised by a resolver is raised in turn once every resolver ahead of it has failed.
+    """
+    log = logging.getLogger(__name__)
+    results = queue.Queue()
+
+    def probe(index, resolver):
+        try:
+            results.put((index, getattr(resolver, function_name)(cache_dir, uri), None))
+        except BaseException as e:
+            results.put((index, None, e))
+
+    started_at = time.monotonic()
+    probes = [threading.Thread(target=probe, args=(index, resolver)) for index, resolver in enumerate(all_resolvers)]
+    for thread in probes:
+        thread.start()
+
+    completed = {}
+    next_index = 0
+    try:
+        while next_index < len(all_resolvers):
+            index, resolution, error = results.get()
+            completed[index] = resolution, error
+            log.verbose('{}.{} completed in {:.3f}s'.format(
+                all_resolvers[index].__name__, function_name, time.monotonic() - started_at))
+            while next_index in completed:
+                resolution, error = completed[next_index]
+                if error is not None:
+                    raise error
+                is_resolved, bundle_name, bundle_file = resolution
+                if is_resolved:
+                    return bundle_name, bundle_file
+                next_index += 1
+        return None
+    finally:
+        for index, resolver in enumerate(all_resolvers):
+            if index not in completed:
+                probes[index].join()
+                log.verbose('{}.{} completed in {:.3f}s, after the bundle was resolved'.format(
+                    resolver.__name__, function_name, time.monotonic() - started_at))
@@ -1,20 +1,25 @@
 from conductr_cli.exceptions import MalformedBundleUriError, BintrayResolutionError
 from conductr_cli.resolvers import uri_resolver
-from conductr_cli import bundle_shorthand
+from conductr_cli import bundle_shorthand, constants, http, resolve_cache
 from requests.exceptions import HTTPError
+import hashlib
 import json
 import logging
 import os
 import re
-import requests
+import tempfile
+import time
 
 
 BINTRAY_API_BASE_URL = 'https://api.bintray.com'
 BINTRAY_DOWNLOAD_BASE_URL = 'https://dl.bintray.com'
-BINTRAY_DOWNLOAD_REALM = 'Bintray'
 BINTRAY_CREDENTIAL_FILE_PATH = '{}/.bintray/.credentials'.format(os.path.expanduser('~'))
 BINTRAY_PROPERTIES_RE = re.compile('^(\S+)\s*=\s*([\S]+)$')
 
+# Index of the bundles resolved from Bintray, kept within the resolve cache dir, which is used to resolve shorthands in
+# offline mode
+BINTRAY_INDEX_FILE = 'bintray-index.json'
+
 
 def resolve_bundle(cache_dir, uri):
     log = logging.getLogger(__name__)
@@ -22,11 +27,16 @@ def resolve_bundle(cache_dir, uri):
         bintray_username, bintray_password = load_bintray_credentials()
         urn, org, repo, package_name, compatibility_version, digest = bundle_shorthand.parse(uri)
         log.info(log_message('Resolving bundle', org, repo, package_name, compatibility_version, digest))
-        bundle_download_url = bintray_download_url(bintray_username, bintray_password, org, repo, package_name,
-                                                   compatibility_version, digest)
-        if bundle_download_url:
-            auth = (BINTRAY_DOWNLOAD_REALM, bintray_username, bintray_password) if bintray_username else None
-            return uri_resolver.resolve_bundle(cache_dir, bundle_download_url, auth)
+        bundle_version = bintray_download_version(bintray_username, bintray_password, org, repo, package_name,
+                                                  compatibility_version, digest)
+        if bundle_version:
+            version, bundle_download_url = bundle_version
+            auth = (bintray_username, bintray_password) if bintray_username else None
+            resolution = uri_resolver.resolve_bundle(cache_dir, bundle_download_url, auth)
+            is_resolved, bundle_name, bundle_file = resolution
+            if is_resolved:
+                index_bundle(cache_dir, org, repo, package_name, version, bundle_download_url)
+            return resolution
         else:
             return False, None, None
     except MalformedBundleUriError:
@@ -41,10 +51,15 @@ def load_from_cache(cache_dir, uri):
         bintray_username, bintray_password = load_bintray_credentials()
         urn, org, repo, package_name, compatibility_version, digest = bundle_shorthand.parse(uri)
         log.info(log_message('Loading bundle from cache', org, repo, package_name, compatibility_version, digest))
-        bundle_download_url = bintray_download_url(bintray_username, bintray_password, org, repo, package_name,
-                                                   compatibility_version, digest)
-        if bundle_download_url:
-            return uri_resolver.load_from_cache(cache_dir, bundle_download_url)
+        bundle_version = bintray_download_version(bintray_username, bintray_password, org, repo, package_name,
+                                                  compatibility_version, digest)
+        if bundle_version:
+            version, bundle_download_url = bundle_version
+            resolution = uri_resolver.load_from_cache(cache_dir, bundle_download_url)
+            is_cached, bundle_name, bundle_file = resolution
+            if is_cached:
+                index_bundle(cache_dir, org, repo, package_name, version, bundle_download_url)
+            return resolution
         else:
             return False, None, None
     except MalformedBundleUriError:
@@ -53,6 +68,37 @@ def load_from_cache(cache_dir, uri):
         return False, None, None
 
 
+def resolve_bundle_offline(cache_dir, uri):
+    """
+    Resolves the shorthand from the index of bundles previously resolved from Bintray, without contacting Bintray.
+    A shorthand without a version resolves to the highest compatibility version within the index, and a shorthand
+    without a digest to the most recently resolved bundle of its compatibility version. The digest may be abbreviated.
+    Bundles which have been removed from the cache since are skipped.
+    """
+    log = logging.getLogger(__name__)
+    try:
+        urn, org, repo, package_name, compatibility_version, digest = bundle_shorthand.parse(uri)
+    except MalformedBundleUriError:
+        return False, None, None
+
+    log.info(log_message('Resolving bundle offline', org, repo, package_name, compatibility_version, digest))
+    entries = [entry for entry in read_index(cache_dir)
+               if entry['org'] == org and entry['repo'] == repo and entry['package'] == package_name and
+               is_matching_version(entry['version'], compatibility_version, digest)]
+    if digest is not None and len(set([entry['version'] for entry in entries])) > 1:
+        raise BintrayResolutionError(
+            'Unable to resolve - multiple versions found for owner={} repo={} package={} version={}-{}'.format(
+                org, repo, package_name, compatibility_version, digest))
+
+    for entry in sorted(entries, key=lambda entry: (compatibility_number(entry['version']), entry['resolved_at']),
+                        reverse=True):
+        is_cached, bundle_name, bundle_file = uri_resolver.load_from_cache(cache_dir, entry['url'])
+        if is_cached:
+            return is_cached, bundle_name, bundle_file
+
+    return False, None, None
+
+
 def load_bintray_credentials():
     log = logging.getLogger(__name__)
     if not os.path.exists(BINTRAY_CREDENTIAL_FILE_PATH):
@@ -78,6 +124,17 @@ def load_bintray_credentials():
 
 
 def bintray_download_url(bintray_username, bintray_password, org, repo, package_name, compatibility_version, digest):
+    bundle_version = bintray_download_version(bintray_username, bintray_password, org, repo, package_name,
+                                              compatibility_version, digest)
+    return bundle_version[1] if bundle_version else None
+
+
+def bintray_download_version(bintray_username, bintray_password, org, repo, package_name, compatibility_version,
+                             digest):
+    """
+    Returns the Bintray version, i.e. `<compatibility version>-<digest>`, of the bundle and its download url. Returns
+    None if there's no such compatibility version.
+    """
     if compatibility_version is None and digest is None:
         # Get latest version
         package_endpoint = '{}/packages/{}/{}/{}'.format(BINTRAY_API_BASE_URL, org, repo, package_name)
@@ -91,9 +148,9 @@ def bintray_download_url(bintray_username, bintray_password, org, repo, package_
 
             if compatibility_versions:
                 latest_compatibility_version = sorted(compatibility_versions)[-1]
-                return bintray_download_url(bintray_username, bintray_password,
-                                            org, repo, package_name,
-                                            'v{}'.format(latest_compatibility_version), None)
+                return bintray_download_version(bintray_username, bintray_password,
+                                                org, repo, package_name,
+                                                'v{}'.format(latest_compatibility_version), None)
             else:
                 raise BintrayResolutionError(
                     'Unable to find latest version for owner={} repo={} package={}'.format(org, repo, package_name))
@@ -103,8 +160,8 @@ def bintray_download_url(bintray_username, bintray_password, org, repo, package_
                     latest_version, org, repo, package_name))
         else:
             latest_compatibility_version, latest_digest = package['latest_version'].split('-')
-            return bintray_download_url(bintray_username, bintray_password, org, repo, package_name,
-                                        latest_compatibility_version, latest_digest)
+            return bintray_download_version(bintray_username, bintray_password, org, repo, package_name,
+                                            latest_compatibility_version, latest_digest)
 
     elif compatibility_version is not None and digest is None:
         # Get latest of a compatibility version
@@ -123,8 +180,8 @@ def bintray_download_url(bintray_username, bintray_password, org, repo, package_
         else:
             matching_version = matching_versions[0]
             matching_compatibility_version, matching_digest = matching_version.split('-')
-            return bintray_download_url(bintray_username, bintray_password, org, repo, package_name,
-                                        matching_compatibility_version, matching_digest)
+            return bintray_download_version(bintray_username, bintray_password, org, repo, package_name,
+                                            matching_compatibility_version, matching_digest)
     else:
         bintray_version = '{}-{}'.format(compatibility_version, digest)
         files_endpoint = '{}/packages/{}/{}/{}/versions/{}/files'.format(BINTRAY_API_BASE_URL, org, repo, package_name,
@@ -147,16 +204,109 @@ def bintray_download_url(bintray_username, bintray_password, org, repo, package_
         else:
             path = matching_files[0]['path']
             download_url = '{}/{}/{}/{}'.format(BINTRAY_DOWNLOAD_BASE_URL, org, repo, path)
-            return download_url
+            return bintray_version, download_url
 
 
 def get_json(uri, username, password):
-    if username is not None and password is not None:
-        response = requests.get(uri, auth=(username, password))
+    """
+    Returns the JSON response of the Bintray API endpoint.
+
+    Responses are kept in the Bintray metadata cache, and aren't requested again until they are older than
+    `constants.bintray_metadata_ttl()` seconds. Expired responses are revalidated with their ETag, so that Bintray
+    only sends them again if they've changed.
+    """
+    log = logging.getLogger(__name__)
+
+    cache_path = metadata_cache_path(uri, username)
+    cached = read_metadata(cache_path)
+    if cached is not None and time.time() - cached['fetched_at'] < constants.bintray_metadata_ttl():
+        log.debug('Retrieved {} from the Bintray metadata cache'.format(uri))
+        return cached['data']
+
+    headers = {'If-None-Match': cached['etag']} if cached is not None and cached['etag'] else {}
+    auth = (username, password) if username is not None and password is not None else None
+    response = http.get(uri, auth=auth, headers=headers)
+    if response.status_code == 304 and cached is not None:
+        log.debug('Revalidated {} within the Bintray metadata cache'.format(uri))
+        data, etag = cached['data'], cached['etag']
     else:
-        response = requests.get(uri)
-    response.raise_for_status()
-    return json.loads(response.text)
+        response.raise_for_status()
+        data, etag = json.loads(response.text), response.headers.get('ETag')
+
+    try:
+        write_metadata(cache_path, uri, etag, data)
+    except OSError as e:
+        log.debug('Unable to write {} to the Bintray metadata cache: {}'.format(uri, e))
+    return data
+
+
+def metadata_cache_path(uri, username):
+    # Responses are kept per user, as they depend on the repositories the user has access to
+    key = hashlib.sha256('{} {}'.format(username or '', uri).encode('utf-8')).hexdigest()
+    return os.path.join(constants.DEFAULT_BINTRAY_METADATA_CACHE_DIR, '{}.json'.format(key))
+
+
+def read_metadata(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as cache_file:
+            cached = json.load(cache_file)
+        return cached if 'data' in cached and 'etag' in cached and 'fetched_at' in cached else None
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def write_metadata(cache_path, uri, etag, data):
+    # Written to a temporary file which replaces the cached response, so that a response being written is never read
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    with open(fd, 'w', encoding='utf-8') as cache_file:
+        json.dump({'uri': uri, 'etag': etag, 'fetched_at': time.time(), 'data': data}, cache_file)
+    os.replace(tmp_path, cache_path)
+
+
+def index_bundle(cache_dir, org, repo, package_name, version, download_url):
+    """
+    Records the bundle in the index used to resolve shorthands offline, replacing any previous record of the bundle.
+    """
+    log = logging.getLogger(__name__)
+    try:
+        with resolve_cache.lock(cache_dir, 'bintray-index'):
+            entries = [entry for entry in read_index(cache_dir) if entry['url'] != download_url]
+            entries.append({'org': org, 'repo': repo, 'package': package_name, 'version': version,
+                            'url': download_url, 'resolved_at': time.time()})
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+            with open(fd, 'w', encoding='utf-8') as index_file:
+                json.dump(entries, index_file)
+            os.replace(tmp_path, os.path.join(cache_dir, BINTRAY_INDEX_FILE))
+    except OSError as e:
+        log.debug('Unable to update the Bintray index: {}'.format(e))
+
+
+def read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, BINTRAY_INDEX_FILE), 'r', encoding='utf-8') as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return []
+
+
+def is_matching_version(version, compatibility_version, digest):
+    version_compatibility, _, version_digest = version.partition('-')
+    if compatibility_version is None:
+        return True
+    elif digest is None:
+        return version_compatibility == compatibility_version
+    else:
+        return version_compatibility == compatibility_version and version_digest.startswith(digest)
+
+
+def compatibility_number(version):
+    compatibility_version = version.partition('-')[0]
+    try:
+        return int(compatibility_version.lstrip('v'))
+    except ValueError:
+        return 0
 
 
 def log_message(message, org, repo, package_name, compatibility_version, digest):
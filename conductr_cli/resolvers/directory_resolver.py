@@ -0,0 +1,217 @@
+from conductr_cli.exceptions import BundleResolutionError, MalformedBundleUriError
+from conductr_cli.resolvers import uri_resolver
+from conductr_cli import bundle_shorthand, bundle_utils, constants, resolve_cache
+from pyhocon import ConfigFactory
+from pyhocon.exceptions import ConfigException
+from pyparsing import ParseBaseException
+from zipfile import BadZipFile
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+# Index of the bundles within the repository dir, kept within the resolve cache dir. Bundles are kept in the repository
+# under `<org>/<repo>/`, and the index holds the name, compatibility version, digest, size and modification time of
+# each bundle of the `<org>/<repo>` dirs which have been resolved from.
+DIRECTORY_INDEX_FILE = 'directory-index.json'
+
+# Number of seconds by which modification times may lag behind the changes of a dir, as file systems such as NFS
+# record them with a coarse resolution. A dir modified within this time of being indexed is listed again, as a file
+# may have been added to it after it was listed yet within the same modification time.
+MTIME_RESOLUTION = 2
+
+
+def resolve_bundle(cache_dir, uri):
+    log = logging.getLogger(__name__)
+    bundle = find_bundle(cache_dir, uri, is_logged=True)
+    if bundle is None:
+        return False, None, None
+
+    # Bundles are named after their digest, so that a bundle is only copied from the repository once
+    cached_file = resolve_cache.lookup_digest(cache_dir, bundle['path'], bundle['file'])
+    if cached_file is not None:
+        log.info('Retrieving from cache {}'.format(cached_file))
+        return True, bundle['file'], cached_file
+    else:
+        return uri_resolver.resolve_bundle(cache_dir, bundle['path'])
+
+
+def load_from_cache(cache_dir, uri):
+    log = logging.getLogger(__name__)
+    bundle = find_bundle(cache_dir, uri)
+    if bundle is None:
+        return False, None, None
+
+    cached_file = resolve_cache.lookup_digest(cache_dir, bundle['path'], bundle['file'])
+    if cached_file is not None:
+        log.info('Retrieving from cache {}'.format(cached_file))
+        return True, bundle['file'], cached_file
+    else:
+        return False, None, None
+
+
+def resolve_bundle_offline(cache_dir, uri):
+    # The repository dir is accessed as a local file system
+    return resolve_bundle(cache_dir, uri)
+
+
+def find_bundle(cache_dir, uri, is_logged=False):
+    """
+    Returns the index entry of the bundle of the repository dir matching the shorthand, or None if there's none.
+    A shorthand without a version resolves to the highest compatibility version, and a shorthand without a digest to
+    the most recently modified bundle of its compatibility version. The digest may be abbreviated.
+    Raises `BundleResolutionError` if an abbreviated digest matches several bundles.
+    The resolution is only logged if `is_logged`, so that it's logged once when the bundle is looked up in the cache
+    before being resolved.
+    """
+    repository_dir = constants.DEFAULT_BUNDLE_REPOSITORY_DIR
+    try:
+        urn, org, repo, package_name, compatibility_version, digest = bundle_shorthand.parse(uri)
+    except MalformedBundleUriError:
+        return None
+
+    if not os.path.isdir(os.path.join(repository_dir, org, repo)):
+        return None
+
+    if is_logged:
+        log = logging.getLogger(__name__)
+        log.info(log_message('Resolving bundle from {}'.format(repository_dir), org, repo, package_name,
+                             compatibility_version, digest))
+
+    bundles = [bundle for bundle in indexed_bundles(cache_dir, repository_dir, org, repo)
+               if bundle['name'] == package_name and
+               is_matching_version(bundle, compatibility_version, digest)]
+    if digest is not None and len(set([bundle['digest'] for bundle in bundles])) > 1:
+        raise BundleResolutionError(
+            'Unable to resolve - multiple bundles found in {} for {}'.format(repository_dir, uri))
+
+    if bundles:
+        return max(bundles, key=lambda bundle: (compatibility_number(bundle['compatibility_version']),
+                                                bundle['mtime']))
+    else:
+        return None
+
+
+def indexed_bundles(cache_dir, repository_dir, org, repo):
+    """
+    Returns the bundles of the `<org>/<repo>` dir of the repository, updating the index beforehand if the dir has
+    changed since it was indexed. Only the bundles which have been added or modified since are read.
+    """
+    log = logging.getLogger(__name__)
+    dir_key = '{}/{}'.format(org, repo)
+    dir_path = os.path.join(repository_dir, org, repo)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with resolve_cache.lock(cache_dir, 'directory-index'):
+        index = read_index(cache_dir, repository_dir)
+        indexed_dir = index['dirs'].get(dir_key)
+        dir_mtime = os.stat(dir_path).st_mtime
+        if indexed_dir is not None and indexed_dir['mtime'] == dir_mtime and \
+                indexed_dir['indexed_at'] - dir_mtime > MTIME_RESOLUTION:
+            return list(indexed_dir['bundles'].values())
+
+        log.debug('Indexing bundles of {}'.format(dir_path))
+        indexed_at = time.time()
+        previous_bundles = indexed_dir['bundles'] if indexed_dir is not None else {}
+        bundles = {}
+        for file_name in os.listdir(dir_path):
+            if not file_name.endswith('.zip'):
+                continue
+            try:
+                stat = os.stat(os.path.join(dir_path, file_name))
+            except FileNotFoundError:
+                continue
+            previous_bundle = previous_bundles.get(file_name)
+            if previous_bundle is not None and \
+                    previous_bundle['size'] == stat.st_size and previous_bundle['mtime'] == stat.st_mtime:
+                bundles[file_name] = previous_bundle
+            else:
+                bundles[file_name] = read_bundle(dir_path, file_name, stat)
+
+        index['dirs'][dir_key] = {'mtime': dir_mtime, 'indexed_at': indexed_at, 'bundles': bundles}
+        write_index(cache_dir, index)
+        return list(bundles.values())
+
+
+def read_bundle(dir_path, file_name, stat):
+    """
+    Returns the index entry of a bundle, whose name and compatibility version are read from its `bundle.conf`.
+    Files which aren't bundles are indexed without a name, so that they're neither resolved nor read again.
+    """
+    log = logging.getLogger(__name__)
+    path = os.path.join(dir_path, file_name)
+    name, compatibility_version = None, None
+    try:
+        bundle_conf = ConfigFactory.parse_string(bundle_utils.conf(path))
+        if 'name' in bundle_conf:
+            name = bundle_conf.get_string('name')
+        if 'compatibilityVersion' in bundle_conf:
+            compatibility_version = bundle_conf.get_string('compatibilityVersion')
+    except (OSError, BadZipFile, ConfigException, ParseBaseException) as e:
+        log.debug('Unable to read the bundle configuration of {}: {}'.format(path, e))
+
+    return {
+        'file': file_name,
+        'path': path,
+        'name': name,
+        'compatibility_version': compatibility_version,
+        'digest': bundle_utils.digest(file_name),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime
+    }
+
+
+def read_index(cache_dir, repository_dir):
+    try:
+        with open(os.path.join(cache_dir, DIRECTORY_INDEX_FILE), 'r', encoding='utf-8') as index_file:
+            index = json.load(index_file)
+        if index['repository_dir'] == repository_dir:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    # The index of another repository dir is replaced
+    return {'repository_dir': repository_dir, 'dirs': {}}
+
+
+def write_index(cache_dir, index):
+    log = logging.getLogger(__name__)
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+        with open(fd, 'w', encoding='utf-8') as index_file:
+            json.dump(index, index_file)
+        os.replace(tmp_path, os.path.join(cache_dir, DIRECTORY_INDEX_FILE))
+    except OSError as e:
+        log.debug('Unable to update the directory index: {}'.format(e))
+
+
+def is_matching_version(bundle, compatibility_version, digest):
+    if compatibility_version is not None and \
+            normalize_version(bundle['compatibility_version']) != normalize_version(compatibility_version):
+        return False
+    elif digest is not None:
+        return bundle['digest'] is not None and bundle['digest'].startswith(digest)
+    else:
+        return True
+
+
+def normalize_version(compatibility_version):
+    # Compatibility versions are given as `1` within bundle configurations, and as `v1` within shorthands
+    return None if compatibility_version is None else compatibility_version.lstrip('v')
+
+
+def compatibility_number(compatibility_version):
+    try:
+        return int(normalize_version(compatibility_version))
+    except (TypeError, ValueError):
+        return 0
+
+
+def log_message(message, org, repo, package_name, compatibility_version, digest):
+    if compatibility_version is None and digest is None:
+        return '{} {}/{}/{}'.format(message, org, repo, package_name)
+    elif digest is None:
+        return '{} {}/{}/{}:{}'.format(message, org, repo, package_name, compatibility_version)
+    else:
+        return '{} {}/{}/{}:{}-{}'.format(message, org, repo, package_name, compatibility_version, digest)
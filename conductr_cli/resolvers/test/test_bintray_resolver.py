@@ -1,10 +1,14 @@
 from unittest import TestCase
 from conductr_cli.test.cli_test_case import strip_margin
+from conductr_cli import constants
 from conductr_cli.resolvers import bintray_resolver
 from conductr_cli.exceptions import MalformedBundleUriError, BintrayResolutionError
 from requests.exceptions import HTTPError
 import io
 import os
+import shutil
+import tempfile
+import time
 
 try:
     from unittest.mock import call, patch, MagicMock, Mock  # 3.3 and beyond
@@ -16,13 +20,15 @@ class TestResolveBundle(TestCase):
     def test_bintray_version_found(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
         parse_mock = MagicMock(return_value=('urn:x-bundle:', 'typesafe', 'bundle', 'bundle-name', 'v1', 'digest'))
-        bintray_download_url_mock = MagicMock(return_value='https://dl.bintray.com/download.zip')
+        bintray_download_version_mock = MagicMock(return_value=('v1-digest', 'https://dl.bintray.com/download.zip'))
+        index_bundle_mock = MagicMock()
         resolve_bundle_mock = MagicMock(return_value=(True, 'bundle-name', 'mock bundle file'))
 
         with patch('conductr_cli.resolvers.bintray_resolver.load_bintray_credentials', load_bintray_credentials_mock), \
                 patch('conductr_cli.bundle_shorthand.parse', parse_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_url', bintray_download_url_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.uri_resolver.resolve_bundle', resolve_bundle_mock):
+                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_version', bintray_download_version_mock), \
+                patch('conductr_cli.resolvers.bintray_resolver.uri_resolver.resolve_bundle', resolve_bundle_mock), \
+                patch('conductr_cli.resolvers.bintray_resolver.index_bundle', index_bundle_mock):
             is_resolved, bundle_name, bundle_file = bintray_resolver.resolve_bundle('/cache-dir', 'bundle-name:v1')
             self.assertTrue(is_resolved)
             self.assertEqual('bundle-name', bundle_name)
@@ -30,19 +36,21 @@ class TestResolveBundle(TestCase):
 
         load_bintray_credentials_mock.assert_called_with()
         parse_mock.assert_called_with('bundle-name:v1')
-        bintray_download_url_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name', 'v1',
-                                                     'digest')
+        bintray_download_version_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name',
+                                                         'v1', 'digest')
         resolve_bundle_mock.assert_called_with('/cache-dir', 'https://dl.bintray.com/download.zip',
-                                               ('Bintray', 'username', 'password'))
+                                               ('username', 'password'))
+        index_bundle_mock.assert_called_with('/cache-dir', 'typesafe', 'bundle', 'bundle-name', 'v1-digest',
+                                             'https://dl.bintray.com/download.zip')
 
     def test_bintray_version_not_found(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
         parse_mock = MagicMock(return_value=('urn:x-bundle:', 'typesafe', 'bundle', 'bundle-name', 'v1', 'digest'))
-        bintray_download_url_mock = MagicMock(return_value=None)
+        bintray_download_version_mock = MagicMock(return_value=None)
 
         with patch('conductr_cli.resolvers.bintray_resolver.load_bintray_credentials', load_bintray_credentials_mock), \
                 patch('conductr_cli.bundle_shorthand.parse', parse_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_url', bintray_download_url_mock):
+                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_version', bintray_download_version_mock):
             is_resolved, bundle_name, bundle_file = bintray_resolver.resolve_bundle('/cache-dir', 'bundle-name:v1')
             self.assertFalse(is_resolved)
             self.assertIsNone(bundle_name)
@@ -50,8 +58,8 @@ class TestResolveBundle(TestCase):
 
         load_bintray_credentials_mock.assert_called_with()
         parse_mock.assert_called_with('bundle-name:v1')
-        bintray_download_url_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name', 'v1',
-                                                     'digest')
+        bintray_download_version_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name',
+                                                         'v1', 'digest')
 
     def test_failure_malformed_bundle_uri(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
@@ -70,11 +78,11 @@ class TestResolveBundle(TestCase):
     def test_failure_http_error(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
         parse_mock = MagicMock(return_value=('urn:x-bundle:', 'typesafe', 'bundle', 'bundle-name', 'v1', 'digest'))
-        bintray_download_url_mock = MagicMock(side_effect=HTTPError('test only'))
+        bintray_download_version_mock = MagicMock(side_effect=HTTPError('test only'))
 
         with patch('conductr_cli.resolvers.bintray_resolver.load_bintray_credentials', load_bintray_credentials_mock), \
                 patch('conductr_cli.bundle_shorthand.parse', parse_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_url', bintray_download_url_mock):
+                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_version', bintray_download_version_mock):
             is_resolved, bundle_name, bundle_file = bintray_resolver.resolve_bundle('/cache-dir', 'bundle-name:v1')
             self.assertFalse(is_resolved)
             self.assertIsNone(bundle_name)
@@ -82,21 +90,23 @@ class TestResolveBundle(TestCase):
 
         load_bintray_credentials_mock.assert_called_with()
         parse_mock.assert_called_with('bundle-name:v1')
-        bintray_download_url_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name', 'v1',
-                                                     'digest')
+        bintray_download_version_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name',
+                                                         'v1', 'digest')
 
 
 class TestLoadFromCache(TestCase):
     def test_bintray_version_found(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
         parse_mock = MagicMock(return_value=('urn:x-bundle:', 'typesafe', 'bundle', 'bundle-name', 'v1', 'digest'))
-        bintray_download_url_mock = MagicMock(return_value='https://dl.bintray.com/download.zip')
+        bintray_download_version_mock = MagicMock(return_value=('v1-digest', 'https://dl.bintray.com/download.zip'))
+        index_bundle_mock = MagicMock()
         load_from_cache_mock = MagicMock(return_value=(True, 'bundle-name', 'mock bundle file'))
 
         with patch('conductr_cli.resolvers.bintray_resolver.load_bintray_credentials', load_bintray_credentials_mock), \
                 patch('conductr_cli.bundle_shorthand.parse', parse_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_url', bintray_download_url_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.uri_resolver.load_from_cache', load_from_cache_mock):
+                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_version', bintray_download_version_mock), \
+                patch('conductr_cli.resolvers.bintray_resolver.uri_resolver.load_from_cache', load_from_cache_mock), \
+                patch('conductr_cli.resolvers.bintray_resolver.index_bundle', index_bundle_mock):
             is_resolved, bundle_name, bundle_file = bintray_resolver.load_from_cache('/cache-dir', 'bundle-name:v1')
             self.assertTrue(is_resolved)
             self.assertEqual('bundle-name', bundle_name)
@@ -104,18 +114,20 @@ class TestLoadFromCache(TestCase):
 
         load_bintray_credentials_mock.assert_called_with()
         parse_mock.assert_called_with('bundle-name:v1')
-        bintray_download_url_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name', 'v1',
-                                                     'digest')
+        bintray_download_version_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name',
+                                                         'v1', 'digest')
         load_from_cache_mock.assert_called_with('/cache-dir', 'https://dl.bintray.com/download.zip')
+        index_bundle_mock.assert_called_with('/cache-dir', 'typesafe', 'bundle', 'bundle-name', 'v1-digest',
+                                             'https://dl.bintray.com/download.zip')
 
     def test_bintray_version_not_found(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
         parse_mock = MagicMock(return_value=('urn:x-bundle:', 'typesafe', 'bundle', 'bundle-name', 'v1', 'digest'))
-        bintray_download_url_mock = MagicMock(return_value=None)
+        bintray_download_version_mock = MagicMock(return_value=None)
 
         with patch('conductr_cli.resolvers.bintray_resolver.load_bintray_credentials', load_bintray_credentials_mock), \
                 patch('conductr_cli.bundle_shorthand.parse', parse_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_url', bintray_download_url_mock):
+                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_version', bintray_download_version_mock):
             is_resolved, bundle_name, bundle_file = bintray_resolver.load_from_cache('/cache-dir', 'bundle-name:v1')
             self.assertFalse(is_resolved)
             self.assertIsNone(bundle_name)
@@ -123,8 +135,8 @@ class TestLoadFromCache(TestCase):
 
         load_bintray_credentials_mock.assert_called_with()
         parse_mock.assert_called_with('bundle-name:v1')
-        bintray_download_url_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name', 'v1',
-                                                     'digest')
+        bintray_download_version_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name',
+                                                         'v1', 'digest')
 
     def test_failure_malformed_bundle_uri(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
@@ -143,11 +155,11 @@ class TestLoadFromCache(TestCase):
     def test_failure_http_error(self):
         load_bintray_credentials_mock = MagicMock(return_value=('username', 'password'))
         parse_mock = MagicMock(return_value=('urn:x-bundle:', 'typesafe', 'bundle', 'bundle-name', 'v1', 'digest'))
-        bintray_download_url_mock = MagicMock(side_effect=HTTPError('test only'))
+        bintray_download_version_mock = MagicMock(side_effect=HTTPError('test only'))
 
         with patch('conductr_cli.resolvers.bintray_resolver.load_bintray_credentials', load_bintray_credentials_mock), \
                 patch('conductr_cli.bundle_shorthand.parse', parse_mock), \
-                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_url', bintray_download_url_mock):
+                patch('conductr_cli.resolvers.bintray_resolver.bintray_download_version', bintray_download_version_mock):
             is_resolved, bundle_name, bundle_file = bintray_resolver.load_from_cache('/cache-dir', 'bundle-name:v1')
             self.assertFalse(is_resolved)
             self.assertIsNone(bundle_name)
@@ -155,8 +167,71 @@ class TestLoadFromCache(TestCase):
 
         load_bintray_credentials_mock.assert_called_with()
         parse_mock.assert_called_with('bundle-name:v1')
-        bintray_download_url_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name', 'v1',
-                                                     'digest')
+        bintray_download_version_mock.assert_called_with('username', 'password', 'typesafe', 'bundle', 'bundle-name',
+                                                         'v1', 'digest')
+
+
+class TestResolveBundleOffline(TestCase):
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+        self.now = 1000
+        self.index('v1-023f9da22', 'https://dl.bintray.com/typesafe/bundle/visualizer-v1-023f9da22.zip')
+        self.index('v2-1a8c9c2fc', 'https://dl.bintray.com/typesafe/bundle/visualizer-v2-1a8c9c2fc.zip')
+        self.index('v2-7b9d8e44a', 'https://dl.bintray.com/typesafe/bundle/visualizer-v2-7b9d8e44a.zip')
+        self.index('v1-6c0b5e2f1', 'https://dl.bintray.com/typesafe/bundle/visualizer-v1-6c0b5e2f1.zip')
+        self.index('v3-99aa00bb1', 'https://dl.bintray.com/typesafe/bundle/other-v3-99aa00bb1.zip', 'other')
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def index(self, version, url, package_name='visualizer'):
+        # Every bundle is indexed a second after the previous one
+        self.now += 1
+        with patch('time.time', MagicMock(return_value=self.now)):
+            bintray_resolver.index_bundle(self.cache_dir, 'typesafe', 'bundle', package_name, version, url)
+
+    def resolve_offline(self, uri, cached_urls=None):
+        def load_from_cache(cache_dir, url):
+            if cached_urls is None or url in cached_urls:
+                return True, os.path.basename(url), os.path.join(cache_dir, os.path.basename(url))
+            else:
+                return False, None, None
+
+        http_get_mock = MagicMock()
+        with patch('conductr_cli.resolvers.bintray_resolver.uri_resolver.load_from_cache',
+                   MagicMock(side_effect=load_from_cache)), \
+                patch('conductr_cli.http.get', http_get_mock):
+            is_resolved, bundle_name, bundle_file = bintray_resolver.resolve_bundle_offline(self.cache_dir, uri)
+
+        http_get_mock.assert_not_called()
+        return bundle_name if is_resolved else None
+
+    def test_latest(self):
+        self.assertEqual('visualizer-v2-7b9d8e44a.zip', self.resolve_offline('visualizer'))
+
+    def test_compatibility_version(self):
+        self.assertEqual('visualizer-v1-6c0b5e2f1.zip', self.resolve_offline('visualizer:v1'))
+
+    def test_digest_prefix(self):
+        self.assertEqual('visualizer-v2-1a8c9c2fc.zip', self.resolve_offline('typesafe/bundle/visualizer:v2-1a8'))
+
+    def test_ambiguous_digest_prefix(self):
+        self.index('v2-1a8ffffff', 'https://dl.bintray.com/typesafe/bundle/visualizer-v2-1a8ffffff.zip')
+        self.assertRaises(BintrayResolutionError, self.resolve_offline, 'visualizer:v2-1a8')
+
+    def test_skip_bundles_removed_from_cache(self):
+        cached_urls = ['https://dl.bintray.com/typesafe/bundle/visualizer-v1-023f9da22.zip']
+        self.assertEqual('visualizer-v1-023f9da22.zip', self.resolve_offline('visualizer', cached_urls))
+
+    def test_not_indexed(self):
+        self.assertIsNone(self.resolve_offline('visualizer:v4'))
+        self.assertIsNone(self.resolve_offline('unknown'))
+
+    def test_reindexed_bundle_is_most_recent(self):
+        self.index('v1-023f9da22', 'https://dl.bintray.com/typesafe/bundle/visualizer-v1-023f9da22.zip')
+        self.assertEqual('visualizer-v1-023f9da22.zip', self.resolve_offline('visualizer:v1'))
+        self.assertEqual(4, len([entry for entry in bintray_resolver.read_index(self.cache_dir)
+                                 if entry['package'] == 'visualizer']))
 
 
 class TestBintrayDownloadUrl(TestCase):
@@ -386,6 +461,99 @@ class TestBintrayDownloadUrlLatestCompatibilityVersion(TestCase):
                                          'username', 'password')
 
 
+class TestGetJson(TestCase):
+    uri = 'https://api.bintray.com/packages/typesafe/bundle/reactive-maps-frontend'
+
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def get_json(self, responses, username=None, password=None, now=None):
+        http_get_mock = MagicMock(side_effect=responses)
+        with patch('conductr_cli.http.get', http_get_mock), \
+                patch('conductr_cli.constants.DEFAULT_BINTRAY_METADATA_CACHE_DIR', self.cache_dir), \
+                patch('time.time', MagicMock(return_value=now or time.time())):
+            result = bintray_resolver.get_json(self.uri, username, password)
+        return result, http_get_mock
+
+    def test_get_json(self):
+        response_mock = Mock(status_code=200, headers={})
+        response_raise_for_status_mock = MagicMock()
+        response_mock.raise_for_status = response_raise_for_status_mock
+        response_mock.text = '[1,2,3]'
+
+        requests_get_mock = MagicMock(return_value=response_mock)
+        with patch('conductr_cli.http.get', requests_get_mock), \
+                patch('conductr_cli.constants.DEFAULT_BINTRAY_METADATA_CACHE_DIR', self.cache_dir):
+            result = bintray_resolver.get_json('http://site.com', 'username', 'password')
+            self.assertEqual([1, 2, 3], result)
+
+        requests_get_mock.assert_called_with('http://site.com', auth=('username', 'password'), headers={})
+        response_raise_for_status_mock.assert_called_with()
+
+    def test_get_json_no_credentials(self):
+        response_mock = Mock(status_code=200, headers={})
+        response_raise_for_status_mock = MagicMock()
+        response_mock.raise_for_status = response_raise_for_status_mock
+        response_mock.text = '[1,2,3]'
+
+        requests_get_mock = MagicMock(return_value=response_mock)
+        with patch('conductr_cli.http.get', requests_get_mock), \
+                patch('conductr_cli.constants.DEFAULT_BINTRAY_METADATA_CACHE_DIR', self.cache_dir):
+            result = bintray_resolver.get_json('http://site.com', None, None)
+            self.assertEqual([1, 2, 3], result)
+
+        requests_get_mock.assert_called_with('http://site.com', auth=None, headers={})
+        response_raise_for_status_mock.assert_called_with()
+
+    def test_cached_within_ttl(self):
+        response = MagicMock(status_code=200, text='{"latest_version": "v1-023f9da22"}', headers={'ETag': '"1"'})
+        result, http_get_mock = self.get_json([response], 'username', 'password')
+        self.assertEqual({'latest_version': 'v1-023f9da22'}, result)
+        http_get_mock.assert_called_once_with(self.uri, auth=('username', 'password'), headers={})
+
+        result, http_get_mock = self.get_json([], 'username', 'password')
+        self.assertEqual({'latest_version': 'v1-023f9da22'}, result)
+        http_get_mock.assert_not_called()
+
+    def test_revalidated_once_expired(self):
+        response = MagicMock(status_code=200, text='{"latest_version": "v1-023f9da22"}', headers={'ETag': '"1"'})
+        self.get_json([response])
+
+        expired_at = time.time() + constants.DEFAULT_BINTRAY_METADATA_TTL + 1
+        result, http_get_mock = self.get_json([MagicMock(status_code=304)], now=expired_at)
+        self.assertEqual({'latest_version': 'v1-023f9da22'}, result)
+        http_get_mock.assert_called_once_with(self.uri, auth=None, headers={'If-None-Match': '"1"'})
+
+        # The revalidated response is kept for another TTL
+        result, http_get_mock = self.get_json([], now=expired_at)
+        http_get_mock.assert_not_called()
+
+    def test_changed_once_expired(self):
+        response = MagicMock(status_code=200, text='{"latest_version": "v1-023f9da22"}', headers={'ETag': '"1"'})
+        self.get_json([response])
+
+        changed_response = MagicMock(status_code=200, text='{"latest_version": "v2-1a8c9c2fc"}', headers={})
+        expired_at = time.time() + constants.DEFAULT_BINTRAY_METADATA_TTL + 1
+        result, http_get_mock = self.get_json([changed_response], now=expired_at)
+        self.assertEqual({'latest_version': 'v2-1a8c9c2fc'}, result)
+
+    def test_cached_per_user(self):
+        response = MagicMock(status_code=200, text='{}', headers={})
+        self.get_json([response], 'username', 'password')
+
+        result, http_get_mock = self.get_json([response], 'other-user', 'password')
+        self.assertEqual(1, http_get_mock.call_count)
+
+    def test_http_error_not_cached(self):
+        response = MagicMock(status_code=404)
+        response.raise_for_status.side_effect = HTTPError('404')
+        self.assertRaises(HTTPError, self.get_json, [response])
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+
 class TestLoadBintrayCredentials(TestCase):
     def test_success(self):
         bintray_credential_file = strip_margin(
@@ -432,33 +600,3 @@ class TestLoadBintrayCredentials(TestCase):
             self.assertIsNone(password)
 
         exists_mock.assert_called_with('{}/.bintray/.credentials'.format(os.path.expanduser('~')))
-
-
-class TestGetJson(TestCase):
-    def test_get_json(self):
-        response_mock = Mock()
-        response_raise_for_status_mock = MagicMock()
-        response_mock.raise_for_status = response_raise_for_status_mock
-        response_mock.text = '[1,2,3]'
-
-        requests_get_mock = MagicMock(return_value=response_mock)
-        with patch('requests.get', requests_get_mock):
-            result = bintray_resolver.get_json('http://site.com', 'username', 'password')
-            self.assertEqual([1, 2, 3], result)
-
-        requests_get_mock.assert_called_with('http://site.com', auth=('username', 'password'))
-        response_raise_for_status_mock.assert_called_with()
-
-    def test_get_json_no_credentials(self):
-        response_mock = Mock()
-        response_raise_for_status_mock = MagicMock()
-        response_mock.raise_for_status = response_raise_for_status_mock
-        response_mock.text = '[1,2,3]'
-
-        requests_get_mock = MagicMock(return_value=response_mock)
-        with patch('requests.get', requests_get_mock):
-            result = bintray_resolver.get_json('http://site.com', None, None)
-            self.assertEqual([1, 2, 3], result)
-
-        requests_get_mock.assert_called_with('http://site.com')
-        response_raise_for_status_mock.assert_called_with()
@@ -0,0 +1,180 @@
+from unittest import TestCase
+from conductr_cli.exceptions import BundleResolutionError
+from conductr_cli.resolvers import directory_resolver
+from conductr_cli.test.cli_test_case import create_mock_logger
+from zipfile import ZipFile
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+class DirectoryResolverTestCase(TestCase):
+    def setUp(self):  # noqa
+        self.repository_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.bundles_dir = os.path.join(self.repository_dir, 'typesafe', 'bundle')
+        os.makedirs(self.bundles_dir)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.repository_dir)
+        shutil.rmtree(self.cache_dir)
+
+    def add_bundle(self, name, compatibility_version, content, mtime):
+        tmp_path = os.path.join(self.repository_dir, 'bundle.tmp')
+        with ZipFile(tmp_path, 'w') as bundle_zip:
+            bundle_zip.writestr('{}/bundle.conf'.format(name),
+                                'name = "{}"\ncompatibilityVersion = "{}"\n'.format(name, compatibility_version))
+            bundle_zip.writestr('{}/content'.format(name), content)
+        with open(tmp_path, 'rb') as bundle_file:
+            digest = hashlib.sha256(bundle_file.read()).hexdigest()
+        path = os.path.join(self.bundles_dir, '{}-{}.zip'.format(name, digest))
+        os.replace(tmp_path, path)
+        os.utime(path, (mtime, mtime))
+        # Changes of the dir further than `MTIME_RESOLUTION` in the past are trusted not to be missed by the index
+        os.utime(self.bundles_dir, (mtime, mtime))
+        return digest
+
+    def resolve(self, uri, resolve=directory_resolver.resolve_bundle):
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('conductr_cli.constants.DEFAULT_BUNDLE_REPOSITORY_DIR', self.repository_dir), \
+                patch('logging.getLogger', get_logger_mock):
+            return resolve(self.cache_dir, uri)
+
+
+class TestResolveBundle(DirectoryResolverTestCase):
+    def test_resolve_latest_of_compatibility_version(self):
+        now = time.time()
+        self.add_bundle('visualizer', '1', 'old', now - 300)
+        digest = self.add_bundle('visualizer', '1', 'new', now - 200)
+        self.add_bundle('visualizer', '2', 'other', now - 100)
+
+        is_resolved, bundle_name, bundle_file = self.resolve('visualizer:v1')
+
+        self.assertTrue(is_resolved)
+        self.assertEqual('visualizer-{}.zip'.format(digest), bundle_name)
+        self.assertTrue(bundle_file.startswith(self.cache_dir))
+        with ZipFile(bundle_file) as bundle_zip:
+            self.assertEqual(b'new', bundle_zip.read('visualizer/content'))
+
+    def test_resolve_highest_compatibility_version(self):
+        now = time.time()
+        digest = self.add_bundle('visualizer', '2', 'old', now - 300)
+        self.add_bundle('visualizer', '1', 'new', now - 200)
+
+        is_resolved, bundle_name, bundle_file = self.resolve('typesafe/bundle/visualizer')
+
+        self.assertTrue(is_resolved)
+        self.assertEqual('visualizer-{}.zip'.format(digest), bundle_name)
+
+    def test_resolve_abbreviated_digest(self):
+        now = time.time()
+        digest = self.add_bundle('visualizer', '1', 'old', now - 300)
+        self.add_bundle('visualizer', '1', 'new', now - 200)
+
+        is_resolved, bundle_name, bundle_file = self.resolve('visualizer:v1-{}'.format(digest[:8]))
+
+        self.assertTrue(is_resolved)
+        self.assertEqual('visualizer-{}.zip'.format(digest), bundle_name)
+
+    def test_resolve_ambiguous_digest(self):
+        now = time.time()
+        self.add_bundle('visualizer', '1', 'old', now - 300)
+        self.add_bundle('visualizer', '1', 'new', now - 200)
+
+        self.assertRaises(BundleResolutionError, self.resolve, 'visualizer:v1-')
+
+    def test_resolve_from_cache(self):
+        self.add_bundle('visualizer', '1', 'content', time.time() - 100)
+
+        self.assertEqual((False, None, None), self.resolve('visualizer', directory_resolver.load_from_cache))
+        is_resolved, bundle_name, bundle_file = self.resolve('visualizer')
+        self.assertTrue(is_resolved)
+
+        self.assertEqual((True, bundle_name, bundle_file),
+                         self.resolve('visualizer', directory_resolver.load_from_cache))
+
+    def test_resolution_logged_once(self):
+        self.add_bundle('visualizer', '1', 'content', time.time() - 100)
+
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('conductr_cli.constants.DEFAULT_BUNDLE_REPOSITORY_DIR', self.repository_dir), \
+                patch('logging.getLogger', get_logger_mock):
+            directory_resolver.load_from_cache(self.cache_dir, 'visualizer')
+            directory_resolver.resolve_bundle(self.cache_dir, 'visualizer')
+
+        resolving_message = 'Resolving bundle from {} typesafe/bundle/visualizer'.format(self.repository_dir)
+        self.assertEqual(1, [call[0][0] for call in log_mock.info.call_args_list].count(resolving_message))
+
+    def test_not_found(self):
+        self.add_bundle('visualizer', '1', 'content', time.time() - 100)
+
+        self.assertEqual((False, None, None), self.resolve('visualizer:v2'))
+        self.assertEqual((False, None, None), self.resolve('eslite'))
+        self.assertEqual((False, None, None), self.resolve('other-org/bundle/visualizer'))
+        self.assertEqual((False, None, None), self.resolve('/tmp/visualizer.zip'))
+
+    def test_ignore_files_which_are_not_bundles(self):
+        with open(os.path.join(self.bundles_dir, 'visualizer.zip'), 'w') as other_file:
+            other_file.write('not a bundle')
+        digest = self.add_bundle('visualizer', '1', 'content', time.time() - 100)
+
+        is_resolved, bundle_name, bundle_file = self.resolve('visualizer')
+
+        self.assertTrue(is_resolved)
+        self.assertEqual('visualizer-{}.zip'.format(digest), bundle_name)
+
+
+class TestIndexedBundles(DirectoryResolverTestCase):
+    def test_index_reused_while_dir_unchanged(self):
+        self.add_bundle('visualizer', '1', 'content', time.time() - 100)
+        self.resolve('visualizer')
+
+        listdir_mock = MagicMock(side_effect=os.listdir)
+        with patch('os.listdir', listdir_mock):
+            is_resolved, bundle_name, bundle_file = self.resolve('visualizer')
+
+        self.assertTrue(is_resolved)
+        self.assertFalse(any([call[0][0] == self.bundles_dir for call in listdir_mock.call_args_list]))
+
+    def test_only_added_bundles_read(self):
+        now = time.time()
+        self.add_bundle('visualizer', '1', 'old', now - 300)
+        self.resolve('visualizer')
+
+        digest = self.add_bundle('visualizer', '1', 'new', now - 200)
+        read_bundle_mock = MagicMock(side_effect=directory_resolver.read_bundle)
+        with patch('conductr_cli.resolvers.directory_resolver.read_bundle', read_bundle_mock):
+            is_resolved, bundle_name, bundle_file = self.resolve('visualizer')
+
+        self.assertEqual('visualizer-{}.zip'.format(digest), bundle_name)
+        self.assertEqual(1, read_bundle_mock.call_count)
+        self.assertEqual('visualizer-{}.zip'.format(digest), read_bundle_mock.call_args[0][1])
+
+    def test_removed_bundles_dropped(self):
+        now = time.time()
+        digest = self.add_bundle('visualizer', '1', 'old', now - 300)
+        removed_digest = self.add_bundle('visualizer', '1', 'new', now - 200)
+        self.resolve('visualizer')
+
+        os.remove(os.path.join(self.bundles_dir, 'visualizer-{}.zip'.format(removed_digest)))
+        os.utime(self.bundles_dir, (now - 100, now - 100))
+        is_resolved, bundle_name, bundle_file = self.resolve('visualizer')
+
+        self.assertEqual('visualizer-{}.zip'.format(digest), bundle_name)
+
+    def test_recently_modified_dir_listed_again(self):
+        self.add_bundle('visualizer', '1', 'content', time.time())
+        self.resolve('visualizer')
+
+        listdir_mock = MagicMock(side_effect=os.listdir)
+        with patch('os.listdir', listdir_mock):
+            self.resolve('visualizer')
+
+        self.assertTrue(any([call[0][0] == self.bundles_dir for call in listdir_mock.call_args_list]))
@@ -1,32 +1,42 @@
 from unittest import TestCase
 from urllib.error import URLError
 from conductr_cli.resolvers import uri_resolver
-from conductr_cli.test.cli_test_case import create_mock_logger
+from conductr_cli.test.cli_test_case import create_mock_logger, create_streamed_response
 import os
+import shutil
+import tempfile
+import threading
+import time
 
 try:
-    from unittest.mock import call, patch, MagicMock  # 3.3 and beyond
+    from unittest.mock import call, patch, ANY, MagicMock  # 3.3 and beyond
 except ImportError:
-    from mock import call, patch, MagicMock
+    from mock import call, patch, ANY, MagicMock
 
 
 class TestResolveBundle(TestCase):
     def test_resolve_success(self):
         os_path_exists_mock = MagicMock(side_effect=[True, True])
         os_remove_mock = MagicMock()
-        file_move_mock = MagicMock()
-        cache_path_mock = MagicMock(return_value='/bundle-cached-path')
+        lock_uri_mock = MagicMock()
+        lookup_mock = MagicMock(return_value=None)
+        lookup_digest_mock = MagicMock(return_value=None)
+        temp_path_mock = MagicMock(return_value='/cache-dir/bundle-url.tmp')
+        store_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        download_mock = MagicMock(return_value='digest')
 
         get_logger_mock, log_mock = create_mock_logger()
 
         with patch('os.path.exists', os_path_exists_mock), \
                 patch('os.remove', os_remove_mock), \
-                patch('shutil.move', file_move_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
+                patch('conductr_cli.resolve_cache.lock_uri', lock_uri_mock), \
+                patch('conductr_cli.resolve_cache.lookup', lookup_mock), \
+                patch('conductr_cli.resolve_cache.lookup_digest', lookup_digest_mock), \
+                patch('conductr_cli.resolve_cache.temp_path', temp_path_mock), \
+                patch('conductr_cli.resolve_cache.store', store_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.downloader.download', download_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir', '/bundle-url')
             self.assertTrue(is_resolved)
@@ -35,33 +45,43 @@ class TestResolveBundle(TestCase):
 
         self.assertEqual([
             call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir/bundle-url.tmp')
         ], os_path_exists_mock.call_args_list)
-        cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
-        file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
+        lock_uri_mock.assert_called_with('/cache-dir', '/bundle-url')
+        # Local files are never looked up in the cache
+        lookup_mock.assert_not_called()
+        lookup_digest_mock.assert_not_called()
+        temp_path_mock.assert_called_with('/cache-dir', '/bundle-url')
+        os_remove_mock.assert_called_with('/cache-dir/bundle-url.tmp')
+        download_mock.assert_called_with('/bundle-url-resolved', '/cache-dir/bundle-url.tmp', auth=None, on_progress=ANY)
+        store_mock.assert_called_with('/cache-dir', '/bundle-url', 'bundle-name', '/cache-dir/bundle-url.tmp', 'digest')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving /bundle-url-resolved')
 
     def test_resolve_success_create_cache_dir(self):
         os_path_exists_mock = MagicMock(side_effect=[False, False])
-        file_move_mock = MagicMock()
         os_mkdirs_mock = MagicMock(return_value=())
-        cache_path_mock = MagicMock(return_value='/bundle-cached-path')
+        lock_uri_mock = MagicMock()
+        lookup_mock = MagicMock(return_value=None)
+        lookup_digest_mock = MagicMock(return_value=None)
+        temp_path_mock = MagicMock(return_value='/cache-dir/bundle-url.tmp')
+        store_mock = MagicMock(return_value='/bundle-cached-path')
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        download_mock = MagicMock(return_value='digest')
 
         get_logger_mock, log_mock = create_mock_logger()
 
         with patch('os.path.exists', os_path_exists_mock), \
                 patch('os.makedirs', os_mkdirs_mock), \
-                patch('shutil.move', file_move_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
+                patch('conductr_cli.resolve_cache.lock_uri', lock_uri_mock), \
+                patch('conductr_cli.resolve_cache.lookup', lookup_mock), \
+                patch('conductr_cli.resolve_cache.lookup_digest', lookup_digest_mock), \
+                patch('conductr_cli.resolve_cache.temp_path', temp_path_mock), \
+                patch('conductr_cli.resolve_cache.store', store_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.downloader.download', download_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir', '/bundle-url')
             self.assertTrue(is_resolved)
@@ -70,29 +90,66 @@ class TestResolveBundle(TestCase):
 
         self.assertEqual([
             call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir/bundle-url.tmp')
         ], os_path_exists_mock.call_args_list)
-        os_mkdirs_mock.assert_called_with('/cache-dir')
-        cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
+        os_mkdirs_mock.assert_called_with('/cache-dir', exist_ok=True)
         get_url_mock.assert_called_with('/bundle-url')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
-        file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
+        download_mock.assert_called_with('/bundle-url-resolved', '/cache-dir/bundle-url.tmp', auth=None, on_progress=ANY)
+        store_mock.assert_called_with('/cache-dir', '/bundle-url', 'bundle-name', '/cache-dir/bundle-url.tmp', 'digest')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving /bundle-url-resolved')
 
+    def test_resolve_cached_from_other_uri(self):
+        os_path_exists_mock = MagicMock(return_value=True)
+        lock_uri_mock = MagicMock()
+        lookup_mock = MagicMock(return_value=None)
+        lookup_digest_mock = MagicMock(return_value='/bundle-cached-path')
+        get_url_mock = MagicMock(return_value=('bundle-name', 'http://mirror.com/bundle-url-resolved'))
+        download_mock = MagicMock(return_value='digest')
+
+        get_logger_mock, log_mock = create_mock_logger()
+
+        with patch('os.path.exists', os_path_exists_mock), \
+                patch('conductr_cli.resolve_cache.lock_uri', lock_uri_mock), \
+                patch('conductr_cli.resolve_cache.lookup', lookup_mock), \
+                patch('conductr_cli.resolve_cache.lookup_digest', lookup_digest_mock), \
+                patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
+                patch('conductr_cli.downloader.download', download_mock), \
+                patch('logging.getLogger', get_logger_mock):
+            is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir',
+                                                                                'http://mirror.com/bundle-url')
+            self.assertTrue(is_resolved)
+            self.assertEqual('bundle-name', bundle_name)
+            self.assertEqual('/bundle-cached-path', bundle_file)
+
+        lock_uri_mock.assert_called_with('/cache-dir', 'http://mirror.com/bundle-url')
+        lookup_mock.assert_called_with('/cache-dir', 'http://mirror.com/bundle-url')
+        lookup_digest_mock.assert_called_with('/cache-dir', 'http://mirror.com/bundle-url', 'bundle-name')
+        download_mock.assert_not_called()
+
+        log_mock.info.assert_called_with('Retrieving from cache /bundle-cached-path')
+
     def test_resolve_not_found(self):
         os_path_exists_mock = MagicMock(side_effect=[True, False])
-        cache_path_mock = MagicMock(return_value='/bundle-cached-path')
-        urlretrieve_mock = MagicMock(side_effect=URLError('no_such.bundle'))
+        lock_uri_mock = MagicMock()
+        lookup_mock = MagicMock(return_value=None)
+        lookup_digest_mock = MagicMock(return_value=None)
+        temp_path_mock = MagicMock(return_value='/cache-dir/bundle-url.tmp')
+        store_mock = MagicMock()
+        download_mock = MagicMock(side_effect=URLError('no_such.bundle'))
         get_url_mock = MagicMock(return_value=('bundle-name', '/bundle-url-resolved'))
 
         get_logger_mock, log_mock = create_mock_logger()
 
         with patch('os.path.exists', os_path_exists_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
+                patch('conductr_cli.resolve_cache.lock_uri', lock_uri_mock), \
+                patch('conductr_cli.resolve_cache.lookup', lookup_mock), \
+                patch('conductr_cli.resolve_cache.lookup_digest', lookup_digest_mock), \
+                patch('conductr_cli.resolve_cache.temp_path', temp_path_mock), \
+                patch('conductr_cli.resolve_cache.store', store_mock), \
                 patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+                patch('conductr_cli.downloader.download', download_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir', '/bundle-url')
             self.assertFalse(is_resolved)
@@ -101,16 +158,93 @@ class TestResolveBundle(TestCase):
 
         self.assertEqual([
             call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
+            call('/cache-dir/bundle-url.tmp')
         ], os_path_exists_mock.call_args_list)
-        cache_path_mock.assert_called_with('/cache-dir', '/bundle-url')
         get_url_mock.assert_called_with('/bundle-url')
-        urlretrieve_mock.assert_called_with('/bundle-url-resolved', '/bundle-cached-path.tmp')
+        download_mock.assert_called_with('/bundle-url-resolved', '/cache-dir/bundle-url.tmp', auth=None, on_progress=ANY)
+        store_mock.assert_not_called()
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
         log_mock.info.assert_called_with('Retrieving /bundle-url-resolved')
 
 
+class TestConcurrentResolveBundle(TestCase):
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def test_download_once(self):
+        def slow_download(url, **kwargs):
+            time.sleep(0.2)
+            return create_streamed_response(200, b'bundle content', {'Content-Length': '14'})
+
+        http_get_mock = MagicMock(side_effect=slow_download)
+        get_logger_mock, log_mock = create_mock_logger()
+        results = []
+
+        def resolve():
+            results.append(uri_resolver.resolve_bundle(self.cache_dir, 'http://site.com/bundle.zip'))
+
+        with patch('conductr_cli.http.get', http_get_mock), \
+                patch('logging.getLogger', get_logger_mock):
+            threads = [threading.Thread(target=resolve) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(1, http_get_mock.call_count)
+        self.assertEqual(3, len(results))
+        self.assertEqual(1, len(set(results)))
+        is_resolved, bundle_name, bundle_file = results[0]
+        with open(bundle_file, 'rb') as f:
+            self.assertEqual(b'bundle content', f.read())
+        self.assertEqual([], [name for name in os.listdir(self.cache_dir) if name.endswith(('.tmp', '.part'))])
+
+
+class TestResolveBundleOffline(TestCase):
+    def test_cached(self):
+        lookup_mock = MagicMock(return_value=None)
+        lookup_digest_mock = MagicMock(return_value='/cache-dir/blobs/digest/bundle-file.zip')
+        http_get_mock = MagicMock()
+
+        with patch('conductr_cli.resolve_cache.lookup', lookup_mock), \
+                patch('conductr_cli.resolve_cache.lookup_digest', lookup_digest_mock), \
+                patch('conductr_cli.http.get', http_get_mock):
+            is_resolved, bundle_name, bundle_file = \
+                uri_resolver.resolve_bundle_offline('/cache-dir', 'http://site.com/path/bundle-file.zip')
+            self.assertTrue(is_resolved)
+            self.assertEqual('bundle-file.zip', bundle_name)
+            self.assertEqual('/cache-dir/blobs/digest/bundle-file.zip', bundle_file)
+
+        lookup_mock.assert_called_with('/cache-dir', 'http://site.com/path/bundle-file.zip')
+        lookup_digest_mock.assert_called_with('/cache-dir', 'http://site.com/path/bundle-file.zip', 'bundle-file.zip')
+        http_get_mock.assert_not_called()
+
+    def test_not_cached(self):
+        http_get_mock = MagicMock()
+
+        with patch('conductr_cli.resolve_cache.lookup', MagicMock(return_value=None)), \
+                patch('conductr_cli.resolve_cache.lookup_digest', MagicMock(return_value=None)), \
+                patch('conductr_cli.http.get', http_get_mock):
+            is_resolved, bundle_name, bundle_file = \
+                uri_resolver.resolve_bundle_offline('/cache-dir', 'http://site.com/path/bundle-file.zip')
+            self.assertFalse(is_resolved)
+
+        http_get_mock.assert_not_called()
+
+    def test_local_file(self):
+        resolve_bundle_mock = MagicMock(return_value=(True, 'bundle.zip', '/cache-dir/blobs/digest/bundle.zip'))
+
+        with patch('conductr_cli.resolvers.uri_resolver.resolve_bundle', resolve_bundle_mock):
+            result = uri_resolver.resolve_bundle_offline('/cache-dir', '/tmp/bundle.zip')
+            self.assertEqual((True, 'bundle.zip', '/cache-dir/blobs/digest/bundle.zip'), result)
+
+        resolve_bundle_mock.assert_called_with('/cache-dir', '/tmp/bundle.zip')
+
+
 class TestLoadFromCache(TestCase):
     def test_file(self):
         is_resolved, bundle_name, bundle_file = uri_resolver.load_from_cache('/cache-dir', '/tmp/bundle.zip')
@@ -119,34 +253,34 @@ class TestLoadFromCache(TestCase):
         self.assertIsNone(bundle_file)
 
     def test_uri_found(self):
-        exists_mock = MagicMock(return_value=True)
+        lookup_mock = MagicMock(return_value='/cache-dir/blobs/digest/bundle-file.zip')
 
         get_logger_mock, log_mock = create_mock_logger()
 
-        with patch('os.path.exists', exists_mock), \
+        with patch('conductr_cli.resolve_cache.lookup', lookup_mock), \
                 patch('logging.getLogger', get_logger_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.load_from_cache('/cache-dir',
                                                                                  'http://site.com/path/bundle-file.zip')
             self.assertTrue(is_resolved)
             self.assertEqual('bundle-file.zip', bundle_name)
-            self.assertEqual('/cache-dir/bundle-file.zip', bundle_file)
+            self.assertEqual('/cache-dir/blobs/digest/bundle-file.zip', bundle_file)
 
-        exists_mock.assert_called_with('/cache-dir/bundle-file.zip')
+        lookup_mock.assert_called_with('/cache-dir', 'http://site.com/path/bundle-file.zip')
 
         get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
-        log_mock.info.assert_called_with('Retrieving from cache /cache-dir/bundle-file.zip')
+        log_mock.info.assert_called_with('Retrieving from cache /cache-dir/blobs/digest/bundle-file.zip')
 
     def test_uri_not_found(self):
-        exists_mock = MagicMock(return_value=False)
+        lookup_mock = MagicMock(return_value=None)
 
-        with patch('os.path.exists', exists_mock):
+        with patch('conductr_cli.resolve_cache.lookup', lookup_mock):
             is_resolved, bundle_name, bundle_file = uri_resolver.load_from_cache('/cache-dir',
                                                                                  'http://site.com/path/bundle-file.zip')
             self.assertFalse(is_resolved)
             self.assertIsNone(bundle_name)
             self.assertIsNone(bundle_file)
 
-        exists_mock.assert_called_with('/cache-dir/bundle-file.zip')
+        lookup_mock.assert_called_with('/cache-dir', 'http://site.com/path/bundle-file.zip')
 
 
 class TestGetUrl(TestCase):
@@ -179,93 +313,62 @@ class TestGetUrl(TestCase):
             'file:///basedir/bundle-1.0-e78ed07d4a895e14595a21aef1bf616b1b0e4d886f3265bc7b152acf93d259b5.zip', url)
 
 
-class TestCachePath(TestCase):
-    def test_cache_path_file(self):
-        result = uri_resolver.cache_path('/cache-dir', '/var/test/file.zip')
-        self.assertEqual('/cache-dir/file.zip', result)
-
-    def test_cache_path_url(self):
-        result = uri_resolver.cache_path('/cache-dir', 'http://some-site.com/path/test/file.zip')
-        self.assertEqual('/cache-dir/file.zip', result)
+class TestProgressBar(TestCase):
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
 
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
 
-class TestProgressBar(TestCase):
     def test_show_progress_bar(self):
-        os_path_exists_mock = MagicMock(side_effect=[True, True])
-        os_remove_mock = MagicMock()
-        file_move_mock = MagicMock()
-        cache_path_mock = MagicMock(return_value='/bundle-cached-path')
-        get_url_mock = MagicMock(return_value=('bundle-name', 'http://site.com/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
-        report_hook_mock = MagicMock()
-        show_progress_mock = MagicMock(return_value=report_hook_mock)
+        response = create_streamed_response(200, b'bundle content', {'Content-Length': '14'})
+        report_progress_mock = MagicMock()
+        show_progress_mock = MagicMock(return_value=report_progress_mock)
 
         get_logger_mock, log_mock = create_mock_logger()
 
-        with patch('os.path.exists', os_path_exists_mock), \
-                patch('os.remove', os_remove_mock), \
-                patch('shutil.move', file_move_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+        with patch('conductr_cli.http.get', MagicMock(return_value=response)), \
                 patch('conductr_cli.resolvers.uri_resolver.show_progress', show_progress_mock), \
                 patch('logging.getLogger', get_logger_mock):
-            is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir',
-                                                                                'http://site.com/bundle-url')
+            is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle(self.cache_dir,
+                                                                                'http://site.com/bundle.zip')
             self.assertTrue(is_resolved)
-            self.assertEqual('bundle-name', bundle_name)
-            self.assertEqual('/bundle-cached-path', bundle_file)
-
-        self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
-        ], os_path_exists_mock.call_args_list)
-        cache_path_mock.assert_called_with('/cache-dir', 'http://site.com/bundle-url')
-        get_url_mock.assert_called_with('http://site.com/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('http://site.com/bundle-url-resolved',
-                                            '/bundle-cached-path.tmp', reporthook=report_hook_mock)
-        file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
+            self.assertEqual('bundle.zip', bundle_name)
 
-        get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
-        log_mock.info.assert_called_with('Retrieving http://site.com/bundle-url-resolved')
+        self.assertEqual([call(4, 14), call(8, 14), call(12, 14), call(14, 14)], report_progress_mock.call_args_list)
+        log_mock.info.assert_called_with('Retrieving http://site.com/bundle.zip')
 
     def test_no_progress_bar_given_quiet_mode(self):
-        os_path_exists_mock = MagicMock(side_effect=[True, True])
-        os_remove_mock = MagicMock()
-        file_move_mock = MagicMock()
-        cache_path_mock = MagicMock(return_value='/bundle-cached-path')
-        get_url_mock = MagicMock(return_value=('bundle-name', 'http://site.com/bundle-url-resolved'))
-        urlretrieve_mock = MagicMock()
+        response = create_streamed_response(200, b'bundle content', {'Content-Length': '14'})
+        show_progress_mock = MagicMock()
 
         get_logger_mock, log_mock = create_mock_logger()
         log_mock.is_progress_enabled = MagicMock(return_value=False)
 
-        with patch('os.path.exists', os_path_exists_mock), \
-                patch('os.remove', os_remove_mock), \
-                patch('shutil.move', file_move_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.cache_path', cache_path_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.get_url', get_url_mock), \
-                patch('conductr_cli.resolvers.uri_resolver.urlretrieve', urlretrieve_mock), \
+        with patch('conductr_cli.http.get', MagicMock(return_value=response)), \
+                patch('conductr_cli.resolvers.uri_resolver.show_progress', show_progress_mock), \
                 patch('logging.getLogger', get_logger_mock):
-            is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle('/cache-dir',
-                                                                                'http://site.com/bundle-url')
+            is_resolved, bundle_name, bundle_file = uri_resolver.resolve_bundle(self.cache_dir,
+                                                                                'http://site.com/bundle.zip')
             self.assertTrue(is_resolved)
-            self.assertEqual('bundle-name', bundle_name)
-            self.assertEqual('/bundle-cached-path', bundle_file)
+            self.assertEqual('bundle.zip', bundle_name)
 
-        self.assertEqual([
-            call('/cache-dir'),
-            call('/bundle-cached-path.tmp')
-        ], os_path_exists_mock.call_args_list)
-        cache_path_mock.assert_called_with('/cache-dir', 'http://site.com/bundle-url')
-        get_url_mock.assert_called_with('http://site.com/bundle-url')
-        os_remove_mock.assert_called_with('/bundle-cached-path.tmp')
-        urlretrieve_mock.assert_called_with('http://site.com/bundle-url-resolved', '/bundle-cached-path.tmp')
-        file_move_mock.assert_called_with('/bundle-cached-path.tmp', '/bundle-cached-path')
+        show_progress_mock.assert_not_called()
 
-        get_logger_mock.assert_called_with('conductr_cli.resolvers.uri_resolver')
-        log_mock.info.assert_called_with('Retrieving http://site.com/bundle-url-resolved')
+
+class TestDownloadBundle(TestCase):
+    def test_auth(self):
+        download_mock = MagicMock(return_value='digest')
+        get_logger_mock, log_mock = create_mock_logger()
+        log_mock.is_progress_enabled = MagicMock(return_value=False)
+
+        with patch('conductr_cli.downloader.download', download_mock):
+            digest = uri_resolver.download_bundle(log_mock, 'http://site.com/bundle.zip', '/cache-dir/bundle.tmp',
+                                                  ('username', 'password'))
+
+        self.assertEqual('digest', digest)
+        download_mock.assert_called_with('http://site.com/bundle.zip', '/cache-dir/bundle.tmp',
+                                         auth=('username', 'password'), on_progress=None)
 
 
 class TestShowProgress(TestCase):
@@ -280,14 +383,14 @@ class TestShowProgress(TestCase):
         with patch('conductr_cli.screen_utils.progress_bar', progress_bar_mock):
             progress_tracker = uri_resolver.show_progress(log_mock)
 
-            progress_tracker(0, 10, 200)
+            progress_tracker(0, 200)
             progress_bar_mock.assert_called_with(0, 200)
             log_progress_mock.assert_called_with('mock progress bar', flush=False)
 
-            progress_tracker(5, 10, 200)
+            progress_tracker(50, 200)
             progress_bar_mock.assert_called_with(50, 200)
             log_progress_mock.assert_called_with('mock progress bar', flush=False)
 
-            progress_tracker(20, 10, 200)
+            progress_tracker(200, 200)
             progress_bar_mock.assert_called_with(200, 200)
             log_progress_mock.assert_called_with('mock progress bar', flush=True)
@@ -1,34 +1,66 @@
-from urllib.request import urlretrieve
 from urllib.parse import ParseResult, urlparse, urlunparse
 from urllib.error import URLError
 from pathlib import Path
-from conductr_cli import screen_utils
+from requests.exceptions import RequestException
+from conductr_cli import downloader, logging_setup, resolve_cache, screen_utils
 import os
 import logging
-import shutil
-import urllib
 
 
 def resolve_bundle(cache_dir, uri, auth=None):
     log = logging.getLogger(__name__)
 
     if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
+        # The cache dir may be created meanwhile when bundles are resolved concurrently
+        os.makedirs(cache_dir, exist_ok=True)
 
     try:
         bundle_name, bundle_url = get_url(uri)
 
-        cached_file = cache_path(cache_dir, uri)
-        tmp_download_path = '{}.tmp'.format(cached_file)
+        # Processes resolving the same uri take turns, so that the uri is downloaded by the first one and found in the
+        # cache by the others
+        with resolve_cache.lock_uri(cache_dir, uri):
+            # Local files are always copied, as they may have been changed since they were last resolved
+            is_local_file = urlparse(bundle_url, scheme='file').scheme == 'file'
+            cached_file = None if is_local_file else \
+                resolve_cache.lookup(cache_dir, uri) or resolve_cache.lookup_digest(cache_dir, uri, bundle_name)
+            if cached_file is not None:
+                log.info('Retrieving from cache {}'.format(cached_file))
+                return True, bundle_name, cached_file
+
+            if is_http_url(bundle_url):
+                # The partially downloaded file is kept if the download fails, so that it's resumed by the next attempt
+                download_path = resolve_cache.partial_path(cache_dir, uri)
+                digest = download_bundle(log, bundle_url, download_path, auth)
+                cached_file = resolve_cache.store(cache_dir, uri, bundle_name, download_path, digest)
+            else:
+                tmp_download_path = resolve_cache.temp_path(cache_dir, uri)
+                try:
+                    digest = download_bundle(log, bundle_url, tmp_download_path, auth)
+                    cached_file = resolve_cache.store(cache_dir, uri, bundle_name, tmp_download_path, digest)
+                finally:
+                    if os.path.exists(tmp_download_path):
+                        os.remove(tmp_download_path)
 
-        if os.path.exists(tmp_download_path):
-            os.remove(tmp_download_path)
+            return True, bundle_name, cached_file
+    except (URLError, RequestException):
+        return False, None, None
 
-        download_bundle(log, bundle_url, tmp_download_path, auth)
 
-        shutil.move(tmp_download_path, cached_file)
+def resolve_bundle_offline(cache_dir, uri):
+    """
+    Resolves local files, and uris which have been resolved before from the cache.
+    """
+    bundle_name, bundle_url = get_url(uri)
+    if not is_http_url(bundle_url):
+        return resolve_bundle(cache_dir, uri)
+
+    log = logging.getLogger(__name__)
+    cached_file = resolve_cache.lookup(cache_dir, uri) or resolve_cache.lookup_digest(cache_dir, uri, bundle_name)
+    if cached_file is not None:
+        log.info('Retrieving from cache {}'.format(cached_file))
         return True, bundle_name, cached_file
-    except URLError:
+    else:
         return False, None, None
 
 
@@ -40,8 +72,8 @@ def load_from_cache(cache_dir, uri):
     else:
         log = logging.getLogger(__name__)
 
-        cached_file = cache_path(cache_dir, uri)
-        if os.path.exists(cached_file):
+        cached_file = resolve_cache.lookup(cache_dir, uri)
+        if cached_file is not None:
             bundle_name = os.path.basename(cached_file)
             log.info('Retrieving from cache {}'.format(cached_file))
             return True, bundle_name, cached_file
@@ -60,38 +92,23 @@ def get_url(uri):
     return os.path.basename(url), url
 
 
-def cache_path(cache_dir, uri):
-    parsed = urlparse(uri, scheme='file')
-    basename = os.path.basename(parsed.path)
-    return '{}/{}'.format(cache_dir, basename)
+def is_http_url(url):
+    return urlparse(url, scheme='file').scheme in ['http', 'https']
 
 
-def download_bundle(log, bundle_url, tmp_download_path, auth):
+def download_bundle(log, bundle_url, download_path, auth):
+    """
+    Downloads the bundle, returning its digest. The auth is an optional `(username, password)` tuple.
+    """
     log.info('Retrieving {}'.format(bundle_url))
 
-    parsed = urlparse(bundle_url, scheme='file')
-    is_http_download = parsed.scheme == 'http' or parsed.scheme == 'https'
-
-    if is_http_download and auth:
-        realm, username, password = auth
-        authinfo = urllib.request.HTTPBasicAuthHandler()
-        authinfo.add_password(realm=realm,
-                              uri=bundle_url,
-                              user=username,
-                              passwd=password)
-        opener = urllib.request.build_opener(authinfo)
-        urllib.request.install_opener(opener)
-
-    if log.is_progress_enabled() and is_http_download:
-        urlretrieve(bundle_url, tmp_download_path, reporthook=show_progress(log))
-    else:
-        # File based download, no need to show progress bar
-        urlretrieve(bundle_url, tmp_download_path)
+    on_progress = show_progress(log) if log.is_progress_enabled() else None
+    with logging_setup.progress_line():
+        return downloader.download(bundle_url, download_path, auth=auth, on_progress=on_progress)
 
 
 def show_progress(log):
-    def continue_logging(count, block_size, total_size):
-        downloaded_size = count * block_size
+    def continue_logging(downloaded_size, total_size):
         is_download_complete = downloaded_size >= total_size
         progress_bar_text = screen_utils.progress_bar(downloaded_size, total_size)
         log.progress(progress_bar_text, flush=is_download_complete)
@@ -23,3 +23,19 @@ def progress_bar(current_size, total_size, bar_length=50):
 
     progress = ''.join([progress_character(i) for i in range(1, bar_length)])
     return '[{}] {}'.format(progress, '%3d%%' % percent)
+
+
+def size(number_of_bytes):
+    if number_of_bytes < 1024:
+        return '{} B'.format(int(number_of_bytes))
+
+    for unit in ['KB', 'MB', 'GB']:
+        number_of_bytes /= 1024
+        if number_of_bytes < 1024 or unit == 'GB':
+            return '{:.1f} {}'.format(number_of_bytes, unit)
+
+
+def duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}:{:02d}:{:02d}'.format(hours, minutes, seconds) if hours else '{}:{:02d}'.format(minutes, seconds)
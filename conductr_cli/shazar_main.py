@@ -1,13 +1,98 @@
 import argcomplete
 import argparse
+from collections import deque
 from functools import partial
-from conductr_cli import logging_setup
+from itertools import chain
+from conductr_cli import logging_setup, screen_utils
 import hashlib
+import io
 import logging
+import multiprocessing
 import os
 import shutil
+import stat
+import struct
+import sys
 import tempfile
+import time
 import zipfile
+import zlib
+
+
+# Size of the buffer the archive is written through, so that it's written with few system calls
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+DIGEST_READ_SIZE = 1024 * 1024
+
+# Size of the chunks files are read and compressed in
+COMPRESS_READ_SIZE = 1024 * 1024
+
+# Files are compressed in memory up to this size, and into a temporary file otherwise
+MAX_IN_MEMORY_SIZE = 16 * 1024 * 1024
+
+# Files of these types are compressed already, so they're stored as is rather than deflated
+STORED_EXTENSIONS = ('.jar', '.war', '.ear', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.png', '.jpg', '.jpeg',
+                     '.gif', '.ico', '.woff', '.woff2', '.mp3', '.mp4')
+
+# Files of other types are deflated if their first `COMPRESSIBILITY_SAMPLE_SIZE` bytes, deflated at the fastest level,
+# are reduced to less than `MAX_COMPRESSION_RATIO` of their size
+COMPRESSIBILITY_SAMPLE_SIZE = 64 * 1024
+MAX_COMPRESSION_RATIO = 0.9
+
+DEFAULT_COMPRESSION_LEVEL = 6
+
+# Files of reproducible archives are dated with the earliest date a zip archive can record, unless a date is given by
+# the `SOURCE_DATE_EPOCH` environment variable, see https://reproducible-builds.org/specs/source-date-epoch/
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Latest year a zip archive can record
+MAX_ZIP_YEAR = 2107
+
+# Size of the local header preceding the name, extra field and data of each file of a zip archive
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+# Id of the extra field recording the level a file has been deflated with, so that a deflated file is only reused by
+# an archive deflating files with the same level. The field holds the level as a single byte.
+COMPRESSION_LEVEL_EXTRA_ID = 0x6c63
+
+# Number of files compressed ahead of the file being written to the archive, per process, so that the processes are
+# kept busy.
+FILES_AHEAD_PER_JOB = 4
+
+# Size of the files compressed ahead of the file being written to the archive, whatever the number of processes. Bounds
+# the memory holding the compressed files waiting to be written, as files up to `MAX_IN_MEMORY_SIZE` are compressed in
+# memory.
+MAX_SIZE_AHEAD = 64 * 1024 * 1024
+
+# Archives are only written to unseekable files, which is what allows them to be hashed as they're written, from
+# Python 3.5 onwards. They're hashed once written otherwise.
+IS_HASHED_WHILE_WRITTEN = sys.version_info >= (3, 5)
+
+
+class HashingWriter:
+    """
+    Unseekable file-like object writing to `file`, which computes the SHA-256 digest of the bytes written.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+        self.position = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.file.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        self.file.flush()
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
 
 
 def run(argv=None):
@@ -15,7 +100,9 @@ def run(argv=None):
     argcomplete.autocomplete(parser)
     args = parser.parse_args(argv)
     logging_setup.configure_logging(args)
-    args.func(args)
+    is_completed_without_error = args.func(args)
+    if not is_completed_without_error:
+        exit(1)
 
 
 def build_parser():
@@ -25,6 +112,31 @@ def build_parser():
     parser.add_argument('--output-dir',
                         default='.',
                         help="The optional output directory, defaults to '.'")
+    parser.add_argument('--jobs', '-j',
+                        type=int,
+                        default=1,
+                        help='The number of processes compressing files in parallel, defaults to 1')
+    parser.add_argument('--compression-level',
+                        type=int,
+                        choices=range(10),
+                        metavar='{0-9}',
+                        default=DEFAULT_COMPRESSION_LEVEL,
+                        help='The level files are deflated with, from 1 (fastest) to 9 (smallest), or 0 to store '
+                             'every file as is, defaults to {}'.format(DEFAULT_COMPRESSION_LEVEL))
+    parser.add_argument('--previous-archive',
+                        help='An archive previously created from the same source, whose compressed files are reused '
+                             'for the files which haven\'t changed since')
+    parser.add_argument('--reproducible',
+                        help='Create the same archive from the same files, whatever their modification time and '
+                             'permissions, so that the archive gets the same digest',
+                        default=False,
+                        dest='reproducible',
+                        action='store_true')
+    parser.add_argument('-v', '--verbose',
+                        help='Print the compression of every file',
+                        default=False,
+                        dest='verbose',
+                        action='store_true')
     parser.add_argument('source',
                         help='Path to a bundle directory or bundle configuration file')
     parser.set_defaults(func=shazar)
@@ -34,29 +146,354 @@ def build_parser():
 def shazar(args):
     log = logging.getLogger(__name__)
     source_base_name = os.path.basename(args.source.rstrip('\\/'))
-    # Create an empty tempfile
-    temp_file = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
-    temp_file.close()
-    temp_file_name = temp_file.name
-
-    with zipfile.ZipFile(temp_file_name, 'w') as zip_file:
-        if os.path.isdir(args.source):
-            for (dir_path, dir_names, file_names) in os.walk(args.source):
-                for file_name in file_names:
-                    path = os.path.join(dir_path, file_name)
-                    name = os.path.join(source_base_name, os.path.relpath(path, start=args.source))
-                    zip_file.write(path, name)
-        else:
-            zip_file.write(args.source, source_base_name)
+    if args.reproducible:
+        source_date_epoch = os.getenv('SOURCE_DATE_EPOCH')
+        try:
+            date_time = reproducible_date_time(source_date_epoch)
+        except (ValueError, OverflowError, OSError):
+            log.error('SOURCE_DATE_EPOCH is set to {}, which isn\'t a date a zip archive can record.'.format(
+                source_date_epoch))
+            log.error('Set it to a number of seconds since 1970-01-01 00:00:00 UTC.')
+            return False
+    else:
+        date_time = None
+    started_at = time.monotonic()
+    # The archive is written within the output dir, so that it's renamed rather than copied once its digest is known.
+    # The output dir may be within the source, from which the archive and the temp dir are then excluded.
+    fd, temp_file_name = tempfile.mkstemp(suffix='.zip', dir=args.output_dir)
+    temp_dir = tempfile.mkdtemp(dir=args.output_dir)
+    try:
+        with open(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as temp_file:
+            if IS_HASHED_WHILE_WRITTEN:
+                hashing_writer = HashingWriter(temp_file)
+                stats = write_archive(hashing_writer, args.source, source_base_name, args.jobs,
+                                      args.compression_level, date_time, args.previous_archive, temp_dir,
+                                      [temp_file_name, temp_dir])
+                digest = hashing_writer.hexdigest()
+            else:
+                stats = write_archive(temp_file, args.source, source_base_name, args.jobs,
+                                      args.compression_level, date_time, args.previous_archive, temp_dir,
+                                      [temp_file_name, temp_dir])
+        if not IS_HASHED_WHILE_WRITTEN:
+            digest = create_digest(temp_file_name)
+
+        dest = os.path.join(args.output_dir, '{}-{}.zip'.format(source_base_name, digest))
+        os.replace(temp_file_name, dest)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
 
-    dest = os.path.join(args.output_dir, '{}-{}.zip'.format(source_base_name, create_digest(temp_file_name)))
-    shutil.move(temp_file_name, dest)
+    file_count, deflated_count, reused_count, file_size, compress_size = stats
+    elapsed = max(time.monotonic() - started_at, 0.001)
+    log.info('Compressed {} files ({} deflated, {} stored) from {} to {} in {:.2f}s, {}/s'.format(
+        file_count, deflated_count, file_count - deflated_count, screen_utils.size(file_size),
+        screen_utils.size(compress_size), elapsed, screen_utils.size(file_size / elapsed)))
+    if args.previous_archive is not None:
+        log.info('Reused {} unchanged files from {}'.format(reused_count, args.previous_archive))
     log.info('Created digested ZIP archive at {}'.format(dest))
+    return True
+
+
+def write_archive(file, source, source_base_name, jobs, compression_level, date_time, previous_archive, temp_dir,
+                  excluded_paths=()):
+    """
+    Writes the files of the source to the archive, compressed by `jobs` processes, leaving out the `excluded_paths`.
+    Files are written in the same order whatever the number of processes, so that the archive is the same. Every file
+    is dated with `date_time` if given, to create a reproducible archive.
+    Returns the number of files, the number of deflated files, the number of files reused from the previous archive,
+    their size and their compressed size.
+    """
+    log = logging.getLogger(__name__)
+    file_count, deflated_count, reused_count, file_size, compress_size = 0, 0, 0, 0, 0
+    previous_files = read_previous_files(previous_archive)
+    files = ((path, name, previous_files.get(name.replace(os.sep, '/')))
+             for path, name in source_files(source, source_base_name, excluded_paths))
+    with zipfile.ZipFile(file, 'w') as zip_file:
+        for zip_info, data, data_file, is_reused in compressed_files(files, jobs, compression_level, date_time,
+                                                                     previous_archive, temp_dir):
+            write_compressed_file(zip_file, zip_info, data, data_file)
+            is_deflated = zip_info.compress_type == zipfile.ZIP_DEFLATED
+            compression = 'Deflated' if is_deflated else 'Stored'
+            log.verbose('{} {} {} to {} ({:.0%})'.format(
+                'Reused {}'.format(compression.lower()) if is_reused else compression, zip_info.filename,
+                screen_utils.size(zip_info.file_size), screen_utils.size(zip_info.compress_size),
+                compression_ratio(zip_info)))
+            file_count += 1
+            deflated_count += 1 if is_deflated else 0
+            reused_count += 1 if is_reused else 0
+            file_size += zip_info.file_size
+            compress_size += zip_info.compress_size
+    return file_count, deflated_count, reused_count, file_size, compress_size
+
+
+def source_files(source, source_base_name, excluded_paths=()):
+    """
+    Returns the `(path, name)` of the files of the source, in the order they're written to the archive. The excluded
+    files and dirs are left out.
+    """
+    excluded = set([os.path.realpath(path) for path in excluded_paths])
+    if os.path.isdir(source):
+        for (dir_path, dir_names, file_names) in os.walk(source):
+            # Walked in order, so that the archive doesn't depend on the order of the entries of the file system
+            dir_names[:] = sorted([dir_name for dir_name in dir_names
+                                   if os.path.realpath(os.path.join(dir_path, dir_name)) not in excluded])
+            for file_name in sorted(file_names):
+                path = os.path.join(dir_path, file_name)
+                if os.path.realpath(path) not in excluded:
+                    yield path, os.path.join(source_base_name, os.path.relpath(path, start=source))
+    else:
+        yield source, source_base_name
+
+
+def read_previous_files(previous_archive):
+    """
+    Returns the `ZipInfo` of the files of the previous archive by name, or no files if there's no previous archive.
+    """
+    if previous_archive is None:
+        return {}
+
+    try:
+        with zipfile.ZipFile(previous_archive) as zip_file:
+            return dict([(zip_info.filename, zip_info) for zip_info in zip_file.infolist()])
+    except (OSError, zipfile.BadZipFile) as e:
+        log = logging.getLogger(__name__)
+        log.warning('Unable to reuse the files of {}, every file is compressed: {}'.format(previous_archive, e))
+        return {}
+
+
+def compressed_files(files, jobs, compression_level, date_time, previous_archive, temp_dir):
+    """
+    Compresses the `(path, name, previous file)` files using a pool of `jobs` processes, or within this process if
+    `jobs` is 1. Yields the results of `compress_file` in the order of the files. The files compressed ahead are bounded
+    by `FILES_AHEAD_PER_JOB` and `MAX_SIZE_AHEAD`.
+    """
+    if jobs <= 1:
+        for path, name, previous_file in files:
+            yield compress_file(path, name, compression_level, date_time, previous_archive, previous_file, temp_dir)
+    else:
+        with multiprocessing.Pool(jobs) as pool:
+            pending = deque()
+            pending_size = 0
+            for path, name, previous_file in files:
+                size = in_memory_size(path)
+                while pending and (len(pending) >= jobs * FILES_AHEAD_PER_JOB or
+                                   pending_size + size > MAX_SIZE_AHEAD):
+                    result, result_size = pending.popleft()
+                    pending_size -= result_size
+                    yield result.get()
+                pending.append((pool.apply_async(compress_file, (path, name, compression_level, date_time,
+                                                                 previous_archive, previous_file, temp_dir)), size))
+                pending_size += size
+            while pending:
+                result, _ = pending.popleft()
+                yield result.get()
+
+
+def in_memory_size(path):
+    """
+    Returns the size of the file if it's compressed in memory by `compress_file`, or 0 if it's compressed to a
+    temporary file.
+    """
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        # Raised by `compress_file` instead
+        return 0
+    return size if size <= MAX_IN_MEMORY_SIZE else 0
+
+
+def compress_file(path, name, compression_level, date_time, previous_archive, previous_file, temp_dir):
+    """
+    Deflates or stores the file as chosen by `compression_type`, returning its `ZipInfo` along with its compressed
+    data, and whether the data has been reused from the previous archive rather than compressed, as the file is the
+    same as the previous file. The data is returned as bytes, or within a temporary file of `temp_dir` for files
+    larger than `MAX_IN_MEMORY_SIZE`, whose path is returned instead. The file is dated with `date_time` if given.
+    """
+    file_stat = os.stat(path)
+    if date_time is not None:
+        zip_info = reproducible_zip_info(name, file_stat, date_time)
+    else:
+        zip_info = zipfile.ZipInfo(name, time.localtime(file_stat.st_mtime)[0:6])
+        zip_info.external_attr = (file_stat.st_mode & 0xFFFF) << 16
+
+    is_reused = previous_file is not None and is_unchanged(path, name, file_stat, compression_level, previous_file)
+
+    is_in_memory = file_stat.st_size <= MAX_IN_MEMORY_SIZE
+    if is_in_memory:
+        output = io.BytesIO()
+    else:
+        fd, data_file = tempfile.mkstemp(dir=temp_dir)
+        output = open(fd, 'wb')
+
+    with output:
+        if is_reused:
+            copy_compressed_data(previous_archive, previous_file, output)
+            zip_info.compress_type = previous_file.compress_type
+            if zip_info.compress_type == zipfile.ZIP_DEFLATED:
+                zip_info.extra = compression_level_extra(compression_level)
+            zip_info.CRC = previous_file.CRC
+            zip_info.file_size = previous_file.file_size
+        else:
+            compress(path, name, compression_level, zip_info, output)
+        zip_info.compress_size = output.tell()
+        if is_in_memory:
+            return zip_info, output.getvalue(), None, is_reused
+    return zip_info, None, data_file, is_reused
+
+
+def compress(path, name, compression_level, zip_info, output):
+    """
+    Writes the file to the output, deflated or stored, and records its compression type, CRC-32 and size.
+    """
+    crc, file_size = 0, 0
+    with open(path, 'rb') as source:
+        chunks = iter(partial(source.read, COMPRESS_READ_SIZE), b'')
+        first_chunk = next(chunks, b'')
+        zip_info.compress_type = compression_type(name, first_chunk[:COMPRESSIBILITY_SAMPLE_SIZE], compression_level)
+        if zip_info.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -15)
+            zip_info.extra = compression_level_extra(compression_level)
+        else:
+            compressor = None
+        for chunk in chain([first_chunk], chunks):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            output.write(chunk if compressor is None else compressor.compress(chunk))
+        if compressor is not None:
+            output.write(compressor.flush())
+    zip_info.CRC = crc
+    zip_info.file_size = file_size
+
+
+def is_unchanged(path, name, file_stat, compression_level, previous_file):
+    """
+    Returns whether the file has the same size and CRC-32 as the previous file, and would be compressed the same way.
+    The file is read, but isn't compressed. Deflated files are only the same if they've been deflated with the same
+    level, which files deflated by other tools don't record.
+    """
+    is_encrypted = previous_file.flag_bits & 0x1
+    if file_stat.st_size != previous_file.file_size or is_encrypted or \
+            previous_file.compress_type not in [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]:
+        return False
+    elif previous_file.compress_type == zipfile.ZIP_DEFLATED and \
+            compression_level_of(previous_file) != compression_level:
+        return False
+
+    crc = 0
+    with open(path, 'rb') as source:
+        chunks = iter(partial(source.read, COMPRESS_READ_SIZE), b'')
+        first_chunk = next(chunks, b'')
+        if compression_type(name, first_chunk[:COMPRESSIBILITY_SAMPLE_SIZE], compression_level) != \
+                previous_file.compress_type:
+            return False
+        for chunk in chain([first_chunk], chunks):
+            crc = zlib.crc32(chunk, crc)
+    return crc == previous_file.CRC
+
+
+def compression_level_extra(compression_level):
+    return struct.pack('<HHB', COMPRESSION_LEVEL_EXTRA_ID, 1, compression_level)
+
+
+def compression_level_of(zip_info):
+    """
+    Returns the level the file has been deflated with, as recorded by its extra field, or None if it isn't recorded.
+    """
+    extra = zip_info.extra
+    while len(extra) >= 4:
+        extra_id, size = struct.unpack('<HH', extra[0:4])
+        if extra_id == COMPRESSION_LEVEL_EXTRA_ID and size == 1 and len(extra) >= 5:
+            return extra[4]
+        extra = extra[4 + size:]
+    return None
+
+
+def copy_compressed_data(previous_archive, previous_file, output):
+    """
+    Copies the compressed data of the previous file from the previous archive to the output, as is.
+    """
+    with open(previous_archive, 'rb') as archive:
+        # The data follows the local header, whose extra field may differ from the one of the central directory
+        archive.seek(previous_file.header_offset)
+        local_header = archive.read(LOCAL_HEADER_SIZE)
+        if len(local_header) != LOCAL_HEADER_SIZE or local_header[0:4] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile('Bad local header of {} in {}'.format(previous_file.filename, previous_archive))
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        archive.seek(previous_file.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+
+        remaining = previous_file.compress_size
+        while remaining > 0:
+            chunk = archive.read(min(COMPRESS_READ_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile('Truncated data of {} in {}'.format(previous_file.filename,
+                                                                             previous_archive))
+            output.write(chunk)
+            remaining -= len(chunk)
+
+
+def reproducible_zip_info(name, file_stat, date_time):
+    """
+    Returns the `ZipInfo` of a file of a reproducible archive, which only records whether the file is executable.
+    """
+    zip_info = zipfile.ZipInfo(name, date_time)
+    mode = 0o755 if file_stat.st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH) else 0o644
+    zip_info.external_attr = (stat.S_IFREG | mode) << 16
+    # Recorded as created on Unix, as the permissions are Unix permissions, whatever the system creating the archive
+    zip_info.create_system = 3
+    return zip_info
+
+
+def reproducible_date_time(source_date_epoch):
+    """
+    Returns the date of the files of a reproducible archive, given by the `source_date_epoch` seconds since the epoch if
+    set. Raises `ValueError` if it isn't a number of seconds a zip archive can record.
+    """
+    if source_date_epoch is None:
+        return REPRODUCIBLE_DATE_TIME
+
+    date_time = max(REPRODUCIBLE_DATE_TIME, time.gmtime(int(source_date_epoch))[0:6])
+    if date_time[0] > MAX_ZIP_YEAR:
+        raise ValueError('{} is later than {}'.format(date_time, MAX_ZIP_YEAR))
+    return date_time
+
+
+def compression_type(name, sample, compression_level):
+    """
+    Returns `ZIP_DEFLATED` for files which are worth deflating, judging by their extension and by how much the `sample`
+    from the start of the file is reduced by deflating it, and `ZIP_STORED` otherwise.
+    """
+    if compression_level == 0 or name.lower().endswith(STORED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    elif len(zlib.compress(sample, 1)) >= len(sample) * MAX_COMPRESSION_RATIO:
+        return zipfile.ZIP_STORED
+    else:
+        return zipfile.ZIP_DEFLATED
+
+
+def compression_ratio(zip_info):
+    return zip_info.compress_size / zip_info.file_size if zip_info.file_size > 0 else 1
+
+
+def write_compressed_file(zip_file, zip_info, data, data_file):
+    # zipfile can't write data which has been compressed beforehand: the file is written the same as zipfile does, and
+    # is then added to the files zipfile writes to the central directory as the archive is closed
+    zip_info.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zip_info.FileHeader())
+    if data_file is None:
+        zip_file.fp.write(data)
+    else:
+        with open(data_file, 'rb') as compressed:
+            shutil.copyfileobj(compressed, zip_file.fp, COMPRESS_READ_SIZE)
+        os.remove(data_file)
+    zip_file.filelist.append(zip_info)
+    zip_file.NameToInfo[zip_info.filename] = zip_info
+    zip_file.start_dir = zip_file.fp.tell()
 
 
 def create_digest(file_name):
     with open(file_name, mode='rb') as f:
         d = hashlib.sha256()
-        for buf in iter(partial(f.read, 128), b''):
+        for buf in iter(partial(f.read, DIGEST_READ_SIZE), b''):
             d.update(buf)
     return d.hexdigest()
@@ -1,5 +1,9 @@
+from requests.exceptions import ChunkedEncodingError, ConnectionError
+from conductr_cli import http
+from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
+import logging
 import re
-import requests
+import time
 
 
 SSE_REQUEST_INPUT = {
@@ -12,27 +16,66 @@ SSE_REQUEST_INPUT = {
 
 SSE_END_OF_FIELD = re.compile(r'\r\n\r\n|\r\r|\n\n')
 
+SSE_END_OF_LINE = re.compile(r'\r\n|\r|\n')
 
-def is_event_complete(buf):
-    return re.search(SSE_END_OF_FIELD, buf) is not None
+# Longest event boundary is `\r\n\r\n`, so a boundary spanning two chunks starts at most 3 characters before the
+# end of the previously scanned data.
+SSE_END_OF_FIELD_OVERLAP = 3
+
+# Number of bytes requested from the stream per read. ConductR streams events using chunked transfer encoding, so a
+# read returns as soon as a chunk arrives and never waits for the whole chunk size to be filled.
+SSE_CHUNK_SIZE = 8192
+
+# Reconnection time in milliseconds until the server sends a `retry` field.
+SSE_DEFAULT_RETRY = 3000
+
+# Number of consecutive attempts to re-establish a dropped stream before giving up, counting the attempts which have
+# failed to connect and those whose stream has been closed before any event was received.
+SSE_MAX_RECONNECT_ATTEMPTS = 5
 
 
 def parse_event(raw_sse_string):
-    event, data = None, None
-    lines = raw_sse_string.split('\n')
+    event, data_lines, event_id, retry = None, [], None, None
+    lines = SSE_END_OF_LINE.split(raw_sse_string)
     for line in lines:
-        key, value = line.split(':')
+        if not line or line.startswith(':'):
+            # Empty lines and comments, i.e. heartbeats
+            continue
+
+        key, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+
         if key == 'event':
             event = value
         elif key == 'data':
-            data = value
-    return Event(event, data)
+            data_lines.append(value)
+        elif key == 'id':
+            if '\0' not in value:
+                event_id = value
+        elif key == 'retry':
+            if value.isdigit():
+                retry = int(value)
+
+    data = '\n'.join(data_lines) if data_lines else None
+    return Event(event, data, event_id, retry)
 
 
 class Event:
-    def __init__(self, event, data):
+    """
+    An event received from the stream.
+    `id` is the last event id seen on the stream and `retry` is the reconnection time in milliseconds, if the server
+    has sent it with this event.
+    """
+    def __init__(self, event, data, id=None, retry=None):
         self.event = event
         self.data = data
+        self.id = id
+        self.retry = retry
+
+    def is_dispatchable(self):
+        # Blocks made of comments, `id` or `retry` fields only are not passed on
+        return self.event is not None or self.data is not None
 
     def __eq__(self, other):
         if type(other) is type(self):
@@ -55,33 +98,138 @@ class Client:
 
     Changes introduced as part of the backport:
     - Support for Python 3.2 (i.e. do not use u'')
-    - Parse only for event and data string within SSE
-    - No support for retries and last event id
+    - The stream is read in chunks rather than one character at a time
+    - Events without a `data` field are still passed on, as long as they have an `event` field
+
+    When the stream is dropped or closed by the server the client reconnects after the reconnection time, sending the
+    last event id seen in the `Last-Event-ID` header so the server may resume the stream where it was left.
+    The server may stop the client from reconnecting by responding with `204 No Content`.
+
+    `read_timeout` is an optional function returning the number of seconds to wait for data on the socket. It is
+    evaluated every time the stream is (re)established.
     """
-    def __init__(self, url):
+    def __init__(self, url, read_timeout=None):
         self.url = url
+        self.read_timeout = read_timeout
+        self.closed = False
         self.response = None
+        self.chunks = None
+        self.buf = ''
+        self.pos = 0
+        self.pending = []
+        self.last_event_id = None
+        self.retry = SSE_DEFAULT_RETRY
+        # Attempts to reconnect since the last event was received
+        self.reconnect_attempts = 0
 
     def connect(self):
-        response = requests.get(self.url, stream=True, **SSE_REQUEST_INPUT)
+        # Without a read timeout, the stream is kept open however long the server doesn't send anything
+        read_timeout = None if self.read_timeout is None else self.read_timeout()
+        response = http.get(self.url, stream=True, headers=self.request_headers(),
+                            timeout=(DEFAULT_HTTP_TIMEOUT, read_timeout))
         response.raise_for_status()
+        # Event streams are always UTF-8 encoded
+        response.encoding = 'utf-8'
         self.response = response
+        self.chunks = response.iter_content(chunk_size=SSE_CHUNK_SIZE, decode_unicode=True)
+        self.buf = ''
+        self.pos = 0
+        self.pending = []
+
+    def close(self):
+        """
+        Closes the stream, ending the iteration of events. May be called from another thread to interrupt a blocked read.
+        """
+        self.closed = True
+        if self.response is not None:
+            self.response.close()
+
+    def request_headers(self):
+        headers = SSE_REQUEST_INPUT['headers'].copy()
+        if self.last_event_id:
+            headers['Last-Event-ID'] = self.last_event_id
+        return headers
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        buf = ''
-        while not is_event_complete(buf):
-            next_char = next(self.response.iter_content(decode_unicode=True))
-            buf += next_char
-
-        split = re.split(SSE_END_OF_FIELD, buf)
-        raw_sse = split[0]
-        return parse_event(raw_sse)
-
-
-def get_events(url):
-    client = Client(url)
+        while True:
+            match = SSE_END_OF_FIELD.search(self.buf, self.pos)
+            if match:
+                raw_sse = ''.join(self.pending) + self.buf[self.pos:match.start()]
+                self.pending = []
+                self.pos = match.end()
+                event = parse_event(raw_sse)
+
+                if event.id is not None:
+                    self.last_event_id = event.id
+                if event.retry is not None:
+                    self.retry = event.retry
+
+                if event.is_dispatchable():
+                    event.id = self.last_event_id
+                    self.reconnect_attempts = 0
+                    return event
+            else:
+                self.read_chunk()
+
+    def read_chunk(self):
+        """
+        Reads the next chunk from the stream into the buffer, reconnecting if the stream has been dropped.
+        The unparsed remainder of the previous chunk is set aside, except for its last few characters which may start
+        an event boundary spanning both chunks. This way only newly arrived data is scanned for the end of an event,
+        and the data of an event is copied once regardless of how many chunks it spans.
+        """
+        try:
+            chunk = next(self.chunks)
+        except (StopIteration, ConnectionError, ChunkedEncodingError):
+            if self.closed:
+                raise StopIteration
+            self.reconnect()
+            return
+        except Exception:
+            # Reading from a response closed by another thread may fail in a number of ways
+            if self.closed:
+                raise StopIteration
+            raise
+
+        tail_pos = max(self.pos, len(self.buf) - SSE_END_OF_FIELD_OVERLAP)
+        if tail_pos > self.pos:
+            self.pending.append(self.buf[self.pos:tail_pos])
+        self.buf = self.buf[tail_pos:] + chunk
+        self.pos = 0
+
+    def reconnect(self):
+        """
+        Re-establishes the stream, discarding any partially received event.
+        Raises `StopIteration` when the server asks not to reconnect. Raises `ConnectionError` once
+        `SSE_MAX_RECONNECT_ATTEMPTS` consecutive attempts have been made without receiving any event, i.e. the error of
+        the last attempt if it has failed to connect, so that a server which keeps closing the stream isn't reconnected
+        to endlessly.
+        """
+        log = logging.getLogger(__name__)
+        while True:
+            if self.reconnect_attempts >= SSE_MAX_RECONNECT_ATTEMPTS:
+                raise ConnectionError('Stream of {} closed {} times without any event'.format(
+                    self.url, self.reconnect_attempts))
+            self.reconnect_attempts += 1
+            log.debug('Reconnecting to {} in {}ms, last event id {}'.format(self.url, self.retry, self.last_event_id))
+            time.sleep(self.retry / 1000.0)
+            if self.closed:
+                raise StopIteration
+            try:
+                self.connect()
+                break
+            except ConnectionError:
+                if self.reconnect_attempts >= SSE_MAX_RECONNECT_ATTEMPTS:
+                    raise
+
+        if self.response.status_code == 204:
+            raise StopIteration
+
+
+def get_events(url, read_timeout=None):
+    client = Client(url, read_timeout)
     client.connect()
     return client
@@ -102,3 +102,20 @@ def create_mock_logger():
     get_logger_mock = MagicMock(return_value=log_mock)
 
     return get_logger_mock, log_mock
+
+
+def create_streamed_response(status_code, content, headers=None, error=None):
+    """
+    Creates a streamed response mock returning `content` in chunks of 4 bytes, then raising `error` if given.
+    """
+    def iter_content(chunk_size):
+        for start in range(0, len(content), 4):
+            yield content[start:start + 4]
+        if error is not None:
+            raise error
+
+    response = MagicMock(status_code=status_code, headers=headers or {})
+    response.iter_content = iter_content
+    if status_code >= 400:
+        response.raise_for_status.side_effect = HTTPError(status_code)
+    return response
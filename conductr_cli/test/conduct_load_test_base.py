@@ -51,6 +51,25 @@ class ConductLoadTestBase(CliTestCase):
             'downloading_configuration': downloading_configuration,
             'verbose': verbose}))
 
+    @staticmethod
+    def resolve_bundle_mock(resolutions):
+        # The bundle and configuration are resolved concurrently, so results are looked up by uri
+        def resolve_bundle(custom_settings, cache_dir, uri, offline=False):
+            result = resolutions[uri]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return MagicMock(side_effect=resolve_bundle)
+
+    def assert_files_posted(self, http_method, files):
+        args, kwargs = http_method.call_args
+        body = kwargs['data']
+        self.assertEqual((self.default_url,), args)
+        self.assertEqual(files, body.fields)
+        self.assertEqual({'Content-Type': body.content_type}, kwargs['headers'])
+        self.assertEqual(LOAD_HTTP_TIMEOUT, kwargs['timeout'])
+
     def base_test_success(self):
         resolve_bundle_mock = MagicMock(return_value=(self.bundle_name, self.bundle_file))
         http_method = self.respond_with(200, self.default_response)
@@ -60,7 +79,7 @@ class ConductLoadTestBase(CliTestCase):
 
         input_args = MagicMock(**self.default_args)
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -68,12 +87,47 @@ class ConductLoadTestBase(CliTestCase):
             self.assertTrue(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual(self.default_output(), self.output(stdout))
 
+    def base_test_success_already_loaded(self):
+        bundle_digest = '45e0c477d3e5ea92aa8d85c0d8f3e25c' + 'f804d644a01a5ab9f679f76939f5c7e2'
+        bundle_file = '/cache/bundle-{}.zip'.format(bundle_digest)
+        resolve_bundle_mock = MagicMock(return_value=(self.bundle_name, bundle_file))
+        cluster_state_mock = MagicMock()
+        cluster_state_mock.bundle.return_value = {'bundleId': self.bundle_id, 'bundleDigest': bundle_digest}
+        fetch_mock = MagicMock(return_value=cluster_state_mock)
+        http_method = MagicMock()
+        stdout = MagicMock()
+        wait_for_installation_mock = MagicMock()
+
+        input_args = MagicMock(**self.default_args)
+        with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
+                patch('conductr_cli.cluster_state.fetch', fetch_mock), \
+                patch('conductr_cli.http.post', http_method), \
+                patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
+            logging_setup.configure_logging(input_args, stdout)
+            result = conduct_load.load(input_args)
+            self.assertTrue(result)
+
+        fetch_mock.assert_called_with(input_args)
+        cluster_state_mock.bundle.assert_called_with(self.bundle_id)
+        http_method.assert_not_called()
+        wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
+
+        self.assertEqual(
+            strip_margin("""|Retrieving bundle...
+                            |Bundle already loaded, skipping upload. Use --force to upload it anyway.
+                            |Bundle loaded.
+                            |Start bundle with: conduct run 45e0c47
+                            |Unload bundle with: conduct unload 45e0c47
+                            |Print ConductR info with: conduct info
+                            |"""),
+            self.output(stdout))
+
     def base_test_success_verbose(self):
         resolve_bundle_mock = MagicMock(return_value=(self.bundle_name, self.bundle_file))
         http_method = self.respond_with(200, self.default_response)
@@ -86,7 +140,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**args)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -94,8 +148,8 @@ class ConductLoadTestBase(CliTestCase):
             self.assertTrue(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual(self.default_output(verbose=self.default_response), self.output(stdout))
@@ -112,7 +166,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**args)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -120,8 +174,8 @@ class ConductLoadTestBase(CliTestCase):
             self.assertTrue(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual('45e0c477d3e5ea92aa8d85c0d8f3e25c\n', self.output(stdout))
@@ -138,7 +192,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**args)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -146,8 +200,8 @@ class ConductLoadTestBase(CliTestCase):
             self.assertTrue(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual(self.default_output(bundle_id='45e0c477d3e5ea92aa8d85c0d8f3e25c'), self.output(stdout))
@@ -165,7 +219,7 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**args)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -173,8 +227,8 @@ class ConductLoadTestBase(CliTestCase):
             self.assertTrue(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual(
@@ -192,15 +246,15 @@ class ConductLoadTestBase(CliTestCase):
         input_args = MagicMock(**args)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_load.load(input_args)
             self.assertTrue(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
 
         self.assertEqual(self.default_output(), self.output(stdout))
 
@@ -212,15 +266,15 @@ class ConductLoadTestBase(CliTestCase):
         open_mock = MagicMock(return_value=1)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout, stderr)
             result = conduct_load.load(MagicMock(**self.default_args))
             self.assertFalse(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: 404 Not Found
@@ -235,15 +289,15 @@ class ConductLoadTestBase(CliTestCase):
         open_mock = MagicMock(return_value=1)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout, stderr)
             result = conduct_load.load(MagicMock(**self.default_args))
             self.assertFalse(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
 
         self.assertEqual(
             self.default_connection_error.format(self.default_url),
@@ -257,15 +311,15 @@ class ConductLoadTestBase(CliTestCase):
         open_mock = MagicMock(return_value=1)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout, stderr)
             result = conduct_load.load(MagicMock(**self.default_args))
             self.assertFalse(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
 
         self.assertEqual(
             as_error(
@@ -286,7 +340,7 @@ class ConductLoadTestBase(CliTestCase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, 'no_such.bundle')
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, 'no_such.bundle', False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Bundle not found: some message
@@ -294,8 +348,10 @@ class ConductLoadTestBase(CliTestCase):
             self.output(stderr))
 
     def base_test_failure_no_configuration(self):
-        resolve_bundle_mock = MagicMock(side_effect=[(self.bundle_name, self.bundle_file),
-                                                     BundleResolutionError('some message')])
+        resolve_bundle_mock = self.resolve_bundle_mock({
+            self.bundle_file: (self.bundle_name, self.bundle_file),
+            'no_such.conf': BundleResolutionError('some message')
+        })
         stdout = MagicMock()
         stderr = MagicMock()
 
@@ -306,11 +362,11 @@ class ConductLoadTestBase(CliTestCase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        self.assertEqual(
+        self.assertCountEqual(
             resolve_bundle_mock.call_args_list,
             [
-                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file),
-                call(self.custom_settings, self.bundle_resolve_cache_dir, 'no_such.conf')
+                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False),
+                call(self.custom_settings, self.bundle_resolve_cache_dir, 'no_such.conf', False)
             ]
         )
 
@@ -330,7 +386,7 @@ class ConductLoadTestBase(CliTestCase):
             result = conduct_load.load(MagicMock(**self.default_args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
         open_mock.assert_called_with(self.bundle_file, 'rb')
 
         self.assertEqual(
@@ -348,7 +404,7 @@ class ConductLoadTestBase(CliTestCase):
             result = conduct_load.load(MagicMock(**self.default_args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Resource not found: url
@@ -364,7 +420,7 @@ class ConductLoadTestBase(CliTestCase):
             result = conduct_load.load(MagicMock(**self.default_args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: File not found: reason
@@ -380,7 +436,7 @@ class ConductLoadTestBase(CliTestCase):
 
         input_args = MagicMock(**self.default_args)
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, err_output=stderr)
@@ -388,8 +444,8 @@ class ConductLoadTestBase(CliTestCase):
             self.assertFalse(result)
 
         open_mock.assert_called_with(self.bundle_file, 'rb')
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
-        http_method.assert_called_with(self.default_url, files=self.default_files, timeout=LOAD_HTTP_TIMEOUT)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
+        self.assert_files_posted(http_method, self.default_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual(
@@ -36,7 +36,7 @@ class ConductRunTestBase(CliTestCase):
 
         input_args = MagicMock(**self.default_args)
 
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_run.run(input_args)
@@ -56,7 +56,7 @@ class ConductRunTestBase(CliTestCase):
         args.update({'verbose': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_run.run(input_args)
@@ -76,7 +76,7 @@ class ConductRunTestBase(CliTestCase):
         args.update({'long_ids': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_run.run(input_args)
@@ -97,7 +97,7 @@ class ConductRunTestBase(CliTestCase):
         args.update({'cli_parameters': cli_parameters})
         input_args = MagicMock(**args)
 
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_run.run(input_args)
@@ -118,7 +118,7 @@ class ConductRunTestBase(CliTestCase):
         args.update({'no_wait': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.put', http_method):
+        with patch('conductr_cli.http.put', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_run.run(input_args)
             self.assertTrue(result)
@@ -131,7 +131,7 @@ class ConductRunTestBase(CliTestCase):
         http_method = self.respond_with(404)
         stderr = MagicMock()
 
-        with patch('requests.put', http_method):
+        with patch('conductr_cli.http.put', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_run.run(MagicMock(**self.default_args))
             self.assertFalse(result)
@@ -147,7 +147,7 @@ class ConductRunTestBase(CliTestCase):
         http_method = self.raise_connection_error('test reason', self.default_url)
         stderr = MagicMock()
 
-        with patch('requests.put', http_method):
+        with patch('conductr_cli.http.put', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_run.run(MagicMock(**self.default_args))
             self.assertFalse(result)
@@ -165,7 +165,7 @@ class ConductRunTestBase(CliTestCase):
 
         input_args = MagicMock(**self.default_args)
 
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_run.run(input_args)
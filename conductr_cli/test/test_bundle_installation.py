@@ -14,6 +14,10 @@ def create_test_event(event_name):
     return sse_mock
 
 
+def create_cluster_state(**kwargs):
+    return MagicMock(return_value=MagicMock(**kwargs))
+
+
 class TestCountInstallation(CliTestCase):
     def test_return_installation_count(self):
         bundles_endpoint_reply = """
@@ -30,7 +34,7 @@ class TestCountInstallation(CliTestCase):
         """
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -57,7 +61,7 @@ class TestCountInstallation(CliTestCase):
         """
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -73,7 +77,7 @@ class TestCountInstallation(CliTestCase):
         bundles_endpoint_reply = '[]'
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -89,7 +93,7 @@ class TestCountInstallation(CliTestCase):
         bundles_endpoint_reply = '[]'
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -119,14 +123,14 @@ class TestWaitForInstallation(CliTestCase):
             'wait_timeout': 10
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             bundle_installation.wait_for_installation(bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args),
-            call(bundle_id, args)
+            call(bundle_id),
+            call(bundle_id)
         ])
 
         url_mock.assert_called_with('bundles/events', args)
@@ -144,12 +148,12 @@ class TestWaitForInstallation(CliTestCase):
         args = MagicMock(**{
             'wait_timeout': 10
         })
-        with patch('conductr_cli.bundle_installation.count_installations', count_installations_mock):
+        with patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)):
             logging_setup.configure_logging(args, stdout)
             bundle_installation.wait_for_installation(bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args)
+            call(bundle_id)
         ])
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 is installed
@@ -172,16 +176,16 @@ class TestWaitForInstallation(CliTestCase):
             'wait_timeout': -1
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             self.assertRaises(WaitTimeoutError, bundle_installation.wait_for_installation, bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args)
+            call(bundle_id)
         ])
 
-        url_mock.assert_called_with('bundles/events', args)
+        get_events_mock.assert_not_called()
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to be installed
                                          |"""), self.output(stdout))
@@ -202,23 +206,19 @@ class TestWaitForInstallation(CliTestCase):
             'wait_timeout': 10
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             self.assertRaises(WaitTimeoutError, bundle_installation.wait_for_installation, bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args)
+            call(bundle_id),
+            call(bundle_id)
         ])
 
         url_mock.assert_called_with('bundles/events', args)
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to be installed
-                                         |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be installed
-                                         |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be installed
                                          |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be installed
                                          |"""), self.output(stdout))
 
@@ -240,14 +240,14 @@ class TestWaitForUninstallation(CliTestCase):
             'wait_timeout': 10
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             bundle_installation.wait_for_uninstallation(bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args),
-            call(bundle_id, args)
+            call(bundle_id),
+            call(bundle_id)
         ])
 
         url_mock.assert_called_with('bundles/events', args)
@@ -265,12 +265,12 @@ class TestWaitForUninstallation(CliTestCase):
         args = MagicMock(**{
             'wait_timeout': 10
         })
-        with patch('conductr_cli.bundle_installation.count_installations', count_installations_mock):
+        with patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)):
             logging_setup.configure_logging(args, stdout)
             bundle_installation.wait_for_uninstallation(bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args)
+            call(bundle_id)
         ])
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 is uninstalled
@@ -293,16 +293,16 @@ class TestWaitForUninstallation(CliTestCase):
             'wait_timeout': -1
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             self.assertRaises(WaitTimeoutError, bundle_installation.wait_for_uninstallation, bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args)
+            call(bundle_id)
         ])
 
-        url_mock.assert_called_with('bundles/events', args)
+        get_events_mock.assert_not_called()
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to be uninstalled
                                          |"""), self.output(stdout))
@@ -323,22 +323,18 @@ class TestWaitForUninstallation(CliTestCase):
             'wait_timeout': 10
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_installation.count_installations', count_installations_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(count_installations=count_installations_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             self.assertRaises(WaitTimeoutError, bundle_installation.wait_for_uninstallation, bundle_id, args)
 
         self.assertEqual(count_installations_mock.call_args_list, [
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args)
+            call(bundle_id),
+            call(bundle_id)
         ])
 
         url_mock.assert_called_with('bundles/events', args)
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to be uninstalled
-                                         |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be uninstalled
-                                         |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be uninstalled
                                          |Bundle a101449418187d92c789d1adc240b6d6 still waiting to be uninstalled
                                          |"""), self.output(stdout))
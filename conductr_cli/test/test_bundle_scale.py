@@ -8,6 +8,10 @@ except ImportError:
     from mock import call, patch, MagicMock
 
 
+def create_cluster_state(**kwargs):
+    return MagicMock(return_value=MagicMock(**kwargs))
+
+
 class TestGetScale(CliTestCase):
     def test_return_scale_v1(self):
         bundles_endpoint_reply = """
@@ -39,7 +43,7 @@ class TestGetScale(CliTestCase):
         """
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -81,7 +85,7 @@ class TestGetScale(CliTestCase):
         """
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -97,7 +101,7 @@ class TestGetScale(CliTestCase):
         bundles_endpoint_reply = '[]'
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -113,7 +117,7 @@ class TestGetScale(CliTestCase):
         bundles_endpoint_reply = '[]'
         http_method = self.respond_with(text=bundles_endpoint_reply)
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             bundle_id = 'a101449418187d92c789d1adc240b6d6'
             args = {
                 'ip': '127.0.0.1',
@@ -128,14 +132,16 @@ class TestGetScale(CliTestCase):
 
 class TestWaitForScale(CliTestCase):
     def test_wait_for_scale(self):
-        get_scale_mock = MagicMock(side_effect=[0, 1, 2, 3])
+        get_scale_mock = MagicMock(side_effect=[0, 3])
         url_mock = MagicMock(return_value='/bundle-events/endpoint')
-        get_events_mock = MagicMock(return_value=[
+        events = [
             self.create_test_event(None),
             self.create_test_event('bundleExecutionAdded'),
             self.create_test_event('bundleExecutionAdded'),
             self.create_test_event('bundleExecutionAdded')
-        ])
+        ]
+        get_events_mock = MagicMock(return_value=events)
+        cluster_state_mock = MagicMock(get_scale=get_scale_mock)
 
         stdout = MagicMock()
 
@@ -144,20 +150,40 @@ class TestWaitForScale(CliTestCase):
             'wait_timeout': 10
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_scale.get_scale', get_scale_mock), \
+                patch('conductr_cli.cluster_state.fetch', MagicMock(return_value=cluster_state_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             bundle_scale.wait_for_scale(bundle_id, 3, args)
 
         self.assertEqual(get_scale_mock.call_args_list, [
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args)
+            call(bundle_id),
+            call(bundle_id)
         ])
 
+        # The burst of events is applied at once
+        cluster_state_mock.update.assert_called_once_with(events[1:])
+
         url_mock.assert_called_with('bundles/events', args)
 
+        self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to reach expected scale 3
+                                         |Bundle a101449418187d92c789d1adc240b6d6 expected scale 3 is met
+                                         |"""), self.output(stdout))
+
+    def test_wait_for_scale_progress(self):
+        get_scale_mock = MagicMock(side_effect=[0, 1, 2, 3])
+        wait_for_events_mock = MagicMock(side_effect=lambda args, state, prefix, is_met, message: [is_met() for _ in range(3)])
+
+        stdout = MagicMock()
+
+        bundle_id = 'a101449418187d92c789d1adc240b6d6'
+        args = MagicMock(**{
+            'wait_timeout': 10
+        })
+        with patch('conductr_cli.cluster_state.fetch', create_cluster_state(get_scale=get_scale_mock)), \
+                patch('conductr_cli.bundle_wait.wait_for_events', wait_for_events_mock):
+            logging_setup.configure_logging(args, stdout)
+            bundle_scale.wait_for_scale(bundle_id, 3, args)
+
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to reach expected scale 3
                                          |Bundle a101449418187d92c789d1adc240b6d6 has scale 1, expected 3
                                          |Bundle a101449418187d92c789d1adc240b6d6 has scale 2, expected 3
@@ -173,12 +199,12 @@ class TestWaitForScale(CliTestCase):
         args = MagicMock(**{
             'wait_timeout': 10
         })
-        with patch('conductr_cli.bundle_scale.get_scale', get_scale_mock):
+        with patch('conductr_cli.cluster_state.fetch', create_cluster_state(get_scale=get_scale_mock)):
             logging_setup.configure_logging(args, stdout)
             bundle_scale.wait_for_scale(bundle_id, 3, args)
 
         self.assertEqual(get_scale_mock.call_args_list, [
-            call(bundle_id, args)
+            call(bundle_id)
         ])
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 expected scale 3 is met
@@ -201,16 +227,16 @@ class TestWaitForScale(CliTestCase):
             'wait_timeout': -1
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_scale.get_scale', get_scale_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(get_scale=get_scale_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             self.assertRaises(WaitTimeoutError, bundle_scale.wait_for_scale, bundle_id, 3, args)
 
         self.assertEqual(get_scale_mock.call_args_list, [
-            call(bundle_id, args)
+            call(bundle_id)
         ])
 
-        url_mock.assert_called_with('bundles/events', args)
+        get_events_mock.assert_not_called()
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to reach expected scale 3
                                          |"""), self.output(stdout))
@@ -231,23 +257,19 @@ class TestWaitForScale(CliTestCase):
             'wait_timeout': 10
         })
         with patch('conductr_cli.conduct_url.url', url_mock), \
-                patch('conductr_cli.bundle_scale.get_scale', get_scale_mock), \
+                patch('conductr_cli.cluster_state.fetch', create_cluster_state(get_scale=get_scale_mock)), \
                 patch('conductr_cli.sse_client.get_events', get_events_mock):
             logging_setup.configure_logging(args, stdout)
             self.assertRaises(WaitTimeoutError, bundle_scale.wait_for_scale, bundle_id, 3, args)
 
         self.assertEqual(get_scale_mock.call_args_list, [
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args),
-            call(bundle_id, args)
+            call(bundle_id),
+            call(bundle_id)
         ])
 
         url_mock.assert_called_with('bundles/events', args)
 
         self.assertEqual(strip_margin("""|Bundle a101449418187d92c789d1adc240b6d6 waiting to reach expected scale 3
-                                         |Bundle a101449418187d92c789d1adc240b6d6 has scale 0, expected 3
-                                         |Bundle a101449418187d92c789d1adc240b6d6 has scale 0, expected 3
                                          |Bundle a101449418187d92c789d1adc240b6d6 has scale 0, expected 3
                                          |"""), self.output(stdout))
 
@@ -16,6 +16,28 @@ class ShortId(TestCase):
             'c1ab77e-3cc322b')
 
 
+class Digest(TestCase):
+
+    def test(self):
+        digest = 'f804d644a01a5ab9f679f76939f5c7e28301e1aecc83627877065cef26de12db'
+        self.assertEqual(digest, bundle_utils.digest('/cache/visualizer-v1-{}.zip'.format(digest)))
+        self.assertIsNone(bundle_utils.digest('/cache/visualizer-v1.zip'))
+        self.assertIsNone(bundle_utils.digest('/cache/visualizer-v1-{}.tgz'.format(digest)))
+
+
+class BundleId(TestCase):
+
+    def test(self):
+        self.assertEqual(
+            bundle_utils.bundle_id('f804d644a01a5ab9f679f76939f5c7e28301e1aecc83627877065cef26de12db'),
+            'f804d644a01a5ab9f679f76939f5c7e2')
+
+        self.assertEqual(
+            bundle_utils.bundle_id('f804d644a01a5ab9f679f76939f5c7e28301e1aecc83627877065cef26de12db',
+                                   '6e4560ef252cd57322f595627c881c48b2f8bf98c3b6d08073c0b9b5db1e5068'),
+            'f804d644a01a5ab9f679f76939f5c7e2-6e4560ef252cd57322f595627c881c48')
+
+
 class Conf(TestCase):
 
     def setUp(self):  # noqa
@@ -0,0 +1,151 @@
+from unittest import TestCase
+from conductr_cli import bundle_wait, logging_setup
+from conductr_cli.exceptions import WaitTimeoutError
+from requests.exceptions import ConnectionError
+import threading
+import time
+
+try:
+    from unittest.mock import call, patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import call, patch, MagicMock
+
+
+def create_test_event(event_name):
+    sse_mock = MagicMock()
+    sse_mock.event = event_name
+    return sse_mock
+
+
+class QuietEvents:
+    """Event stream which doesn't send anything until it is closed"""
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.closed.wait()
+        raise StopIteration
+
+    def close(self):
+        self.closed.set()
+
+
+class TestDeadline(TestCase):
+    def test_remaining(self):
+        monotonic_mock = MagicMock(side_effect=[100.0, 104.0, 111.0, 112.0])
+        with patch('time.monotonic', monotonic_mock):
+            deadline = bundle_wait.Deadline(10)
+            self.assertEqual(6.0, deadline.remaining())
+            self.assertEqual(0.0, deadline.remaining())
+            self.assertTrue(deadline.has_expired())
+
+    def test_read_timeout(self):
+        monotonic_mock = MagicMock(side_effect=[100.0, 103.0, 109.5])
+        with patch('time.monotonic', monotonic_mock):
+            deadline = bundle_wait.Deadline(10)
+            self.assertEqual(7.0, deadline.read_timeout())
+            self.assertEqual(bundle_wait.MIN_READ_TIMEOUT, deadline.read_timeout())
+
+
+class TestWaitForEvents(TestCase):
+    def setUp(self):  # noqa
+        logging_setup.configure_logging(MagicMock(), MagicMock())
+
+    def test_condition_met(self):
+        url_mock = MagicMock(return_value='/bundle-events/endpoint')
+        events = [
+            create_test_event(None),
+            create_test_event('bundleExecutionAdded'),
+            create_test_event('bundleInstallationAdded'),
+            create_test_event('bundleExecutionAdded')
+        ]
+        get_events_mock = MagicMock(return_value=events)
+        cluster_state = MagicMock()
+        is_condition_met = MagicMock(return_value=True)
+        args = MagicMock(wait_timeout=10)
+
+        with patch('conductr_cli.conduct_url.url', url_mock), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            bundle_wait.wait_for_events(args, cluster_state, 'bundleExecution', is_condition_met, 'timed out')
+
+        is_condition_met.assert_called_once_with()
+        cluster_state.update.assert_called_once_with([events[1], events[3]])
+        url_mock.assert_called_with('bundles/events', args)
+        get_events_url, read_timeout = get_events_mock.call_args[0]
+        self.assertEqual('/bundle-events/endpoint', get_events_url)
+        self.assertTrue(9 < read_timeout() <= 10)
+
+    def test_timeout_without_events(self):
+        events = QuietEvents()
+        get_events_mock = MagicMock(return_value=events)
+        is_condition_met = MagicMock()
+        cluster_state = MagicMock()
+        args = MagicMock(wait_timeout=0.2)
+
+        start_time = time.monotonic()
+        with patch('conductr_cli.conduct_url.url'), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            self.assertRaises(WaitTimeoutError, bundle_wait.wait_for_events,
+                              args, cluster_state, 'bundleExecution', is_condition_met, 'timed out')
+
+        self.assertLess(time.monotonic() - start_time, 2)
+        self.assertTrue(events.closed.is_set())
+        is_condition_met.assert_not_called()
+
+    def test_timeout_when_events_end(self):
+        get_events_mock = MagicMock(return_value=[create_test_event('bundleExecutionAdded')])
+        cluster_state = MagicMock()
+        is_condition_met = MagicMock(return_value=False)
+        args = MagicMock(wait_timeout=10)
+
+        with patch('conductr_cli.conduct_url.url'), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            self.assertRaises(WaitTimeoutError, bundle_wait.wait_for_events,
+                              args, cluster_state, 'bundleExecution', is_condition_met, 'timed out')
+
+        is_condition_met.assert_called_once_with()
+
+    def test_events_coalesced_within_window(self):
+        first_burst = [create_test_event('bundleExecutionAdded') for _ in range(3)]
+        second_burst = [create_test_event('bundleExecutionAdded') for _ in range(2)]
+        next_burst = threading.Event()
+
+        def events():
+            for event in first_burst:
+                yield event
+            next_burst.wait()
+            for event in second_burst:
+                yield event
+
+        def is_condition_met():
+            next_burst.set()
+            return cluster_state.update.call_count == 2
+
+        get_events_mock = MagicMock(return_value=events())
+        cluster_state = MagicMock()
+        args = MagicMock(wait_timeout=10)
+
+        with patch('conductr_cli.conduct_url.url'), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock), \
+                patch('conductr_cli.constants.DEFAULT_WAIT_EVENT_WINDOW', 0.5):
+            bundle_wait.wait_for_events(args, cluster_state, 'bundleExecution', is_condition_met, 'timed out')
+
+        self.assertEqual([call(first_burst), call(second_burst)], cluster_state.update.call_args_list)
+
+    def test_stream_error(self):
+        def broken_events():
+            yield create_test_event('bundleExecutionAdded')
+            raise ConnectionError('test reason')
+
+        get_events_mock = MagicMock(return_value=broken_events())
+        cluster_state = MagicMock()
+        is_condition_met = MagicMock(return_value=False)
+        args = MagicMock(wait_timeout=10)
+
+        with patch('conductr_cli.conduct_url.url'), \
+                patch('conductr_cli.sse_client.get_events', get_events_mock):
+            self.assertRaises(ConnectionError, bundle_wait.wait_for_events,
+                              args, cluster_state, 'bundleExecution', is_condition_met, 'timed out')
@@ -0,0 +1,98 @@
+from conductr_cli.test.cli_test_case import CliTestCase
+from conductr_cli import cluster_state
+from conductr_cli.sse_client import Event
+import json
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+BUNDLE_ID = 'a101449418187d92c789d1adc240b6d6'
+
+
+def create_bundle(bundle_id, nr_of_installations, started_executions):
+    return {
+        'bundleId': bundle_id,
+        'bundleInstallations': [{'bundleFile': 'file:///tmp/{}.zip'.format(i)} for i in range(nr_of_installations)],
+        'bundleExecutions': [{'host': '127.0.0.{}'.format(i), 'isStarted': is_started}
+                             for i, is_started in enumerate(started_executions)]
+    }
+
+
+class TestClusterState(CliTestCase):
+    args = MagicMock(**{
+        'ip': '127.0.0.1',
+        'port': '9005',
+        'api_version': '1'
+    })
+
+    def fetch(self, bundles):
+        http_method = self.respond_with(text=json.dumps(bundles))
+        with patch('conductr_cli.http.get', http_method):
+            state = cluster_state.fetch(self.args)
+        http_method.assert_called_once_with('http://127.0.0.1:9005/bundles')
+        return state
+
+    def test_fetch(self):
+        state = self.fetch([
+            create_bundle(BUNDLE_ID, 2, [True, False, True]),
+            create_bundle('45e0c477d3e5ea92aa8d85c0d8f3e25c', 1, [])
+        ])
+
+        self.assertEqual(1, state.refresh_count)
+        self.assertEqual(2, state.count_installations(BUNDLE_ID))
+        self.assertEqual(2, state.get_scale(BUNDLE_ID))
+        self.assertEqual(1, state.count_installations('45e0c477d3e5ea92aa8d85c0d8f3e25c'))
+        self.assertEqual(0, state.get_scale('45e0c477d3e5ea92aa8d85c0d8f3e25c'))
+        self.assertEqual(0, state.count_installations('unknown'))
+        self.assertEqual(0, state.get_scale('unknown'))
+
+    def test_update_from_event_payload(self):
+        state = self.fetch([create_bundle(BUNDLE_ID, 1, [])])
+
+        http_method = self.respond_with(text='[]')
+        with patch('conductr_cli.http.get', http_method):
+            state.update([Event('bundleExecutionAdded', json.dumps({
+                'bundleId': BUNDLE_ID,
+                'bundleExecutions': [{'host': '127.0.0.1', 'isStarted': True}]
+            }))])
+            state.update([Event('bundleInstallationAdded', json.dumps([
+                create_bundle('45e0c477d3e5ea92aa8d85c0d8f3e25c', 3, [False])
+            ]))])
+
+        http_method.assert_not_called()
+        self.assertEqual(1, state.refresh_count)
+        self.assertEqual(2, state.event_count)
+        self.assertEqual(2, state.saved_refresh_count)
+        self.assertEqual(1, state.count_installations(BUNDLE_ID))
+        self.assertEqual(1, state.get_scale(BUNDLE_ID))
+        self.assertEqual(3, state.count_installations('45e0c477d3e5ea92aa8d85c0d8f3e25c'))
+
+    def test_refresh_when_event_cannot_be_applied(self):
+        state = self.fetch([create_bundle(BUNDLE_ID, 1, [])])
+
+        for data in [None, BUNDLE_ID, '{"bundleId": "45e0c477d3e5ea92aa8d85c0d8f3e25c", "bundleExecutions": []}']:
+            http_method = self.respond_with(text=json.dumps([create_bundle(BUNDLE_ID, 1, [True])]))
+            with patch('conductr_cli.http.get', http_method):
+                state.update([Event('bundleExecutionAdded', data)])
+            http_method.assert_called_once_with('http://127.0.0.1:9005/bundles')
+
+        self.assertEqual(4, state.refresh_count)
+        self.assertEqual(0, state.saved_refresh_count)
+        self.assertEqual(1, state.get_scale(BUNDLE_ID))
+
+    def test_refresh_once_per_batch(self):
+        state = self.fetch([create_bundle(BUNDLE_ID, 1, [])])
+
+        events = [Event('bundleExecutionAdded', BUNDLE_ID) for _ in range(20)]
+        http_method = self.respond_with(text=json.dumps([create_bundle(BUNDLE_ID, 1, [True] * 20)]))
+        with patch('conductr_cli.http.get', http_method):
+            state.update(events)
+        http_method.assert_called_once_with('http://127.0.0.1:9005/bundles')
+
+        self.assertEqual(2, state.refresh_count)
+        self.assertEqual(20, state.event_count)
+        self.assertEqual(19, state.saved_refresh_count)
+        self.assertEqual(20, state.get_scale(BUNDLE_ID))
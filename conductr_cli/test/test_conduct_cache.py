@@ -0,0 +1,101 @@
+from conductr_cli.test.cli_test_case import CliTestCase, as_warn, strip_margin
+from conductr_cli import conduct_cache, logging_setup
+from conductr_cli.resolve_cache import CachedFile, DAY, MEGABYTE
+import arrow
+
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+class TestConductCacheCommand(CliTestCase):
+
+    default_args = {
+        'verbose': False,
+        'quiet': False,
+        'resolve_cache_dir': '/cache-dir'
+    }
+
+    cached_files = [
+        CachedFile('f804d644a01a5ab9f679f76939f5c7e28301e1aecc83627877065cef26de12db', 'visualizer.zip',
+                   '/cache-dir/blobs/f804d644/visualizer.zip', 2048, 1000),
+        CachedFile('6e4560ef252cd57322f595627c881c48b2f8bf98c3b6d08073c0b9b5db1e5068', 'cassandra.zip',
+                   '/cache-dir/blobs/6e4560ef/cassandra.zip', 3 * MEGABYTE, 2000)
+    ]
+
+    def test_ls(self):
+        cached_files_mock = MagicMock(return_value=self.cached_files)
+        stdout = MagicMock()
+
+        with patch('conductr_cli.resolve_cache.cached_files', cached_files_mock):
+            logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
+            result = conduct_cache.ls(MagicMock(**self.default_args))
+            self.assertTrue(result)
+
+        cached_files_mock.assert_called_with('/cache-dir')
+        self.assertEqual(
+            strip_margin("""|DIGEST   NAME              SIZE  ACCESSED
+                            |6e4560e  cassandra.zip   3.0 MB  {}
+                            |f804d64  visualizer.zip  2.0 KB  {}
+                            |""".format(self.local_time(2000), self.local_time(1000))),
+            self.output(stdout))
+
+    def test_prune(self):
+        prune_mock = MagicMock(return_value=self.cached_files)
+        stdout = MagicMock()
+
+        args = self.default_args.copy()
+        args.update({'max_size': 100, 'max_age': 7})
+        with patch('conductr_cli.resolve_cache.prune', prune_mock):
+            logging_setup.configure_logging(MagicMock(**args), stdout)
+            result = conduct_cache.prune(MagicMock(**args))
+            self.assertTrue(result)
+
+        prune_mock.assert_called_with('/cache-dir', 100 * MEGABYTE, 7 * DAY)
+        self.assertEqual('Removed 2 files, 3.0 MB freed\n', self.output(stdout))
+
+    def test_prune_with_settings_from_environment(self):
+        prune_mock = MagicMock(return_value=[])
+        stdout = MagicMock()
+
+        args = self.default_args.copy()
+        args.update({'max_size': None, 'max_age': None})
+        with patch('conductr_cli.resolve_cache.prune', prune_mock), \
+                patch.dict('os.environ', {'CONDUCTR_RESOLVE_CACHE_MAX_SIZE': '100',
+                                          'CONDUCTR_RESOLVE_CACHE_MAX_AGE': 'a week'}):
+            logging_setup.configure_logging(MagicMock(**args), stdout)
+            result = conduct_cache.prune(MagicMock(**args))
+            self.assertTrue(result)
+
+        # Malformed settings fall back to their default
+        prune_mock.assert_called_with('/cache-dir', 100 * MEGABYTE, 30 * DAY)
+        self.assertEqual(as_warn('Warning: CONDUCTR_RESOLVE_CACHE_MAX_AGE is set to a week, which isn\'t a number, '
+                                 'using 30 instead\n') + 'Removed 0 files, 0 B freed\n',
+                         self.output(stdout))
+
+    def test_stats(self):
+        cached_files_mock = MagicMock(return_value=self.cached_files)
+        stats_mock = MagicMock(return_value={'hits': 3, 'misses': 1})
+        stdout = MagicMock()
+
+        with patch('conductr_cli.resolve_cache.cached_files', cached_files_mock), \
+                patch('conductr_cli.resolve_cache.stats', stats_mock):
+            logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
+            result = conduct_cache.stats(MagicMock(**self.default_args))
+            self.assertTrue(result)
+
+        stats_mock.assert_called_with('/cache-dir')
+        self.assertEqual(
+            strip_margin("""|Files:     2
+                            |Size:      3.0 MB
+                            |Hits:      3
+                            |Misses:    1
+                            |Hit ratio: 75%
+                            |"""),
+            self.output(stdout))
+
+    @staticmethod
+    def local_time(timestamp):
+        return arrow.get(timestamp).to('local').strftime('%Y-%m-%d %H:%M')
@@ -32,7 +32,7 @@ class TestConductEventsCommand(CliTestCase):
         quote_method = MagicMock(return_value=self.bundle_id_urlencoded)
         stdout = MagicMock()
 
-        with patch('requests.get', http_method), \
+        with patch('conductr_cli.http.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_events.events(MagicMock(**self.default_args))
@@ -60,7 +60,7 @@ class TestConductEventsCommand(CliTestCase):
         quote_method = MagicMock(return_value=self.bundle_id_urlencoded)
         stdout = MagicMock()
 
-        with patch('requests.get', http_method), \
+        with patch('conductr_cli.http.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_events.events(MagicMock(**self.default_args))
@@ -79,7 +79,7 @@ class TestConductEventsCommand(CliTestCase):
         quote_method = MagicMock(return_value=self.bundle_id_urlencoded)
         stderr = MagicMock()
 
-        with patch('requests.get', http_method), \
+        with patch('conductr_cli.http.get', http_method), \
                 patch('urllib.parse.quote', quote_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_events.events(MagicMock(**self.default_args))
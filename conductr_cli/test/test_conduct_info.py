@@ -26,7 +26,7 @@ class TestConductInfoCommand(CliTestCase):
         http_method = self.respond_with(text='[]')
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_info.info(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -48,7 +48,7 @@ class TestConductInfoCommand(CliTestCase):
         ]""")
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_info.info(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -83,7 +83,7 @@ class TestConductInfoCommand(CliTestCase):
         ]""")
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_info.info(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -114,7 +114,7 @@ class TestConductInfoCommand(CliTestCase):
         ]""")
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             args = self.default_args.copy()
             args.update({'verbose': True})
             logging_setup.configure_logging(MagicMock(**args), stdout)
@@ -176,7 +176,7 @@ class TestConductInfoCommand(CliTestCase):
         ]""")
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             args = self.default_args.copy()
             args.update({'long_ids': True})
             logging_setup.configure_logging(MagicMock(**args), stdout)
@@ -201,7 +201,7 @@ class TestConductInfoCommand(CliTestCase):
         ]""")
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_info.info(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -225,7 +225,7 @@ class TestConductInfoCommand(CliTestCase):
         ]""")
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_info.info(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -242,7 +242,7 @@ class TestConductInfoCommand(CliTestCase):
         http_method = self.raise_connection_error('test reason', self.default_url)
         stderr = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_info.info(MagicMock(**self.default_args))
             self.assertFalse(result)
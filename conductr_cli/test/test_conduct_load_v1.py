@@ -2,7 +2,6 @@ from conductr_cli.test.conduct_load_test_base import ConductLoadTestBase
 from conductr_cli.test.cli_test_case import create_temp_bundle, strip_margin, as_error, \
     create_temp_bundle_with_contents
 from conductr_cli import conduct_load, logging_setup
-from conductr_cli.conduct_load import LOAD_HTTP_TIMEOUT
 import shutil
 
 try:
@@ -51,7 +50,9 @@ class TestConductLoadCommand(ConductLoadTestBase):
             'custom_settings': self.custom_settings,
             'resolve_cache_dir': self.bundle_resolve_cache_dir,
             'bundle': self.bundle_file,
-            'configuration': None
+            'configuration': None,
+            'offline': False,
+            'force': False
         }
 
         self.default_url = 'http://127.0.0.1:9005/bundles'
@@ -69,6 +70,9 @@ class TestConductLoadCommand(ConductLoadTestBase):
     def test_success(self):
         self.base_test_success()
 
+    def test_success_already_loaded(self):
+        self.base_test_success_already_loaded()
+
     def test_success_verbose(self):
         self.base_test_success_verbose()
 
@@ -87,7 +91,8 @@ class TestConductLoadCommand(ConductLoadTestBase):
             'config.sh': 'echo configuring'
         })
 
-        resolve_bundle_mock = MagicMock(side_effect=[(self.bundle_name, self.bundle_file), ('config.zip', config_file)])
+        resolve_bundle_mock = self.resolve_bundle_mock({self.bundle_file: (self.bundle_name, self.bundle_file),
+                                                       config_file: ('config.zip', config_file)})
         http_method = self.respond_with(200, self.default_response)
         stdout = MagicMock()
         open_mock = MagicMock(return_value=1)
@@ -98,7 +103,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
         input_args = MagicMock(**args)
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
@@ -110,16 +115,16 @@ class TestConductLoadCommand(ConductLoadTestBase):
             [call(self.bundle_file, 'rb'), call(config_file, 'rb')]
         )
 
-        self.assertEqual(
+        self.assertCountEqual(
             resolve_bundle_mock.call_args_list,
             [
-                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file),
-                call(self.custom_settings, self.bundle_resolve_cache_dir, config_file)
+                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False),
+                call(self.custom_settings, self.bundle_resolve_cache_dir, config_file, False)
             ]
         )
         expected_files = self.default_files + [('configuration', ('config.zip', 1))]
         expected_files[4] = ('bundleName', 'overlaid-name')
-        http_method.assert_called_with(self.default_url, files=expected_files, timeout=LOAD_HTTP_TIMEOUT)
+        self.assert_files_posted(http_method, expected_files)
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
         self.assertEqual(self.default_output(downloading_configuration='Retrieving configuration...\n'),
@@ -160,7 +165,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Unable to parse bundle.conf.
@@ -187,7 +192,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Unable to parse bundle.conf.
@@ -214,7 +219,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Unable to parse bundle.conf.
@@ -241,7 +246,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Unable to parse bundle.conf.
@@ -269,7 +274,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Unable to parse bundle.conf.
@@ -1,8 +1,8 @@
-from conductr_cli.test.cli_test_case import create_temp_bundle, strip_margin, as_error, \
+from conductr_cli.test.cli_test_case import CliTestCase, create_temp_bundle, strip_margin, as_error, \
     create_temp_bundle_with_contents
 from conductr_cli.test.conduct_load_test_base import ConductLoadTestBase
-from conductr_cli import conduct_load, logging_setup
-from conductr_cli.conduct_load import LOAD_HTTP_TIMEOUT
+from conductr_cli import conduct_load, logging_setup, screen_utils
+import logging
 
 try:
     from unittest.mock import call, patch, MagicMock, Mock  # 3.3 and beyond
@@ -56,7 +56,9 @@ class TestConductLoadCommand(ConductLoadTestBase):
             'custom_settings': self.custom_settings,
             'resolve_cache_dir': self.bundle_resolve_cache_dir,
             'bundle': self.bundle_file,
-            'configuration': None
+            'configuration': None,
+            'offline': False,
+            'force': False
         }
 
         self.default_url = 'http://127.0.0.1:9005/v2/bundles'
@@ -72,6 +74,11 @@ class TestConductLoadCommand(ConductLoadTestBase):
             self.base_test_success()
         zip_entry_mock.assert_called_with('bundle.conf', self.bundle_file)
 
+    def test_success_already_loaded(self):
+        zip_entry_mock = MagicMock(return_value='mock bundle.conf')
+        with patch('conductr_cli.bundle_utils.zip_entry', zip_entry_mock):
+            self.base_test_success_already_loaded()
+
     def test_success_verbose(self):
         zip_entry_mock = MagicMock(return_value='mock bundle.conf')
         with patch('conductr_cli.bundle_utils.zip_entry', zip_entry_mock):
@@ -102,7 +109,8 @@ class TestConductLoadCommand(ConductLoadTestBase):
             'config.sh': 'echo configuring'
         })
 
-        resolve_bundle_mock = MagicMock(side_effect=[(self.bundle_name, self.bundle_file), ('config.zip', config_file)])
+        resolve_bundle_mock = self.resolve_bundle_mock({self.bundle_file: (self.bundle_name, self.bundle_file),
+                                                       config_file: ('config.zip', config_file)})
         zip_entry_mock = MagicMock(side_effect=['mock bundle.conf', 'mock bundle.conf overlay'])
         http_method = self.respond_with(200, self.default_response)
         stdout = MagicMock()
@@ -115,18 +123,18 @@ class TestConductLoadCommand(ConductLoadTestBase):
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.bundle_utils.zip_entry', zip_entry_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_load.load(input_args)
             self.assertTrue(result)
 
-        self.assertEqual(
+        self.assertCountEqual(
             resolve_bundle_mock.call_args_list,
             [
-                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file),
-                call(self.custom_settings, self.bundle_resolve_cache_dir, config_file)
+                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False),
+                call(self.custom_settings, self.bundle_resolve_cache_dir, config_file, False)
             ]
         )
 
@@ -141,7 +149,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             ('bundle', ('bundle.zip', 1)),
             ('configuration', ('config.zip', 1))
         ]
-        http_method.assert_called_with(self.default_url, files=expected_files, timeout=LOAD_HTTP_TIMEOUT)
+        self.assert_files_posted(http_method, expected_files)
 
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
@@ -158,7 +166,8 @@ class TestConductLoadCommand(ConductLoadTestBase):
             'config.sh': 'echo configuring'
         })
 
-        resolve_bundle_mock = MagicMock(side_effect=[(self.bundle_name, self.bundle_file), ('config.zip', config_file)])
+        resolve_bundle_mock = self.resolve_bundle_mock({self.bundle_file: (self.bundle_name, self.bundle_file),
+                                                       config_file: ('config.zip', config_file)})
         zip_entry_mock = MagicMock(side_effect=['mock bundle.conf', None])
         http_method = self.respond_with(200, self.default_response)
         stdout = MagicMock()
@@ -171,18 +180,18 @@ class TestConductLoadCommand(ConductLoadTestBase):
 
         with patch('conductr_cli.resolver.resolve_bundle', resolve_bundle_mock), \
                 patch('conductr_cli.bundle_utils.zip_entry', zip_entry_mock), \
-                patch('requests.post', http_method), \
+                patch('conductr_cli.http.post', http_method), \
                 patch('builtins.open', open_mock), \
                 patch('conductr_cli.bundle_installation.wait_for_installation', wait_for_installation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_load.load(input_args)
             self.assertTrue(result)
 
-        self.assertEqual(
+        self.assertCountEqual(
             resolve_bundle_mock.call_args_list,
             [
-                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file),
-                call(self.custom_settings, self.bundle_resolve_cache_dir, config_file)
+                call(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False),
+                call(self.custom_settings, self.bundle_resolve_cache_dir, config_file, False)
             ]
         )
 
@@ -196,7 +205,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             ('bundle', ('bundle.zip', 1)),
             ('configuration', ('config.zip', 1))
         ]
-        http_method.assert_called_with(self.default_url, files=expected_files, timeout=LOAD_HTTP_TIMEOUT)
+        self.assert_files_posted(http_method, expected_files)
 
         wait_for_installation_mock.assert_called_with(self.bundle_id, input_args)
 
@@ -256,7 +265,7 @@ class TestConductLoadCommand(ConductLoadTestBase):
             result = conduct_load.load(MagicMock(**args))
             self.assertFalse(result)
 
-        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file)
+        resolve_bundle_mock.assert_called_with(self.custom_settings, self.bundle_resolve_cache_dir, self.bundle_file, False)
 
         self.assertEqual(
             as_error(strip_margin("""|Error: Problem with the bundle: Unable to find bundle.conf within the bundle file
@@ -269,3 +278,76 @@ class TestConductLoadCommand(ConductLoadTestBase):
         with patch('conductr_cli.bundle_utils.zip_entry', zip_entry_mock):
             self.base_test_failure_install_timeout()
         zip_entry_mock.assert_called_with('bundle.conf', self.bundle_file)
+
+
+class TestShowUploadProgress(CliTestCase):
+    def test_show_progress(self):
+        stdout = MagicMock()
+        megabyte = 1024 * 1024
+
+        with patch('time.monotonic', MagicMock(side_effect=[0.0, 1.0, 1.1, 2.0])):
+            logging_setup.configure_logging(MagicMock(verbose=False, quiet=False), stdout)
+            show_progress = conduct_load.show_upload_progress(logging.getLogger('conductr_cli.conduct_load'))
+            show_progress(1 * megabyte, 4 * megabyte)
+            show_progress(2 * megabyte, 4 * megabyte)
+            show_progress(4 * megabyte, 4 * megabyte)
+
+        self.assertEqual(
+            '{} 1.0 MB/4.0 MB 1.0 MB/s ETA 0:03\r'.format(screen_utils.progress_bar(1, 4)) +
+            '{} 4.0 MB/4.0 MB 2.0 MB/s ETA 0:00\n'.format(screen_utils.progress_bar(4, 4)) +
+            'Uploaded 4.0 MB in 0:02 (2.0 MB/s)\n',
+            self.output(stdout))
+
+
+class TestFindLoadedBundle(CliTestCase):
+    bundle_digest = 'f804d644a01a5ab9f679f76939f5c7e28301e1aecc83627877065cef26de12db'
+    configuration_digest = '6e4560ef252cd57322f595627c881c48b2f8bf98c3b6d08073c0b9b5db1e5068'
+    bundle_file = '/cache/bundle-{}.zip'.format(bundle_digest)
+    configuration_file = '/cache/config-{}.zip'.format(configuration_digest)
+
+    def find_loaded_bundle(self, bundle, configuration_file=None, force=False):
+        cluster_state_mock = MagicMock()
+        cluster_state_mock.bundle.side_effect = lambda bundle_id: bundle if bundle_id == bundle['bundleId'] else None
+        fetch_mock = MagicMock(return_value=cluster_state_mock)
+        args = MagicMock(force=force)
+        with patch('conductr_cli.cluster_state.fetch', fetch_mock):
+            result = conduct_load.find_loaded_bundle(args, self.bundle_file, configuration_file)
+        return result, fetch_mock
+
+    def test_loaded(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2', 'bundleDigest': self.bundle_digest}
+        result, fetch_mock = self.find_loaded_bundle(bundle)
+        self.assertEqual('f804d644a01a5ab9f679f76939f5c7e2', result)
+
+    def test_loaded_with_configuration(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2-6e4560ef252cd57322f595627c881c48',
+                  'bundleDigest': self.bundle_digest}
+        result, fetch_mock = self.find_loaded_bundle(bundle, self.configuration_file)
+        self.assertEqual('f804d644a01a5ab9f679f76939f5c7e2-6e4560ef252cd57322f595627c881c48', result)
+
+    def test_loaded_without_configuration(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2', 'bundleDigest': self.bundle_digest}
+        result, fetch_mock = self.find_loaded_bundle(bundle, self.configuration_file)
+        self.assertIsNone(result)
+
+    def test_digest_mismatch(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2', 'bundleDigest': 'f804d644a01a5ab9f679f76939f5c7e2'}
+        result, fetch_mock = self.find_loaded_bundle(bundle)
+        self.assertIsNone(result)
+
+    def test_bundle_without_digest(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2'}
+        result, fetch_mock = self.find_loaded_bundle(bundle)
+        self.assertIsNone(result)
+
+    def test_configuration_without_digest(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2', 'bundleDigest': self.bundle_digest}
+        result, fetch_mock = self.find_loaded_bundle(bundle, '/cache/config.zip')
+        self.assertIsNone(result)
+        fetch_mock.assert_not_called()
+
+    def test_force(self):
+        bundle = {'bundleId': 'f804d644a01a5ab9f679f76939f5c7e2', 'bundleDigest': self.bundle_digest}
+        result, fetch_mock = self.find_loaded_bundle(bundle, force=True)
+        self.assertIsNone(result)
+        fetch_mock.assert_not_called()
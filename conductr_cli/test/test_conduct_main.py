@@ -1,8 +1,13 @@
 from unittest import TestCase
-from conductr_cli.conduct_main import build_parser, get_cli_parameters
+from conductr_cli.conduct_main import build_parser, get_cli_parameters, run
 from argparse import Namespace
 import os
 
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
 
 class TestConduct(TestCase):
 
@@ -64,6 +69,49 @@ class TestConduct(TestCase):
         self.assertEqual(args.wait_timeout, 60)
         self.assertEqual(args.bundle, 'path-to-bundle')
         self.assertEqual(args.configuration, 'path-to-conf')
+        self.assertEqual(args.force, False)
+        self.assertEqual(args.offline, False)
+
+    def test_parser_load_force(self):
+        args = self.parser.parse_args('load --force path-to-bundle'.split())
+
+        self.assertEqual(args.func.__name__, 'load')
+        self.assertEqual(args.force, True)
+        self.assertEqual(args.bundle, 'path-to-bundle')
+
+    def test_parser_load_offline(self):
+        args = self.parser.parse_args('load --offline path-to-bundle'.split())
+
+        self.assertEqual(args.func.__name__, 'load')
+        self.assertEqual(args.offline, True)
+
+    def test_parser_cache_prune(self):
+        args = self.parser.parse_args('cache prune --max-size 100 --max-age 7'.split())
+
+        self.assertEqual(args.func.__name__, 'prune')
+        self.assertEqual(args.resolve_cache_dir, '{}/.conductr/cache'.format(os.path.expanduser('~')))
+        self.assertEqual(args.max_size, 100)
+        self.assertEqual(args.max_age, 7)
+
+    def test_parser_cache_stats(self):
+        args = self.parser.parse_args('cache stats --resolve-cache-dir /somewhere'.split())
+
+        self.assertEqual(args.func.__name__, 'stats')
+        self.assertEqual(args.resolve_cache_dir, '/somewhere')
+        self.assertTrue(args.local_only)
+
+    def test_run_cache_without_ip(self):
+        resolve_default_ip_mock = MagicMock(return_value=None)
+        stats_mock = MagicMock(return_value=True)
+
+        with patch('sys.argv', 'conduct cache stats --resolve-cache-dir /somewhere'.split()), \
+                patch('conductr_cli.host.resolve_default_ip', resolve_default_ip_mock), \
+                patch('conductr_cli.conduct_cache.stats', stats_mock), \
+                patch('conductr_cli.logging_setup.configure_logging'):
+            run()
+
+        resolve_default_ip_mock.assert_not_called()
+        self.assertEqual('/somewhere', stats_mock.call_args[0][0].resolve_cache_dir)
 
     def test_parser_load_with_custom_resolve_cache_dir(self):
         args = self.parser.parse_args('load --resolve-cache-dir /somewhere path-to-bundle path-to-conf'.split())
@@ -82,7 +82,7 @@ class TestConductRunCommand(ConductRunTestBase):
         stdout = MagicMock()
 
         input_args = MagicMock(**args)
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_run.run(input_args)
@@ -25,7 +25,7 @@ class TestConductServicesCommand(CliTestCase):
         http_method = self.respond_with(200, '[]')
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_services.services(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -40,7 +40,7 @@ class TestConductServicesCommand(CliTestCase):
         http_method = self.respond_with_file_contents('data/two_bundles.json')
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_services.services(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -66,7 +66,7 @@ class TestConductServicesCommand(CliTestCase):
         http_method = self.respond_with_file_contents('data/two_bundles_no_path.json')
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_services.services(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -89,7 +89,7 @@ class TestConductServicesCommand(CliTestCase):
         http_method = self.respond_with_file_contents('data/one_bundle_starting.json')
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), stdout)
             result = conduct_services.services(MagicMock(**self.default_args))
             self.assertTrue(result)
@@ -109,7 +109,7 @@ class TestConductServicesCommand(CliTestCase):
         http_method = self.respond_with_file_contents('data/one_bundle_starting.json')
         stdout = MagicMock()
 
-        with patch('requests.get', http_method):
+        with patch('conductr_cli.http.get', http_method):
             args = self.default_args.copy()
             args.update({'long_ids': True})
             logging_setup.configure_logging(MagicMock(**args), stdout)
@@ -49,7 +49,7 @@ class TestConductStopCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -68,7 +68,7 @@ class TestConductStopCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'verbose': True})
         input_args = MagicMock(**args)
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -87,7 +87,7 @@ class TestConductStopCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'long_ids': True})
         input_args = MagicMock(**args)
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -108,7 +108,7 @@ class TestConductStopCommand(CliTestCase):
         args.update({'cli_parameters': cli_parameters})
         input_args = MagicMock(**args)
 
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_stop.stop(input_args)
@@ -125,7 +125,7 @@ class TestConductStopCommand(CliTestCase):
         http_method = self.respond_with(404)
         stderr = MagicMock()
 
-        with patch('requests.put', http_method):
+        with patch('conductr_cli.http.put', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_stop.stop(MagicMock(**self.default_args))
             self.assertFalse(result)
@@ -141,7 +141,7 @@ class TestConductStopCommand(CliTestCase):
         http_method = self.raise_connection_error('test reason', self.default_url)
         stderr = MagicMock()
 
-        with patch('requests.put', http_method):
+        with patch('conductr_cli.http.put', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_stop.stop(MagicMock(**self.default_args))
             self.assertFalse(result)
@@ -158,7 +158,7 @@ class TestConductStopCommand(CliTestCase):
         stderr = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.put', http_method), \
+        with patch('conductr_cli.http.put', http_method), \
                 patch('conductr_cli.bundle_scale.wait_for_scale', wait_for_scale_mock):
             logging_setup.configure_logging(input_args, err_output=stderr)
             result = conduct_stop.stop(input_args)
@@ -43,7 +43,7 @@ class TestConductUnloadCommand(CliTestCase):
         stdout = MagicMock()
 
         input_args = MagicMock(**self.default_args)
-        with patch('requests.delete', http_method), \
+        with patch('conductr_cli.http.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -63,7 +63,7 @@ class TestConductUnloadCommand(CliTestCase):
         args.update({'verbose': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.delete', http_method), \
+        with patch('conductr_cli.http.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -83,7 +83,7 @@ class TestConductUnloadCommand(CliTestCase):
         args.update({'quiet': True})
         input_args = MagicMock(**args)
 
-        with patch('requests.delete', http_method), \
+        with patch('conductr_cli.http.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -104,7 +104,7 @@ class TestConductUnloadCommand(CliTestCase):
         args.update({'cli_parameters': cli_parameters})
         input_args = MagicMock(**args)
 
-        with patch('requests.delete', http_method), \
+        with patch('conductr_cli.http.delete', http_method), \
                 patch('conductr_cli.bundle_installation.wait_for_uninstallation', wait_for_uninstallation_mock):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
@@ -124,7 +124,7 @@ class TestConductUnloadCommand(CliTestCase):
         args = self.default_args.copy()
         args.update({'no_wait': True})
         input_args = MagicMock(**args)
-        with patch('requests.delete', http_method):
+        with patch('conductr_cli.http.delete', http_method):
             logging_setup.configure_logging(input_args, stdout)
             result = conduct_unload.unload(input_args)
             self.assertTrue(result)
@@ -137,7 +137,7 @@ class TestConductUnloadCommand(CliTestCase):
         http_method = self.respond_with(404)
         stderr = MagicMock()
 
-        with patch('requests.delete', http_method):
+        with patch('conductr_cli.http.delete', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_unload.unload(MagicMock(**self.default_args))
             self.assertFalse(result)
@@ -153,7 +153,7 @@ class TestConductUnloadCommand(CliTestCase):
         http_method = self.raise_connection_error('test reason', self.default_url)
         stderr = MagicMock()
 
-        with patch('requests.delete', http_method):
+        with patch('conductr_cli.http.delete', http_method):
             logging_setup.configure_logging(MagicMock(**self.default_args), err_output=stderr)
             result = conduct_unload.unload(MagicMock(**self.default_args))
             self.assertFalse(result)
@@ -0,0 +1,244 @@
+from unittest import TestCase
+from urllib.error import URLError
+from requests.exceptions import ConnectionError, HTTPError
+from conductr_cli import downloader
+from conductr_cli.test.cli_test_case import create_mock_logger, create_streamed_response
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+class TestDownload(TestCase):
+    content = b'bundle content'
+
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def test_copy_file(self):
+        source_path = os.path.join(self.cache_dir, 'bundle.zip')
+        with open(source_path, 'wb') as f:
+            f.write(self.content)
+        download_path = os.path.join(self.cache_dir, 'bundle.tmp')
+
+        digest = downloader.download('file://{}'.format(source_path), download_path)
+
+        self.assertEqual(hashlib.sha256(self.content).hexdigest(), digest)
+        with open(download_path, 'rb') as f:
+            self.assertEqual(self.content, f.read())
+
+    def test_copy_missing_file(self):
+        self.assertRaises(URLError, downloader.download, 'file:///no/such/bundle.zip',
+                          os.path.join(self.cache_dir, 'bundle.tmp'))
+
+    def test_http(self):
+        response = create_streamed_response(200, self.content, {'Content-Length': '14'})
+        on_progress_mock = MagicMock()
+        download_path = os.path.join(self.cache_dir, 'bundle.part')
+
+        with patch('conductr_cli.http.get', MagicMock(return_value=response)):
+            digest = downloader.download('https://site.com/bundle.zip', download_path, on_progress=on_progress_mock)
+
+        self.assertEqual(hashlib.sha256(self.content).hexdigest(), digest)
+        on_progress_mock.assert_called_with(14, 14)
+
+
+class TestDownloadHttp(TestCase):
+    content = b'bundle content'
+
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+        self.download_path = os.path.join(self.cache_dir, 'bundle.part')
+        self.state_path = '{}.state'.format(self.download_path)
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def write_partial_file(self, content, state):
+        with open(self.download_path, 'wb') as f:
+            f.write(content)
+        with open(self.state_path, 'w') as f:
+            json.dump(state, f)
+
+    def download(self, responses, auth=None):
+        http_get_mock = MagicMock(side_effect=responses)
+        sleep_mock = MagicMock()
+        get_logger_mock, log_mock = create_mock_logger()
+
+        with patch('conductr_cli.http.get', http_get_mock), \
+                patch('time.sleep', sleep_mock), \
+                patch('logging.getLogger', get_logger_mock):
+            self.digest = downloader.download_http('http://site.com/bundle.zip', self.download_path, auth)
+
+        return http_get_mock, sleep_mock, log_mock
+
+    def assert_downloaded(self):
+        with open(self.download_path, 'rb') as f:
+            self.assertEqual(self.content, f.read())
+        self.assertEqual(hashlib.sha256(self.content).hexdigest(), self.digest)
+        self.assertFalse(os.path.exists(self.state_path))
+
+    def test_download(self):
+        response = create_streamed_response(200, self.content, {'Content-Length': '14', 'ETag': '"v1"'})
+        http_get_mock, sleep_mock, log_mock = self.download([response], auth=('username', 'password'))
+
+        self.assert_downloaded()
+        http_get_mock.assert_called_once_with('http://site.com/bundle.zip', stream=True, headers={},
+                                              auth=('username', 'password'), timeout=(5, 30))
+        sleep_mock.assert_not_called()
+
+    def test_resume_after_failure(self):
+        responses = [
+            create_streamed_response(200, self.content[:6], {'Content-Length': '14', 'ETag': '"v1"'}, ConnectionError()),
+            create_streamed_response(206, self.content[6:], {'Content-Length': '8', 'Content-Range': 'bytes 6-13/14'})
+        ]
+        http_get_mock, sleep_mock, log_mock = self.download(responses)
+
+        self.assert_downloaded()
+        self.assertEqual({'Range': 'bytes=6-', 'If-Range': '"v1"'}, http_get_mock.call_args_list[1][1]['headers'])
+        sleep_mock.assert_called_once_with(1)
+        self.assertEqual(1, log_mock.warning.call_count)
+
+    def test_resume_content_too_short(self):
+        responses = [
+            create_streamed_response(200, self.content[:8], {'Content-Length': '14', 'Last-Modified': 'Tue, 01 Mar 2016'}),
+            create_streamed_response(206, self.content[8:], {'Content-Length': '6', 'Content-Range': 'bytes 8-13/14'})
+        ]
+        http_get_mock, sleep_mock, log_mock = self.download(responses)
+
+        self.assert_downloaded()
+        self.assertEqual({'Range': 'bytes=8-', 'If-Range': 'Tue, 01 Mar 2016'},
+                         http_get_mock.call_args_list[1][1]['headers'])
+
+    def test_resume_from_previous_invocation(self):
+        self.write_partial_file(self.content[:4], {'validator': '"v1"'})
+        response = create_streamed_response(206, self.content[4:], {'Content-Length': '10', 'Content-Range': 'bytes 4-13/14'})
+        http_get_mock, sleep_mock, log_mock = self.download([response])
+
+        self.assert_downloaded()
+        self.assertEqual({'Range': 'bytes=4-', 'If-Range': '"v1"'}, http_get_mock.call_args[1]['headers'])
+
+    def test_restart_given_changed_file(self):
+        self.write_partial_file(b'stale', {'validator': '"v1"'})
+        response = create_streamed_response(200, self.content, {'Content-Length': '14', 'ETag': '"v2"'})
+        self.download([response])
+
+        self.assert_downloaded()
+
+    def test_restart_given_range_not_satisfiable(self):
+        self.write_partial_file(b'stale bundle content', {'validator': '"v1"'})
+        responses = [
+            create_streamed_response(416, b'', {'Content-Range': 'bytes */14'}),
+            create_streamed_response(200, self.content, {'Content-Length': '14', 'ETag': '"v1"'})
+        ]
+        http_get_mock, sleep_mock, log_mock = self.download(responses)
+
+        self.assert_downloaded()
+        self.assertEqual({}, http_get_mock.call_args[1]['headers'])
+        sleep_mock.assert_not_called()
+
+    def test_no_resume_without_validator(self):
+        responses = [
+            create_streamed_response(200, self.content[:6], {'Content-Length': '14', 'ETag': 'W/"v1"'}, ConnectionError()),
+            create_streamed_response(200, self.content, {'Content-Length': '14', 'ETag': 'W/"v1"'})
+        ]
+        http_get_mock, sleep_mock, log_mock = self.download(responses)
+
+        self.assert_downloaded()
+        self.assertEqual({}, http_get_mock.call_args[1]['headers'])
+
+    def test_give_up_after_max_attempts(self):
+        responses = [create_streamed_response(200, b'', {'Content-Length': '14'}, ConnectionError())
+                     for _ in range(downloader.DOWNLOAD_MAX_ATTEMPTS)]
+
+        self.assertRaises(ConnectionError, self.download, responses)
+
+    def test_not_found(self):
+        self.assertRaises(HTTPError, self.download, [create_streamed_response(404, b'')])
+
+
+class TestDownloadSegments(TestCase):
+    content = b'0123456789abcdefghijklmnopqrstuvwxyzABCD'
+
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+        self.download_path = os.path.join(self.cache_dir, 'bundle.part')
+        self.requested_ranges = []
+        self.failed_ranges = []
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def serve(self, accept_ranges=True, honour_ranges=True, fail_range=None):
+        """
+        Returns a mock of `http.get` serving the content. The first request for `fail_range` fails half way through.
+        """
+        def get(url, stream, headers, auth, timeout):
+            full_headers = {'Content-Length': str(len(self.content)), 'ETag': '"v1"'}
+            if accept_ranges:
+                full_headers['Accept-Ranges'] = 'bytes'
+
+            range_header = headers.get('Range')
+            self.requested_ranges.append(range_header)
+            if range_header is None or not honour_ranges:
+                return create_streamed_response(200, self.content, full_headers)
+
+            start, end = [int(value) for value in range_header[len('bytes='):].split('-')]
+            content = self.content[start:end + 1]
+            headers = {'Content-Length': str(len(content)),
+                       'Content-Range': 'bytes {}-{}/{}'.format(start, end, len(self.content))}
+            if range_header == fail_range and range_header not in self.failed_ranges:
+                self.failed_ranges.append(range_header)
+                return create_streamed_response(206, content[:len(content) // 2], headers, ConnectionError())
+            return create_streamed_response(206, content, headers)
+
+        return MagicMock(side_effect=get)
+
+    def download(self, http_get_mock):
+        with patch('conductr_cli.http.get', http_get_mock), \
+                patch('conductr_cli.constants.DEFAULT_DOWNLOAD_SEGMENTS', 4), \
+                patch('conductr_cli.downloader.SEGMENTED_DOWNLOAD_MIN_SIZE', 16), \
+                patch('time.sleep', MagicMock()):
+            digest = downloader.download_http('http://site.com/bundle.zip', self.download_path)
+
+        with open(self.download_path, 'rb') as f:
+            self.assertEqual(self.content, f.read())
+        self.assertEqual(hashlib.sha256(self.content).hexdigest(), digest)
+        self.assertFalse(os.path.exists('{}.state'.format(self.download_path)))
+
+    def test_download_in_segments(self):
+        self.download(self.serve())
+
+        # The first segment is read from the response to the request for the whole file
+        self.assertCountEqual([None, 'bytes=10-19', 'bytes=20-29', 'bytes=30-39'], self.requested_ranges)
+
+    def test_resume_failed_segment(self):
+        self.download(self.serve(fail_range='bytes=20-29'))
+
+        # The failed segment is resumed where it stopped. Segments still being downloaded at the time of the failure
+        # are stopped and resumed as well.
+        self.assertIn('bytes=25-29', self.requested_ranges)
+        self.assertEqual(1, self.requested_ranges.count('bytes=20-29'))
+
+    def test_single_stream_given_ranges_not_accepted(self):
+        self.download(self.serve(accept_ranges=False))
+
+        self.assertEqual([None], self.requested_ranges)
+
+    def test_single_stream_given_ranges_not_honoured(self):
+        self.download(self.serve(honour_ranges=False))
+
+        self.assertEqual(None, self.requested_ranges[-1])
+
+    def test_segment_ranges(self):
+        self.assertEqual([[0, 9], [10, 19], [20, 29], [30, 39]], downloader.segment_ranges(40, 4))
+        self.assertEqual([[0, 13], [14, 27], [28, 40]], downloader.segment_ranges(41, 3))
@@ -0,0 +1,33 @@
+from unittest import TestCase
+from conductr_cli import http
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+class TestHttp(TestCase):
+    def test_session_is_shared(self):
+        with patch('conductr_cli.http._session', None):
+            session = http.session()
+            self.assertIs(session, http.session())
+
+            adapter = session.get_adapter('http://127.0.0.1:9005/bundles')
+            self.assertIs(adapter, session.get_adapter('https://api.bintray.com'))
+            self.assertEqual(http.DEFAULT_HTTP_POOL_SIZE, adapter._pool_maxsize)
+            self.assertEqual(http.DEFAULT_HTTP_RETRIES, adapter.max_retries.connect)
+            self.assertFalse(adapter.max_retries.read)
+
+    def test_default_timeout(self):
+        session_mock = MagicMock()
+        with patch('conductr_cli.http.session', MagicMock(return_value=session_mock)):
+            http.get('http://127.0.0.1:9005/bundles')
+            http.put('http://127.0.0.1:9005/bundles/45e0c47?scale=1', timeout=42)
+            http.delete('http://127.0.0.1:9005/bundles/45e0c47', timeout=None)
+
+        self.assertEqual([
+            (('GET', 'http://127.0.0.1:9005/bundles'), {'timeout': http.DEFAULT_HTTP_TIMEOUT}),
+            (('PUT', 'http://127.0.0.1:9005/bundles/45e0c47?scale=1'), {'timeout': 42}),
+            (('DELETE', 'http://127.0.0.1:9005/bundles/45e0c47'), {'timeout': None})
+        ], session_mock.request.call_args_list)
@@ -1,6 +1,7 @@
 from conductr_cli.test.cli_test_case import CliTestCase, as_error, as_warn, strip_margin
 from conductr_cli import logging_setup
 import logging
+import threading
 
 try:
     from unittest.mock import MagicMock  # 3.3 and beyond
@@ -136,3 +137,64 @@ class TestConductrCliLogger(CliTestCase):
         self.assertEqual(['1', '\r',
                           '*', '*', '\r',
                           'X', 'Y', 'Z', '\n'], char_output)
+
+    def test_progress_from_concurrent_threads(self):
+        stdout = MagicMock()
+        stderr = MagicMock()
+        logging_setup.configure_logging(MagicMock(), stdout, stderr)
+
+        log = logging.getLogger('conductr_cli')
+
+        def log_other_progress(message, flush):
+            thread = threading.Thread(target=lambda: log.progress(message, flush=flush))
+            thread.start()
+            thread.join()
+
+        log.progress('1', flush=False)
+        log_other_progress('dropped', False)
+        log.progress('2', flush=True)
+        log_other_progress('other', True)
+
+        self.assertEqual('1\r2\nother\n', self.output(stdout))
+
+    def test_flushed_progress_of_other_threads_shown(self):
+        stdout = MagicMock()
+        stderr = MagicMock()
+        logging_setup.configure_logging(MagicMock(), stdout, stderr)
+
+        log = logging.getLogger('conductr_cli')
+
+        def log_other_progress(message):
+            thread = threading.Thread(target=lambda: log.progress(message, flush=True))
+            thread.start()
+            thread.join()
+
+        with logging_setup.progress_line():
+            log.progress('1', flush=False)
+            log_other_progress('other')
+            log.progress('2', flush=True)
+
+        self.assertEqual('1\rother\n2\n', self.output(stdout))
+
+    def test_progress_line_released_on_error(self):
+        stdout = MagicMock()
+        stderr = MagicMock()
+        logging_setup.configure_logging(MagicMock(), stdout, stderr)
+
+        log = logging.getLogger('conductr_cli')
+
+        def log_progress():
+            try:
+                with logging_setup.progress_line():
+                    log.progress('1', flush=False)
+                    raise ValueError('failed')
+            except ValueError:
+                pass
+
+        thread = threading.Thread(target=log_progress)
+        thread.start()
+        thread.join()
+        log.progress('2', flush=False)
+        log.progress('3', flush=True)
+
+        self.assertEqual('1\r2\r3\n', self.output(stdout))
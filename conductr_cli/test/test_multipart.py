@@ -0,0 +1,85 @@
+from unittest import TestCase
+from conductr_cli import multipart
+import io
+import tempfile
+import zipfile
+
+try:
+    from unittest.mock import call, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import call, MagicMock
+
+
+class TestMultipartEncoder(TestCase):
+    expected_body = b'--abc\r\n' \
+                    b'Content-Disposition: form-data; name="nrOfCpus"; filename="nrOfCpus"\r\n\r\n' \
+                    b'1.0\r\n' \
+                    b'--abc\r\n' \
+                    b'Content-Disposition: form-data; name="bundleConf"; filename="bundle.conf"\r\n\r\n' \
+                    b'name = "bundle"\r\n' \
+                    b'--abc\r\n' \
+                    b'Content-Disposition: form-data; name="bundle"; filename="bundle.zip"\r\n\r\n' \
+                    b'0123456789\r\n' \
+                    b'--abc--\r\n'
+
+    def test_read_in_chunks(self):
+        with tempfile.NamedTemporaryFile() as bundle_file:
+            bundle_file.write(b'0123456789')
+            bundle_file.flush()
+
+            with open(bundle_file.name, 'rb') as bundle:
+                body = multipart.MultipartEncoder([
+                    ('nrOfCpus', '1.0'),
+                    ('bundleConf', ('bundle.conf', self.zip_entry(b'name = "bundle"'))),
+                    ('bundle', ('bundle.zip', bundle))
+                ], boundary='abc')
+
+                self.assertEqual('multipart/form-data; boundary=abc', body.content_type)
+                self.assertEqual(len(self.expected_body), len(body))
+
+                chunks = []
+                chunk = body.read(4)
+                while chunk:
+                    self.assertLessEqual(len(chunk), 4)
+                    chunks.append(chunk)
+                    chunk = body.read(4)
+
+        self.assertEqual(self.expected_body, b''.join(chunks))
+
+    def test_read_all(self):
+        body = multipart.MultipartEncoder([
+            ('nrOfCpus', '1.0'),
+            ('bundleConf', ('bundle.conf', b'name = "bundle"')),
+            ('bundle', ('bundle.zip', io.BytesIO(b'0123456789')))
+        ], boundary='abc')
+
+        self.assertEqual(len(self.expected_body), len(body))
+        self.assertEqual(self.expected_body, body.read())
+        self.assertEqual(b'', body.read())
+
+    def test_on_read(self):
+        on_read = MagicMock()
+        body = multipart.MultipartEncoder([('bundle', ('bundle.zip', b'0123456789'))], boundary='abc',
+                                          on_read=on_read)
+        size = len(body)
+        body.read(size - 1)
+        body.read(1)
+        body.read(1)
+
+        self.assertEqual([call(size - 1, size), call(size, size)], on_read.call_args_list)
+
+    def test_quote_header_params(self):
+        body = multipart.MultipartEncoder([('bundle', ('my "bundle".zip', b''))], boundary='abc')
+        self.assertIn(b'filename="my %22bundle%22.zip"', body.read())
+
+    def test_files_are_not_read_until_sent(self):
+        bundle = io.BytesIO(b'0123456789')
+        multipart.MultipartEncoder([('bundle', ('bundle.zip', bundle))])
+        self.assertEqual(0, bundle.tell())
+
+    @staticmethod
+    def zip_entry(content):
+        zip_bytes = io.BytesIO()
+        with zipfile.ZipFile(zip_bytes, 'w') as zip_file:
+            zip_file.writestr('bundle/bundle.conf', content)
+        return zipfile.ZipFile(zip_bytes).open('bundle/bundle.conf')
@@ -0,0 +1,258 @@
+from unittest import TestCase
+from conductr_cli import resolve_cache
+from conductr_cli.exceptions import MalformedBundleError
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+except ImportError:
+    from mock import patch, MagicMock
+
+
+class TestResolveCache(TestCase):
+    content = b'bundle content'
+    digest = hashlib.sha256(content).hexdigest()
+    name = 'bundle-{}.zip'.format(digest)
+
+    def setUp(self):  # noqa
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):  # noqa
+        shutil.rmtree(self.cache_dir)
+
+    def download(self, uri, content=content):
+        downloaded_file = resolve_cache.temp_path(self.cache_dir, uri)
+        with open(downloaded_file, 'wb') as f:
+            f.write(content)
+        return downloaded_file
+
+    def test_store_and_lookup(self):
+        uri = 'https://dl.bintray.com/typesafe/bundle/{}'.format(self.name)
+        downloaded_file = self.download(uri)
+        cached_file = resolve_cache.store(self.cache_dir, uri, self.name, downloaded_file)
+
+        self.assertEqual(os.path.join(self.cache_dir, 'blobs', self.digest, self.name), cached_file)
+        self.assertEqual(cached_file, resolve_cache.lookup(self.cache_dir, uri))
+        canonical_uri = 'HTTPS://DL.bintray.com/typesafe/bundle/{}#top'.format(self.name)
+        self.assertEqual(cached_file, resolve_cache.lookup(self.cache_dir, canonical_uri))
+        self.assertFalse(os.path.exists(downloaded_file))
+
+    def create_legacy_file(self, name, content=content):
+        legacy_file = os.path.join(self.cache_dir, name)
+        with open(legacy_file, 'wb') as f:
+            f.write(content)
+        return legacy_file
+
+    def test_legacy_file_moved_on_lookup(self):
+        uri = 'https://site.com/bundles/visualizer-v1.zip'
+        legacy_file = self.create_legacy_file('visualizer-v1.zip')
+
+        cached_file = resolve_cache.lookup(self.cache_dir, uri)
+
+        self.assertEqual(os.path.join(self.cache_dir, 'blobs', self.digest, 'visualizer-v1.zip'), cached_file)
+        self.assertFalse(os.path.exists(legacy_file))
+        self.assertEqual(cached_file, resolve_cache.lookup(self.cache_dir, uri))
+
+    def test_legacy_file_moved_on_lookup_digest(self):
+        self.create_legacy_file(self.name)
+
+        cached_file = resolve_cache.lookup_digest(self.cache_dir, 'visualizer', self.name)
+
+        self.assertEqual(os.path.join(self.cache_dir, 'blobs', self.digest, self.name), cached_file)
+        self.assertEqual(cached_file, resolve_cache.lookup(self.cache_dir, 'visualizer'))
+
+    def test_legacy_file_with_other_digest_not_moved(self):
+        name = 'bundle-{}.zip'.format(hashlib.sha256(b'other content').hexdigest())
+        legacy_file = self.create_legacy_file(name)
+
+        self.assertIsNone(resolve_cache.lookup_digest(self.cache_dir, 'visualizer', name))
+        self.assertTrue(os.path.exists(legacy_file))
+
+    def test_legacy_files_listed_and_pruned(self):
+        legacy_file = self.create_legacy_file('visualizer-v1-abc.zip')
+        self.create_legacy_file('notes.txt')
+
+        self.assertEqual(['visualizer-v1-abc.zip'],
+                         [cached_file.name for cached_file in resolve_cache.cached_files(self.cache_dir)])
+        removed = resolve_cache.prune(self.cache_dir, 0, 0)
+
+        self.assertEqual(['visualizer-v1-abc.zip'], [cached_file.name for cached_file in removed])
+        self.assertFalse(os.path.exists(legacy_file))
+        self.assertTrue(os.path.isdir(self.cache_dir))
+
+    def test_temp_path_unique(self):
+        uri = 'http://site.com/bundle.zip'
+        first_path = resolve_cache.temp_path(self.cache_dir, uri)
+        second_path = resolve_cache.temp_path(self.cache_dir, uri)
+
+        self.assertNotEqual(first_path, second_path)
+        self.assertTrue(os.path.exists(first_path))
+        self.assertTrue(os.path.exists(second_path))
+
+    def test_lock_exclusive(self):
+        entered = []
+
+        def hold_lock(name):
+            with resolve_cache.lock(self.cache_dir, 'uri'):
+                entered.append(name)
+                time.sleep(0.05)
+                entered.append(name)
+
+        threads = [threading.Thread(target=hold_lock, args=(name,)) for name in ['first', 'second']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(entered[0], entered[1])
+        self.assertEqual(entered[2], entered[3])
+
+    def test_same_file_name_from_other_uri(self):
+        uri = 'http://site.com/one/bundle.zip'
+        resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+
+        self.assertIsNone(resolve_cache.lookup(self.cache_dir, 'http://site.com/two/bundle.zip'))
+
+        other_uri = 'http://site.com/two/bundle.zip'
+        other_file = resolve_cache.store(self.cache_dir, other_uri, 'bundle.zip', self.download(other_uri, b'other'))
+
+        with open(resolve_cache.lookup(self.cache_dir, uri), 'rb') as f:
+            self.assertEqual(self.content, f.read())
+        with open(other_file, 'rb') as f:
+            self.assertEqual(b'other', f.read())
+
+    def test_lookup_digest(self):
+        uri = 'https://dl.bintray.com/typesafe/bundle/{}'.format(self.name)
+        mirror_uri = 'https://mirror.com/bundle/{}'.format(self.name)
+
+        self.assertIsNone(resolve_cache.lookup_digest(self.cache_dir, mirror_uri, self.name))
+
+        cached_file = resolve_cache.store(self.cache_dir, uri, self.name, self.download(uri))
+        self.assertEqual(cached_file, resolve_cache.lookup_digest(self.cache_dir, mirror_uri, self.name))
+        self.assertEqual(cached_file, resolve_cache.lookup(self.cache_dir, mirror_uri))
+
+        self.assertIsNone(resolve_cache.lookup_digest(self.cache_dir, 'http://site.com/bundle.zip', 'bundle.zip'))
+
+    def test_digest_mismatch(self):
+        uri = 'https://dl.bintray.com/typesafe/bundle/{}'.format(self.name)
+        downloaded_file = self.download(uri, b'corrupt content')
+
+        with self.assertRaises(MalformedBundleError):
+            resolve_cache.store(self.cache_dir, uri, self.name, downloaded_file)
+
+        self.assertFalse(os.path.exists(downloaded_file))
+        self.assertIsNone(resolve_cache.lookup(self.cache_dir, uri))
+
+    def test_store_given_digest(self):
+        uri = 'https://dl.bintray.com/typesafe/bundle/{}'.format(self.name)
+        hash_file_mock = MagicMock()
+
+        with patch('conductr_cli.downloader.hash_file', hash_file_mock):
+            cached_file = resolve_cache.store(self.cache_dir, uri, self.name, self.download(uri), self.digest)
+
+        self.assertEqual(os.path.join(self.cache_dir, 'blobs', self.digest, self.name), cached_file)
+        hash_file_mock.assert_not_called()
+
+    def test_lookup_removed_file(self):
+        uri = 'http://site.com/bundle.zip'
+        cached_file = resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+        os.remove(cached_file)
+
+        self.assertIsNone(resolve_cache.lookup(self.cache_dir, uri))
+
+    def test_stats(self):
+        uri = 'http://site.com/bundle.zip'
+        self.assertEqual({'hits': 0, 'misses': 0}, resolve_cache.stats(self.cache_dir))
+
+        resolve_cache.lookup(self.cache_dir, uri)
+        resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+        resolve_cache.lookup(self.cache_dir, uri)
+        resolve_cache.lookup(self.cache_dir, uri)
+
+        self.assertEqual({'hits': 2, 'misses': 1}, resolve_cache.stats(self.cache_dir))
+
+    def test_lookup_records_access(self):
+        uri = 'http://site.com/bundle.zip'
+        cached_file = resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+        os.utime(cached_file, (1000, 1000))
+
+        resolve_cache.lookup(self.cache_dir, uri)
+
+        self.assertGreater(os.stat(cached_file).st_mtime, 1000)
+
+    def test_prune_least_recently_used(self):
+        now = time.time()
+        files = []
+        for i in range(3):
+            uri = 'http://site.com/bundle-{}.zip'.format(i)
+            cached_file = resolve_cache.store(self.cache_dir, uri, 'bundle-{}.zip'.format(i),
+                                              self.download(uri, 'bundle {}'.format(i).encode('utf-8')))
+            os.utime(cached_file, (now - 100 + i, now - 100 + i))
+            files.append(cached_file)
+
+        # The first file has been used most recently
+        os.utime(files[0], (now, now))
+
+        removed = resolve_cache.prune(self.cache_dir, max_size=2 * len(b'bundle 0'), max_age=1000, now=now)
+
+        self.assertEqual([files[1]], [cached_file.path for cached_file in removed])
+        self.assertEqual([files[2], files[0]],
+                         [cached_file.path for cached_file in resolve_cache.cached_files(self.cache_dir)])
+        self.assertIsNone(resolve_cache.lookup(self.cache_dir, 'http://site.com/bundle-1.zip'))
+        self.assertFalse(os.path.exists(os.path.dirname(files[1])))
+
+    def test_prune_max_age(self):
+        uri = 'http://site.com/bundle.zip'
+        cached_file = resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+        os.utime(cached_file, (10000, 10000))
+
+        self.assertEqual([], resolve_cache.prune(self.cache_dir, max_size=1024, max_age=100, now=10050))
+        removed = resolve_cache.prune(self.cache_dir, max_size=1024, max_age=100, now=10200)
+        self.assertEqual([cached_file], [removed_file.path for removed_file in removed])
+
+    def test_prune_keep(self):
+        uri = 'http://site.com/bundle.zip'
+        cached_file = resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+
+        self.assertEqual([], resolve_cache.prune(self.cache_dir, max_size=0, max_age=0, keep=cached_file))
+        self.assertTrue(os.path.exists(cached_file))
+
+    def test_prune_removes_lock_file(self):
+        uri = 'http://site.com/bundle.zip'
+        with resolve_cache.lock_uri(self.cache_dir, uri):
+            resolve_cache.store(self.cache_dir, uri, 'bundle.zip', self.download(uri))
+        lock_file = os.path.join(self.cache_dir, resolve_cache.LOCKS_DIR, '{}.lock'.format(resolve_cache.uri_key(uri)))
+        self.assertTrue(os.path.exists(lock_file))
+
+        resolve_cache.prune(self.cache_dir, max_size=0, max_age=0)
+
+        self.assertFalse(os.path.exists(lock_file))
+
+    def test_held_lock_file_not_removed(self):
+        with resolve_cache.lock(self.cache_dir, 'uri'):
+            resolve_cache.remove_lock(self.cache_dir, 'uri')
+            self.assertTrue(os.path.exists(os.path.join(self.cache_dir, resolve_cache.LOCKS_DIR, 'uri.lock')))
+
+    def test_lock_after_lock_file_removed(self):
+        entered = []
+        waiting = threading.Event()
+
+        def wait_for_lock():
+            waiting.set()
+            with resolve_cache.lock(self.cache_dir, 'uri'):
+                entered.append('waiter')
+
+        with resolve_cache.lock(self.cache_dir, 'uri'):
+            thread = threading.Thread(target=wait_for_lock)
+            thread.start()
+            waiting.wait()
+            time.sleep(0.05)
+            os.remove(os.path.join(self.cache_dir, resolve_cache.LOCKS_DIR, 'uri.lock'))
+
+        thread.join()
+        self.assertEqual(['waiter'], entered)
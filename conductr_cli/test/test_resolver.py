@@ -1,9 +1,10 @@
 from unittest import TestCase
 from conductr_cli.test.cli_test_case import strip_margin, create_mock_logger
-from conductr_cli.exceptions import BundleResolutionError
+from conductr_cli.exceptions import BintrayResolutionError, BundleResolutionError
 from conductr_cli import resolver
 from conductr_cli.resolvers import bintray_resolver, uri_resolver
 from pyhocon import ConfigFactory
+import threading
 
 try:
     from unittest.mock import patch, MagicMock, Mock  # 3.3 and beyond
@@ -13,7 +14,7 @@ except ImportError:
 
 class TestResolver(TestCase):
     def test_resolve_bundle_success(self):
-        custom_settings = Mock()
+        custom_settings = ConfigFactory.parse_string('')
 
         first_resolver_mock = Mock()
         first_resolver_mock.load_from_cache = MagicMock(return_value=(False, None, None))
@@ -39,7 +40,7 @@ class TestResolver(TestCase):
         second_resolver_mock.resolve_bundle.assert_called_with('/some-cache-dir', '/some-bundle-path')
 
     def test_resolve_bundle_failure(self):
-        custom_settings = Mock()
+        custom_settings = ConfigFactory.parse_string('')
 
         first_resolver_mock = Mock()
         first_resolver_mock.load_from_cache = MagicMock(return_value=(False, None, None))
@@ -56,7 +57,7 @@ class TestResolver(TestCase):
         first_resolver_mock.resolve_bundle.assert_called_with('/some-cache-dir', '/some-bundle-path')
 
     def test_resolve_bundle_from_cache(self):
-        custom_settings = Mock()
+        custom_settings = ConfigFactory.parse_string('')
 
         first_resolver_mock = Mock()
         first_resolver_mock.load_from_cache = MagicMock(return_value=(True, 'bundle_name', 'mock bundle_file'))
@@ -73,6 +74,166 @@ class TestResolver(TestCase):
         first_resolver_mock.load_from_cache('/some-cache-dir', '/some-bundle-path')
 
 
+class TestResolveBundleOffline(TestCase):
+    def test_resolve_bundle_offline(self):
+        online_resolver_mock = Mock(spec=['load_from_cache', 'resolve_bundle'], __name__='online_resolver')
+
+        offline_resolver_mock = Mock()
+        offline_resolver_mock.resolve_bundle_offline = MagicMock(return_value=(True, 'bundle_name', 'mock bundle_file'))
+
+        resolver_chain_mock = MagicMock(return_value=[online_resolver_mock, offline_resolver_mock])
+        with patch('conductr_cli.resolver.resolver_chain', resolver_chain_mock):
+            bundle_name, bundle_file = resolver.resolve_bundle(None, '/some-cache-dir', '/some-bundle-path',
+                                                               offline=True)
+            self.assertEqual('bundle_name', bundle_name)
+            self.assertEqual('mock bundle_file', bundle_file)
+
+        online_resolver_mock.load_from_cache.assert_not_called()
+        online_resolver_mock.resolve_bundle.assert_not_called()
+        offline_resolver_mock.resolve_bundle_offline.assert_called_with('/some-cache-dir', '/some-bundle-path')
+
+    def test_offline_mode_from_custom_settings(self):
+        custom_settings = ConfigFactory.parse_string('offline = true')
+
+        offline_resolver_mock = Mock()
+        offline_resolver_mock.resolve_bundle_offline = MagicMock(return_value=(False, None, None))
+
+        resolver_chain_mock = MagicMock(return_value=[offline_resolver_mock])
+        with patch('conductr_cli.resolver.resolver_chain', resolver_chain_mock):
+            self.assertRaises(BundleResolutionError, resolver.resolve_bundle, custom_settings, '/some-cache-dir',
+                              '/some-bundle-path')
+
+        offline_resolver_mock.resolve_bundle_offline.assert_called_with('/some-cache-dir', '/some-bundle-path')
+        offline_resolver_mock.load_from_cache.assert_not_called()
+        offline_resolver_mock.resolve_bundle.assert_not_called()
+
+
+class TestResolveBundleInParallel(TestCase):
+    custom_settings = ConfigFactory.parse_string('resolve_in_parallel = true')
+
+    def create_resolver(self, name, load_from_cache=(False, None, None), resolve_bundle=(False, None, None),
+                        released=None):
+        def wait_for_release(result, released=None):
+            def call(cache_dir, uri):
+                if released is not None:
+                    released.wait(5)
+                if isinstance(result, Exception):
+                    raise result
+                return result
+            return call
+
+        resolver_mock = Mock(__name__=name)
+        resolver_mock.load_from_cache = MagicMock(side_effect=wait_for_release(load_from_cache, released))
+        resolver_mock.resolve_bundle = MagicMock(side_effect=wait_for_release(resolve_bundle))
+        return resolver_mock
+
+    def resolve(self, all_resolvers):
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('conductr_cli.resolver.resolver_chain', MagicMock(return_value=all_resolvers)), \
+                patch('logging.getLogger', get_logger_mock):
+            result = resolver.resolve_bundle(self.custom_settings, '/some-cache-dir', '/some-bundle-path')
+        return result, log_mock
+
+    def test_first_resolver_wins(self):
+        released = threading.Event()
+        first_resolver_mock = self.create_resolver('first', load_from_cache=(True, 'first_bundle', 'first_file'),
+                                                   released=released)
+        second_resolver_mock = self.create_resolver('second')
+        # The first resolver only completes once the second has completed
+        second_resolver_mock.load_from_cache.side_effect = lambda cache_dir, uri: \
+            released.set() or (True, 'second_bundle', 'second_file')
+
+        result, log_mock = self.resolve([first_resolver_mock, second_resolver_mock])
+
+        self.assertEqual(('first_bundle', 'first_file'), result)
+        second_resolver_mock.load_from_cache.assert_called_with('/some-cache-dir', '/some-bundle-path')
+
+    def test_failed_resolvers_skipped(self):
+        first_resolver_mock = self.create_resolver('first')
+        second_resolver_mock = self.create_resolver('second', load_from_cache=(True, 'second_bundle', 'second_file'))
+
+        result, log_mock = self.resolve([first_resolver_mock, second_resolver_mock])
+
+        self.assertEqual(('second_bundle', 'second_file'), result)
+        first_resolver_mock.load_from_cache.assert_called_with('/some-cache-dir', '/some-bundle-path')
+
+    def test_lower_priority_resolvers_waited_for(self):
+        released = threading.Event()
+        first_resolver_mock = self.create_resolver('first', load_from_cache=(True, 'first_bundle', 'first_file'))
+        second_resolver_mock = self.create_resolver('second', released=released)
+        # The second resolver only completes after the first resolver has resolved the bundle
+        threading.Timer(0.05, released.set).start()
+
+        result, log_mock = self.resolve([first_resolver_mock, second_resolver_mock])
+
+        self.assertEqual(('first_bundle', 'first_file'), result)
+        self.assertTrue(released.is_set())
+        log_mock.verbose.assert_called_with(StartsWith('second.load_from_cache completed in '))
+        self.assertTrue(log_mock.verbose.call_args[0][0].endswith(', after the bundle was resolved'))
+
+    def test_resolved_in_turn_once_not_cached(self):
+        first_resolver_mock = self.create_resolver('first', resolve_bundle=(True, 'first_bundle', 'first_file'))
+        second_resolver_mock = self.create_resolver('second', resolve_bundle=(True, 'second_bundle', 'second_file'))
+
+        result, log_mock = self.resolve([first_resolver_mock, second_resolver_mock])
+
+        self.assertEqual(('first_bundle', 'first_file'), result)
+        # Resolving downloads the bundle, which isn't left to complete in the background
+        second_resolver_mock.resolve_bundle.assert_not_called()
+
+    def test_cache_before_resolution(self):
+        first_resolver_mock = self.create_resolver('first', resolve_bundle=(True, 'first_bundle', 'first_file'))
+        second_resolver_mock = self.create_resolver('second', load_from_cache=(True, 'cached_bundle', 'cached_file'))
+
+        result, log_mock = self.resolve([first_resolver_mock, second_resolver_mock])
+
+        self.assertEqual(('cached_bundle', 'cached_file'), result)
+        first_resolver_mock.resolve_bundle.assert_not_called()
+
+    def test_error_raised_in_chain_order(self):
+        first_resolver_mock = self.create_resolver('first', load_from_cache=BintrayResolutionError('first failed'))
+        second_resolver_mock = self.create_resolver('second', load_from_cache=(True, 'second_bundle', 'second_file'))
+
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('conductr_cli.resolver.resolver_chain',
+                   MagicMock(return_value=[first_resolver_mock, second_resolver_mock])), \
+                patch('logging.getLogger', get_logger_mock):
+            self.assertRaises(BintrayResolutionError, resolver.resolve_bundle, self.custom_settings,
+                              '/some-cache-dir', '/some-bundle-path')
+
+    def test_error_of_lower_priority_resolver_ignored(self):
+        first_resolver_mock = self.create_resolver('first', load_from_cache=(True, 'first_bundle', 'first_file'))
+        second_resolver_mock = self.create_resolver('second', load_from_cache=BintrayResolutionError('second failed'))
+
+        result, log_mock = self.resolve([first_resolver_mock, second_resolver_mock])
+
+        self.assertEqual(('first_bundle', 'first_file'), result)
+
+    def test_failure(self):
+        first_resolver_mock = self.create_resolver('first')
+        second_resolver_mock = self.create_resolver('second')
+
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('conductr_cli.resolver.resolver_chain',
+                   MagicMock(return_value=[first_resolver_mock, second_resolver_mock])), \
+                patch('logging.getLogger', get_logger_mock):
+            self.assertRaises(BundleResolutionError, resolver.resolve_bundle, self.custom_settings,
+                              '/some-cache-dir', '/some-bundle-path')
+
+    def test_latency_logged(self):
+        first_resolver_mock = self.create_resolver('first', load_from_cache=(True, 'cached_bundle', 'cached_file'))
+
+        result, log_mock = self.resolve([first_resolver_mock])
+
+        self.assertEqual(('cached_bundle', 'cached_file'), result)
+        log_mock.verbose.assert_called_with(StartsWith('first.load_from_cache completed in '))
+
+
+class StartsWith(str):
+    def __eq__(self, other):
+        return other.startswith(self)
+
+
 class TestResolverChain(TestCase):
     def test_custom_resolver_chain(self):
         custom_settings = ConfigFactory.parse_string(
@@ -9,3 +9,20 @@ class TestProgressBar(TestCase):
         self.assertEqual('[#####    ]  50%', screen_utils.progress_bar(5, 10, bar_length=10))
         self.assertEqual('[#########] 100%', screen_utils.progress_bar(10, 10, bar_length=10))
         self.assertEqual('[#########] 100%', screen_utils.progress_bar(15, 10, bar_length=10))
+
+
+class TestSize(TestCase):
+    def test_display(self):
+        self.assertEqual('0 B', screen_utils.size(0))
+        self.assertEqual('1023 B', screen_utils.size(1023))
+        self.assertEqual('1.0 KB', screen_utils.size(1024))
+        self.assertEqual('1.5 MB', screen_utils.size(1.5 * 1024 * 1024))
+        self.assertEqual('2048.0 GB', screen_utils.size(2 * 1024 * 1024 * 1024 * 1024))
+
+
+class TestDuration(TestCase):
+    def test_display(self):
+        self.assertEqual('0:00', screen_utils.duration(0.2))
+        self.assertEqual('0:59', screen_utils.duration(59))
+        self.assertEqual('2:05', screen_utils.duration(125))
+        self.assertEqual('1:00:01', screen_utils.duration(3601))
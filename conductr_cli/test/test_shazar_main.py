@@ -1,11 +1,16 @@
 from unittest import TestCase
+import argparse
+import hashlib
+import io
 import shutil
 import tempfile
 import os
+import zipfile
 from os import remove
 from conductr_cli import logging_setup
-from conductr_cli.shazar_main import create_digest, build_parser, run
-from conductr_cli.test.cli_test_case import CliTestCase
+from conductr_cli.shazar_main import compress, compressed_files, compression_level_of, compression_type, create_digest, \
+    build_parser, run, shazar, HashingWriter
+from conductr_cli.test.cli_test_case import CliTestCase, create_mock_logger
 
 try:
     from unittest.mock import patch, MagicMock  # 3.3 and beyond
@@ -26,12 +31,347 @@ class TestShazar(TestCase):
         )
         remove(temp_name)
 
+    def test_hashing_writer(self):
+        output = io.BytesIO()
+        writer = HashingWriter(output)
+        writer.write(b'test file ')
+        writer.write(b'data')
+
+        self.assertEqual(b'test file data', output.getvalue())
+        self.assertEqual(14, writer.tell())
+        self.assertEqual('1be7aaf1938cc19af7d2fdeb48a11c381dff8a98d4c4b47b3b0a5044a5255c04', writer.hexdigest())
+
+    def create_bundle_dir(self, source_dir):
+        bundle_dir = os.path.join(source_dir, 'bundle')
+        os.makedirs(os.path.join(bundle_dir, 'lib'))
+        with open(os.path.join(bundle_dir, 'bundle.conf'), 'w') as bundle_conf:
+            bundle_conf.write('name = "bundle"')
+        for index in range(10):
+            with open(os.path.join(bundle_dir, 'lib', 'library-{}.txt'.format(index)), 'wb') as library:
+                library.write(os.urandom(10000) + bytes(100000))
+        with open(os.path.join(bundle_dir, 'lib', 'library.jar'), 'wb') as library:
+            library.write(os.urandom(100000))
+        return bundle_dir
+
+    def package(self, bundle_dir, output_dir, jobs, compression_level=6, reproducible=False, previous_archive=None):
+        get_logger_mock, log_mock = create_mock_logger()
+        with patch('logging.getLogger', get_logger_mock):
+            shazar(argparse.Namespace(source=bundle_dir, output_dir=output_dir, jobs=jobs,
+                                      compression_level=compression_level, reproducible=reproducible,
+                                      previous_archive=previous_archive))
+        [archive_name] = os.listdir(output_dir)
+        return os.path.join(output_dir, archive_name), log_mock
+
+    def test_digest_of_archive(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+
+            create_digest_mock = MagicMock()
+            with patch('conductr_cli.shazar_main.create_digest', create_digest_mock):
+                archive_path, log_mock = self.package(bundle_dir, output_dir, 1)
+
+            # The archive is hashed as it's written rather than read again
+            create_digest_mock.assert_not_called()
+            with open(archive_path, 'rb') as archive:
+                self.assertEqual('bundle-{}.zip'.format(hashlib.sha256(archive.read()).hexdigest()),
+                                 os.path.basename(archive_path))
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_compressed_files(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+
+            # Files larger than 50000 bytes are compressed into temporary files
+            with patch('conductr_cli.shazar_main.MAX_IN_MEMORY_SIZE', 50000):
+                archive_path, log_mock = self.package(bundle_dir, output_dir, 1)
+
+            with zipfile.ZipFile(archive_path) as archive:
+                self.assertIsNone(archive.testzip())
+                self.assertEqual(['bundle/bundle.conf'] +
+                                 ['bundle/lib/library-{}.txt'.format(index) for index in range(10)] +
+                                 ['bundle/lib/library.jar'],
+                                 archive.namelist())
+                self.assertEqual(b'name = "bundle"', archive.read('bundle/bundle.conf'))
+                # Files which don't deflate to less than their size are stored
+                self.assertEqual(zipfile.ZIP_STORED, archive.getinfo('bundle/bundle.conf').compress_type)
+                self.assertEqual(zipfile.ZIP_STORED, archive.getinfo('bundle/lib/library.jar').compress_type)
+                library = archive.getinfo('bundle/lib/library-0.txt')
+                self.assertEqual(zipfile.ZIP_DEFLATED, library.compress_type)
+                self.assertLess(library.compress_size, 20000)
+            # Only the archive is left within the output dir
+            self.assertEqual([os.path.basename(archive_path)], os.listdir(output_dir))
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_same_archive_in_parallel(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        parallel_output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+
+            archive_path, log_mock = self.package(bundle_dir, output_dir, 1)
+            parallel_archive_path, log_mock = self.package(bundle_dir, parallel_output_dir, 3)
+
+            self.assertEqual(os.path.basename(archive_path), os.path.basename(parallel_archive_path))
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+            shutil.rmtree(parallel_output_dir)
+
+    def test_size_compressed_ahead_bounded(self):
+        source_dir = tempfile.mkdtemp()
+        try:
+            files = []
+            for index in range(4):
+                path = os.path.join(source_dir, 'file-{}.txt'.format(index))
+                with open(path, 'wb') as f:
+                    f.write(b'x' * 100)
+                files.append((path, 'file-{}.txt'.format(index), None))
+
+            events = []
+
+            def apply_async(func, args):
+                events.append('compress {}'.format(args[1]))
+                result = MagicMock()
+                result.get.side_effect = lambda: events.append('write {}'.format(args[1]))
+                return result
+
+            pool = MagicMock()
+            pool.__enter__.return_value.apply_async.side_effect = apply_async
+
+            with patch('multiprocessing.Pool', return_value=pool), \
+                    patch('conductr_cli.shazar_main.MAX_SIZE_AHEAD', 250):
+                list(compressed_files(files, 8, 6, None, None, source_dir))
+
+            self.assertEqual(['compress file-0.txt', 'compress file-1.txt',
+                              'write file-0.txt', 'compress file-2.txt',
+                              'write file-1.txt', 'compress file-3.txt',
+                              'write file-2.txt', 'write file-3.txt'],
+                             events)
+        finally:
+            shutil.rmtree(source_dir)
+
+    def test_compression_level_0(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+
+            archive_path, log_mock = self.package(bundle_dir, output_dir, 1, compression_level=0)
+
+            with zipfile.ZipFile(archive_path) as archive:
+                self.assertIsNone(archive.testzip())
+                for zip_info in archive.infolist():
+                    self.assertEqual(zipfile.ZIP_STORED, zip_info.compress_type)
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_compression_ratios_logged(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+
+            archive_path, log_mock = self.package(bundle_dir, output_dir, 1)
+
+            log_mock.verbose.assert_any_call('Stored bundle/lib/library.jar 97.7 KB to 97.7 KB (100%)')
+            log_mock.verbose.assert_any_call(StartsWith('Deflated bundle/lib/library-0.txt 107.4 KB to '))
+            log_mock.info.assert_any_call(StartsWith('Compressed 12 files (10 deflated, 2 stored) from 1.1 MB to '))
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_reproducible(self):
+        source_dir = tempfile.mkdtemp()
+        output_dirs = [tempfile.mkdtemp() for _ in range(3)]
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+            archive_path, log_mock = self.package(bundle_dir, output_dirs[0], 1, reproducible=True)
+
+            # Touched and made readable by anyone
+            library_path = os.path.join(bundle_dir, 'lib', 'library-0.txt')
+            os.utime(library_path, (1000000000, 1000000000))
+            os.chmod(library_path, 0o666)
+            rebuilt_archive_path, log_mock = self.package(bundle_dir, output_dirs[1], 1, reproducible=True)
+            self.assertEqual(os.path.basename(archive_path), os.path.basename(rebuilt_archive_path))
+
+            with zipfile.ZipFile(archive_path) as archive:
+                for zip_info in archive.infolist():
+                    self.assertEqual((1980, 1, 1, 0, 0, 0), zip_info.date_time)
+                    self.assertEqual(0o100644, zip_info.external_attr >> 16)
+
+            # Made executable
+            os.chmod(library_path, 0o700)
+            with patch.dict('os.environ', {'SOURCE_DATE_EPOCH': '1000000000'}):
+                executable_archive_path, log_mock = self.package(bundle_dir, output_dirs[2], 1, reproducible=True)
+            with zipfile.ZipFile(executable_archive_path) as archive:
+                self.assertEqual((2001, 9, 9, 1, 46, 40), archive.getinfo('bundle/bundle.conf').date_time)
+                self.assertEqual(0o100755, archive.getinfo('bundle/lib/library-0.txt').external_attr >> 16)
+        finally:
+            shutil.rmtree(source_dir)
+            for output_dir in output_dirs:
+                shutil.rmtree(output_dir)
+
+    def test_invalid_source_date_epoch(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+            for source_date_epoch in ['yesterday', '1e9', '9999999999']:
+                get_logger_mock, log_mock = create_mock_logger()
+                with patch.dict('os.environ', {'SOURCE_DATE_EPOCH': source_date_epoch}), \
+                        patch('logging.getLogger', get_logger_mock):
+                    self.assertFalse(shazar(argparse.Namespace(source=bundle_dir, output_dir=output_dir, jobs=1,
+                                                               compression_level=6, reproducible=True,
+                                                               previous_archive=None)))
+
+                log_mock.error.assert_any_call(
+                    'SOURCE_DATE_EPOCH is set to {}, which isn\'t a date a zip archive can record.'.format(
+                        source_date_epoch))
+                self.assertEqual([], os.listdir(output_dir))
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_output_dir_within_source(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+            archive_path, log_mock = self.package(bundle_dir, output_dir, 1, reproducible=True)
+
+            # The archive being written and the temp dir of the files being compressed aren't packaged
+            nested_output_dir = os.path.join(bundle_dir, 'out')
+            os.makedirs(nested_output_dir)
+            with patch('conductr_cli.shazar_main.MAX_IN_MEMORY_SIZE', 50000):
+                nested_archive_path, log_mock = self.package(bundle_dir, nested_output_dir, 1, reproducible=True)
+
+            self.assertEqual(os.path.basename(archive_path), os.path.basename(nested_archive_path))
+            with zipfile.ZipFile(nested_archive_path) as archive:
+                self.assertFalse(any([name.startswith('bundle/out/') for name in archive.namelist()]))
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_previous_archive(self):
+        source_dir = tempfile.mkdtemp()
+        output_dirs = [tempfile.mkdtemp() for _ in range(3)]
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+            archive_path, log_mock = self.package(bundle_dir, output_dirs[0], 1, reproducible=True)
+
+            compress_mock = MagicMock(side_effect=compress)
+            with patch('conductr_cli.shazar_main.compress', compress_mock):
+                reused_archive_path, log_mock = self.package(bundle_dir, output_dirs[1], 1, reproducible=True,
+                                                             previous_archive=archive_path)
+            self.assertEqual(os.path.basename(archive_path), os.path.basename(reused_archive_path))
+            compress_mock.assert_not_called()
+            log_mock.verbose.assert_any_call(StartsWith('Reused deflated bundle/lib/library-0.txt 107.4 KB to '))
+            log_mock.info.assert_any_call('Reused 12 unchanged files from {}'.format(archive_path))
+
+            # Changed, with the same size
+            library_path = os.path.join(bundle_dir, 'lib', 'library-0.txt')
+            with open(library_path, 'wb') as library:
+                library.write(os.urandom(10000) + bytes(100000))
+            with patch('conductr_cli.shazar_main.compress', compress_mock):
+                changed_archive_path, log_mock = self.package(bundle_dir, output_dirs[2], 1, reproducible=True,
+                                                              previous_archive=archive_path)
+            self.assertEqual(1, compress_mock.call_count)
+            self.assertEqual(library_path, compress_mock.call_args[0][0])
+            log_mock.info.assert_any_call('Reused 11 unchanged files from {}'.format(archive_path))
+            with zipfile.ZipFile(changed_archive_path) as archive:
+                self.assertIsNone(archive.testzip())
+                with open(library_path, 'rb') as library:
+                    self.assertEqual(library.read(), archive.read('bundle/lib/library-0.txt'))
+        finally:
+            shutil.rmtree(source_dir)
+            for output_dir in output_dirs:
+                shutil.rmtree(output_dir)
+
+    def test_previous_archive_of_other_compression_level(self):
+        source_dir = tempfile.mkdtemp()
+        output_dirs = [tempfile.mkdtemp() for _ in range(2)]
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+            archive_path, log_mock = self.package(bundle_dir, output_dirs[0], 1, compression_level=5)
+
+            # Only the stored files are reused, in parallel
+            reused_archive_path, log_mock = self.package(bundle_dir, output_dirs[1], 3, compression_level=6,
+                                                         previous_archive=archive_path)
+            log_mock.info.assert_any_call('Reused 2 unchanged files from {}'.format(archive_path))
+            with zipfile.ZipFile(reused_archive_path) as archive:
+                self.assertIsNone(archive.testzip())
+                self.assertEqual(6, compression_level_of(archive.getinfo('bundle/lib/library-0.txt')))
+                self.assertIsNone(compression_level_of(archive.getinfo('bundle/lib/library.jar')))
+        finally:
+            shutil.rmtree(source_dir)
+            for output_dir in output_dirs:
+                shutil.rmtree(output_dir)
+
+    def test_unreadable_previous_archive(self):
+        source_dir = tempfile.mkdtemp()
+        output_dir = tempfile.mkdtemp()
+        try:
+            bundle_dir = self.create_bundle_dir(source_dir)
+            previous_archive = os.path.join(source_dir, 'previous.zip')
+            with open(previous_archive, 'w') as previous:
+                previous.write('not an archive')
+
+            archive_path, log_mock = self.package(bundle_dir, output_dir, 1, previous_archive=previous_archive)
+
+            log_mock.warning.assert_called_once_with(StartsWith('Unable to reuse the files of {}'.format(
+                previous_archive)))
+            log_mock.info.assert_any_call('Reused 0 unchanged files from {}'.format(previous_archive))
+            with zipfile.ZipFile(archive_path) as archive:
+                self.assertIsNone(archive.testzip())
+        finally:
+            shutil.rmtree(source_dir)
+            shutil.rmtree(output_dir)
+
+    def test_compression_type(self):
+        text = b'name = "bundle"\n' * 1000
+        self.assertEqual(zipfile.ZIP_DEFLATED, compression_type('bundle/bundle.conf', text, 6))
+        self.assertEqual(zipfile.ZIP_STORED, compression_type('bundle/bundle.conf', text, 0))
+        self.assertEqual(zipfile.ZIP_STORED, compression_type('bundle/lib/library.JAR', text, 6))
+        self.assertEqual(zipfile.ZIP_STORED, compression_type('bundle/lib/library.bin', os.urandom(1000), 6))
+        self.assertEqual(zipfile.ZIP_STORED, compression_type('bundle/empty', b'', 6))
+
     def test_parser_success(self):
         parser = build_parser()
         args = parser.parse_args('--output-dir output-dir source'.split())
 
         self.assertEqual(args.output_dir, 'output-dir')
         self.assertEqual(args.source, 'source')
+        self.assertEqual(args.jobs, 1)
+        self.assertEqual(args.compression_level, 6)
+        self.assertFalse(args.reproducible)
+        self.assertIsNone(args.previous_archive)
+        self.assertFalse(args.verbose)
+
+    def test_parser_jobs(self):
+        parser = build_parser()
+        args = parser.parse_args(
+            '--jobs 8 --compression-level 9 --reproducible --previous-archive previous.zip -v source'.split())
+
+        self.assertEqual(args.jobs, 8)
+        self.assertEqual(args.compression_level, 9)
+        self.assertTrue(args.reproducible)
+        self.assertEqual(args.previous_archive, 'previous.zip')
+        self.assertTrue(args.verbose)
+
+
+class StartsWith(str):
+    def __eq__(self, other):
+        return other.startswith(self)
 
 
 class TestIntegration(CliTestCase):
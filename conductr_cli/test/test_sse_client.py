@@ -1,11 +1,31 @@
 from unittest import TestCase
 from conductr_cli.test.cli_test_case import strip_margin
 from conductr_cli import sse_client
+from conductr_cli.http import DEFAULT_HTTP_TIMEOUT
+from requests.exceptions import ChunkedEncodingError, ConnectionError
 
 try:
-    from unittest.mock import patch, MagicMock  # 3.3 and beyond
+    from unittest.mock import call, patch, MagicMock  # 3.3 and beyond
 except ImportError:
-    from mock import patch, MagicMock
+    from mock import call, patch, MagicMock
+
+
+NO_READ_TIMEOUT = (DEFAULT_HTTP_TIMEOUT, None)
+
+
+def create_response(chunks, status_code=200):
+    response_mock = MagicMock(status_code=status_code)
+    response_mock.iter_content = MagicMock(return_value=iter(chunks))
+    return response_mock
+
+
+def no_content_response():
+    return create_response([], status_code=204)
+
+
+def raise_chunked_encoding_error():
+    raise ChunkedEncodingError('Connection broken')
+    yield
 
 
 class TestSSEClient(TestCase):
@@ -18,19 +38,19 @@ class TestSSEClient(TestCase):
                                   |data:
                                   |
                                   |""")
-        raw_sse_iterators = [iter(list(line)) for line in list(raw_sse)]
-        iter_content_mock = MagicMock(side_effect=raw_sse_iterators)
+        iter_content_mock = MagicMock(return_value=iter([raw_sse]))
 
         raise_for_status_mock = MagicMock()
 
-        response_mock = MagicMock()
+        response_mock = MagicMock(status_code=200)
         response_mock.raise_for_status = raise_for_status_mock
         response_mock.iter_content = iter_content_mock
 
-        request_get_mock = MagicMock(return_value=response_mock)
+        request_get_mock = MagicMock(side_effect=[response_mock, no_content_response()])
 
         result = []
-        with patch('requests.get', request_get_mock):
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep'):
             events = sse_client.get_events('http://host.com')
             for event in events:
                 result.append(event)
@@ -41,6 +61,161 @@ class TestSSEClient(TestCase):
             sse_client.Event(event=None, data='')
         ], result)
 
-        request_get_mock.assert_called_with('http://host.com', stream=True, **sse_client.SSE_REQUEST_INPUT)
+        request_get_mock.assert_called_with('http://host.com', stream=True, timeout=NO_READ_TIMEOUT,
+                                            **sse_client.SSE_REQUEST_INPUT)
         raise_for_status_mock.assert_called_with()
-        iter_content_mock.assert_called_with(decode_unicode=True)
+        iter_content_mock.assert_called_once_with(chunk_size=sse_client.SSE_CHUNK_SIZE, decode_unicode=True)
+
+    def test_sse_events_spanning_chunks(self):
+        response_mock = create_response([
+            'event:bundleInstallationAdded\ndata:fir',
+            'st\n',
+            '\nevent:bundleExecutionAdded\ndata:second\r\n\r',
+            '\nevent:bundleExecutionRemoved\ndata:third\n\nevent:incomplete'
+        ])
+
+        request_get_mock = MagicMock(side_effect=[response_mock, no_content_response()])
+
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep'):
+            result = list(sse_client.get_events('http://host.com'))
+
+        self.assertEqual([
+            sse_client.Event(event='bundleInstallationAdded', data='first'),
+            sse_client.Event(event='bundleExecutionAdded', data='second'),
+            sse_client.Event(event='bundleExecutionRemoved', data='third')
+        ], result)
+
+        response_mock.iter_content.assert_called_once_with(chunk_size=sse_client.SSE_CHUNK_SIZE, decode_unicode=True)
+
+    def test_sse_fields(self):
+        raw_sse = strip_margin("""|: heartbeat
+                                  |
+                                  |event: bundleExecutionAdded
+                                  |id: 1
+                                  |data: {"bundleId": "45e0c47",
+                                  |data:  "host": "172.17.0.4"}
+                                  |
+                                  |retry: 500
+                                  |
+                                  |event:bundleExecutionRemoved
+                                  |unknown:field
+                                  |data
+                                  |
+                                  |id:2
+                                  |
+                                  |""")
+        request_get_mock = MagicMock(side_effect=[create_response([raw_sse]), no_content_response()])
+        sleep_mock = MagicMock()
+
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep', sleep_mock):
+            events = sse_client.get_events('http://host.com')
+            result = list(events)
+
+        self.assertEqual([
+            sse_client.Event(event='bundleExecutionAdded', data='{"bundleId": "45e0c47",\n "host": "172.17.0.4"}',
+                             id='1'),
+            sse_client.Event(event='bundleExecutionRemoved', data='', id='1')
+        ], result)
+
+        self.assertEqual('2', events.last_event_id)
+        sleep_mock.assert_called_once_with(0.5)
+
+    def test_reconnect_with_last_event_id(self):
+        first_response = create_response([
+            'id:7\nevent:bundleInstallationAdded\ndata:first\n\nevent:bundleIns'
+        ])
+        broken_response = MagicMock(status_code=200)
+        broken_response.iter_content = MagicMock(return_value=raise_chunked_encoding_error())
+        resumed_response = create_response([
+            'id:8\nevent:bundleInstallationRemoved\ndata:second\n\n'
+        ])
+
+        request_get_mock = MagicMock(side_effect=[
+            first_response,
+            ConnectionError('test reason'),
+            broken_response,
+            resumed_response,
+            no_content_response()
+        ])
+        sleep_mock = MagicMock()
+
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep', sleep_mock):
+            result = list(sse_client.get_events('http://host.com'))
+
+        self.assertEqual([
+            sse_client.Event(event='bundleInstallationAdded', data='first', id='7'),
+            sse_client.Event(event='bundleInstallationRemoved', data='second', id='8')
+        ], result)
+
+        resume_headers = dict(sse_client.SSE_REQUEST_INPUT['headers'], **{'Last-Event-ID': '7'})
+        self.assertEqual([
+            call('http://host.com', stream=True, timeout=NO_READ_TIMEOUT, **sse_client.SSE_REQUEST_INPUT),
+            call('http://host.com', stream=True, timeout=NO_READ_TIMEOUT, headers=resume_headers),
+            call('http://host.com', stream=True, timeout=NO_READ_TIMEOUT, headers=resume_headers),
+            call('http://host.com', stream=True, timeout=NO_READ_TIMEOUT, headers=resume_headers),
+            call('http://host.com', stream=True, timeout=NO_READ_TIMEOUT, headers=dict(resume_headers, **{'Last-Event-ID': '8'}))
+        ], request_get_mock.call_args_list)
+
+        self.assertEqual([call(sse_client.SSE_DEFAULT_RETRY / 1000.0)] * 4, sleep_mock.call_args_list)
+
+    def test_reconnect_gives_up(self):
+        connection_error = ConnectionError('test reason')
+        request_get_mock = MagicMock(
+            side_effect=[create_response([])] + [connection_error] * sse_client.SSE_MAX_RECONNECT_ATTEMPTS)
+
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep'):
+            events = sse_client.get_events('http://host.com')
+            self.assertRaises(ConnectionError, list, events)
+
+        self.assertEqual(1 + sse_client.SSE_MAX_RECONNECT_ATTEMPTS, request_get_mock.call_count)
+
+    def test_reconnect_gives_up_when_closed_without_events(self):
+        request_get_mock = MagicMock(side_effect=lambda *args, **kwargs: create_response([':heartbeat\n\n']))
+
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep'):
+            events = sse_client.get_events('http://host.com')
+            self.assertRaises(ConnectionError, list, events)
+
+        self.assertEqual(1 + sse_client.SSE_MAX_RECONNECT_ATTEMPTS, request_get_mock.call_count)
+
+    def test_reconnect_attempts_reset_by_events(self):
+        request_get_mock = MagicMock(side_effect=[create_response(['data:first\n\n'])] +
+                                     [create_response([])] * (sse_client.SSE_MAX_RECONNECT_ATTEMPTS - 1) +
+                                     [create_response(['data:second\n\n'])] +
+                                     [create_response([])] * (sse_client.SSE_MAX_RECONNECT_ATTEMPTS - 1) +
+                                     [no_content_response()])
+
+        with patch('conductr_cli.http.get', request_get_mock), \
+                patch('time.sleep'):
+            result = list(sse_client.get_events('http://host.com'))
+
+        self.assertEqual([sse_client.Event(event=None, data='first'), sse_client.Event(event=None, data='second')],
+                         result)
+
+    def test_read_timeout(self):
+        request_get_mock = MagicMock(return_value=create_response([]))
+        read_timeout_mock = MagicMock(return_value=42)
+
+        with patch('conductr_cli.http.get', request_get_mock):
+            sse_client.get_events('http://host.com', read_timeout_mock)
+
+        request_get_mock.assert_called_with('http://host.com', stream=True, timeout=(DEFAULT_HTTP_TIMEOUT, 42),
+                                            **sse_client.SSE_REQUEST_INPUT)
+
+    def test_close(self):
+        response_mock = create_response([])
+        request_get_mock = MagicMock(return_value=response_mock)
+
+        with patch('conductr_cli.http.get', request_get_mock):
+            events = sse_client.get_events('http://host.com')
+            events.close()
+            self.assertEqual([], list(events))
+
+        response_mock.close.assert_called_with()
+        request_get_mock.assert_called_once_with('http://host.com', stream=True, timeout=NO_READ_TIMEOUT,
+                                                 **sse_client.SSE_REQUEST_INPUT)